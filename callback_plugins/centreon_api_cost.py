@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# Play-wide summary of the Centreon API calls made by the centreon_* modules,
+# optionally exported as a Prometheus textfile.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    callback: centreon_api_cost
+    type: aggregate
+    short_description: Summary of the Centreon API calls of the play
+    description:
+      - Collects the C(centreon_api) timings returned by the centreon_* modules
+        and prints, at the end of the playbook, the number of calls per module
+        and per action, latency percentiles per action, the time spent in
+        applycfg and the slowest objects and hosts.
+      - Optionally writes run metrics in the Prometheus text format, for the
+        node_exporter textfile collector.
+    requirements:
+      - enable in configuration (C(callback_whitelist = centreon_api_cost))
+    options:
+      top:
+        description: Number of slowest objects and hosts to show
+        default: 10
+        type: int
+        env:
+          - name: CENTREON_API_COST_TOP
+        ini:
+          - section: callback_centreon_api_cost
+            key: top
+      output:
+        description: Also write the summary as JSON to this file
+        env:
+          - name: CENTREON_API_COST_OUTPUT
+        ini:
+          - section: callback_centreon_api_cost
+            key: output
+      prometheus_textfile:
+        description:
+          - Write run metrics to this file (for instance
+            C(/var/lib/node_exporter/textfile/centreon.prom)). The file is
+            replaced atomically at the end of the run.
+        env:
+          - name: CENTREON_API_COST_PROMETHEUS_TEXTFILE
+        ini:
+          - section: callback_centreon_api_cost
+            key: prometheus_textfile
+'''
+
+import json
+import math
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from ansible.plugins.callback import CallbackBase
+
+# applycfg, or its steps when the reload depends on the generated configuration
+APPLY_ACTIONS = ('applycfg', 'pollergenerate', 'fingerprint', 'pollertest', 'cfgmove', 'pollerreload')
+
+# results with one entry (list item or key) per object handled by a bulk module
+OBJECT_LISTS = ('hosts', 'templates', 'drift')
+
+
+def object_count(result):
+    """ Objects handled by the run which returned `result` """
+    for key in OBJECT_LISTS:
+        if isinstance(result.get(key), (list, dict)):
+            return len(result[key])
+    # centreon_hostgroup handles the list of its `hg` option
+    hostgroups = result.get('invocation', {}).get('module_args', {}).get('hg')
+    if isinstance(hostgroups, list):
+        return len(hostgroups)
+    return 1
+
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def percentile(values, pct):
+    """ Nearest-rank percentile of sorted `values` """
+    if not values:
+        return 0.0
+    rank = int(math.ceil(pct / 100.0 * len(values)))
+    return values[max(0, min(len(values), rank) - 1)]
+
+
+class CallbackModule(CallbackBase):
+
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'centreon_api_cost'
+    CALLBACK_NEEDS_WHITELIST = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.calls_per_module = defaultdict(int)
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.objects = defaultdict(float)
+        self.hosts = defaultdict(float)
+        self.applycfg = 0.0
+        self.applycfg_pollers = defaultdict(float)
+        self.tasks = 0
+        self.retries = 0
+        self.tasks_per_module = defaultdict(int)
+        self.objects_per_module = defaultdict(int)
+        self.changes_per_module = defaultdict(int)
+        self.start = time.time()
+
+    def v2_playbook_on_start(self, playbook):
+        self.start = time.time()
+
+    def _collect(self, result):
+        # looped tasks: each item is collected on its own, the aggregate
+        # result has no centreon_api
+        api = result._result.get('centreon_api')
+        if not api:
+            return
+        self.tasks += 1
+        module = result._task.action
+        host = result._host.get_name()
+        self.tasks_per_module[module] += 1
+        self.objects_per_module[module] += object_count(result._result)
+        if result._result.get('changed'):
+            self.changes_per_module[module] += 1
+        self.retries += api.get('retries', 0)
+        for action, obj, name, elapsed, ok in api.get('calls', []):
+            self.calls_per_module[module] += 1
+            self.latencies[action].append(elapsed)
+            if not ok:
+                self.errors[action] += 1
+            if name:
+                self.objects['%s %s' % (obj or action, name)] += elapsed
+            self.hosts[host] += elapsed
+            if action.lower() in APPLY_ACTIONS:
+                self.applycfg += elapsed
+                self.applycfg_pollers[name] += elapsed
+
+    def v2_runner_on_ok(self, result):
+        self._collect(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._collect(result)
+
+    def v2_runner_item_on_ok(self, result):
+        self._collect(result)
+
+    def v2_runner_item_on_failed(self, result):
+        self._collect(result)
+
+    def summary(self, top):
+        actions = dict()
+        for action, values in self.latencies.items():
+            values = sorted(values)
+            actions[action] = dict(
+                calls=len(values),
+                errors=self.errors.get(action, 0),
+                total=round(sum(values), 4),
+                p50=percentile(values, 50),
+                p90=percentile(values, 90),
+                p99=percentile(values, 99),
+                max=values[-1],
+            )
+        return dict(
+            tasks=self.tasks,
+            calls=sum(self.calls_per_module.values()),
+            calls_per_module=dict(self.calls_per_module),
+            actions=actions,
+            applycfg_time=round(self.applycfg, 4),
+            slowest_objects=[(k, round(v, 4)) for k, v in
+                             sorted(self.objects.items(), key=lambda x: -x[1])[:top]],
+            slowest_hosts=[(k, round(v, 4)) for k, v in
+                           sorted(self.hosts.items(), key=lambda x: -x[1])[:top]],
+        )
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.tasks:
+            return
+        top = int(self.get_option('top') or 10)
+        summary = self.summary(top)
+
+        self._display.banner("CENTREON API COST")
+        self._display.display("%d calls in %d tasks, %.2fs in applycfg" % (
+            summary['calls'], summary['tasks'], summary['applycfg_time']))
+        for module, count in sorted(summary['calls_per_module'].items()):
+            self._display.display("  %-32s %8d calls" % (module, count))
+        self._display.display("%-20s %8s %6s %9s %8s %8s %8s" % (
+            'action', 'calls', 'errors', 'total', 'p50', 'p90', 'p99'))
+        for action, a in sorted(summary['actions'].items(), key=lambda x: -x[1]['total']):
+            self._display.display("%-20s %8d %6d %8.2fs %7.3fs %7.3fs %7.3fs" % (
+                action, a['calls'], a['errors'], a['total'], a['p50'], a['p90'], a['p99']))
+        self._display.display("Slowest objects:")
+        for name, elapsed in summary['slowest_objects']:
+            self._display.display("  %-40s %8.2fs" % (name, elapsed))
+        self._display.display("Slowest hosts:")
+        for name, elapsed in summary['slowest_hosts']:
+            self._display.display("  %-40s %8.2fs" % (name, elapsed))
+
+        output = self.get_option('output')
+        if output:
+            with open(output, 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
+
+        textfile = self.get_option('prometheus_textfile')
+        if textfile:
+            self.write_textfile(textfile)
+
+    def metrics(self):
+        """
+        Metrics of this run in the Prometheus text exposition format. The
+        file describes the last run only, so counts are exported as gauges.
+        """
+        lines = []
+
+        def metric(name, mtype, help, samples):
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s %s' % (name, mtype))
+            for labels, value in samples:
+                label = ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                                 for k, v in labels)
+                lines.append('%s%s %s' % (name, '{%s}' % label if label else '', value))
+
+        metric('centreon_reconcile_tasks', 'gauge', 'Tasks run by module',
+               [((('module', m),), v) for m, v in sorted(self.tasks_per_module.items())])
+        metric('centreon_reconcile_objects', 'gauge', 'Objects reconciled by module',
+               [((('module', m),), v) for m, v in sorted(self.objects_per_module.items())])
+        metric('centreon_reconcile_changes', 'gauge', 'Tasks which changed something, by module',
+               [((('module', m),), self.changes_per_module.get(m, 0))
+                for m in sorted(self.tasks_per_module)])
+        metric('centreon_api_calls', 'gauge', 'API calls by CLAPI action',
+               [((('action', a),), len(v)) for a, v in sorted(self.latencies.items())])
+        metric('centreon_api_errors', 'gauge', 'Failed API calls by CLAPI action',
+               [((('action', a),), self.errors.get(a, 0)) for a in sorted(self.latencies)])
+        metric('centreon_api_retries', 'gauge', 'API calls sent again after a transient error',
+               [((), self.retries)])
+
+        samples = []
+        for a, values in sorted(self.latencies.items()):
+            for le in BUCKETS:
+                samples.append(((('action', a), ('le', le)), len([v for v in values if v <= le])))
+            samples.append(((('action', a), ('le', '+Inf')), len(values)))
+        lines.append('# HELP centreon_api_call_duration_seconds API call latency by CLAPI action')
+        lines.append('# TYPE centreon_api_call_duration_seconds histogram')
+        for labels, value in samples:
+            lines.append('centreon_api_call_duration_seconds_bucket{action="%s",le="%s"} %s'
+                         % (labels[0][1], labels[1][1], value))
+        for a, values in sorted(self.latencies.items()):
+            lines.append('centreon_api_call_duration_seconds_sum{action="%s"} %s' % (a, round(sum(values), 4)))
+            lines.append('centreon_api_call_duration_seconds_count{action="%s"} %s' % (a, len(values)))
+
+        metric('centreon_applycfg_duration_seconds', 'gauge', 'Time spent in applycfg by poller',
+               [((('poller', p),), round(v, 4)) for p, v in sorted(self.applycfg_pollers.items())])
+        metric('centreon_reconcile_duration_seconds', 'gauge', 'Duration of the last run',
+               [((), round(time.time() - self.start, 3))])
+        metric('centreon_reconcile_last_run_timestamp_seconds', 'gauge', 'End of the last run',
+               [((), int(time.time()))])
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """ Write to a temporary file of the same directory, then rename """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.centreon')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.metrics())
+            os.chmod(tmp, 0o644)
+            os.rename(tmp, path)
+        except (IOError, OSError) as e:
+            self._display.warning("Unable to write %s: %s" % (path, e))
+            if os.path.exists(tmp):
+                os.unlink(tmp)
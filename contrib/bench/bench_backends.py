@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Same centreon_host_bulk runs on the v1 and v2 backends of the stand-in:
+# onboarding, a no-op run and a change of every host, then a comparison of
+# the resulting objects.
+#
+#   python3 contrib/bench/bench_backends.py --hosts 500 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'library'))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+import centreon_host_bulk  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def host_specs(count, tag):
+    return [dict(
+        name='srv-%05d' % i,
+        alias='Server %d %s' % (i, tag),
+        ipaddr='10.3.%d.%d' % (i // 250, i % 250),
+        hosttemplates=['generic-tpl-%d' % ((i + len(tag)) % 10)],
+        hostgroups=['hg-%d' % ((i + len(tag)) % 10)],
+        hostgroups_action='set',
+        # a fixed poller, auto placement depends on the order hosts complete
+        instance='Central' if i % 4 == 0 else 'Poller-%d' % (i % 4),
+        macros=[dict(name='OWNER', value='team-%s' % tag)],
+        params=[dict(name='notes_url', value='https://wiki/%d' % i)],
+    ) for i in range(count)]
+
+
+PARAMS = dict(api_retries=0, lookup_threshold=20, pollers=[], balance_by='hosts', applycfg=True,
+              resume=False, write_mode='api', import_chunk_size=1000, preflight=True, macros_inherit=False,
+              compression='responses', fingerprint_dir=None)
+
+
+def snapshot(state):
+    return dict(
+        hosts=dict((n, (h['alias'], h['address'], h['instance'], tuple(h['templates']),
+                        tuple(sorted(h['hostgroups'])), tuple(sorted(h['macros'].items()))))
+                   for n, h in state.hosts.items()),
+        members=dict((n, tuple(sorted(g['members']))) for n, g in state.hostgroups.items()),
+    )
+
+
+def run(backend, count, latency, concurrency):
+    server, url = serve(latency=latency / 1000.0, pollers=4)
+    central = dict(name='bench', url=url, username='admin', password='centreon', backend=backend)
+    params = dict(PARAMS, concurrency=concurrency, backend=backend)
+    timings = []
+    for label, tag in (('onboard', 'a'), ('no-op', 'a'), ('change', 'bb')):
+        server.reset()
+        start = time.time()
+        results = centreon_host_bulk.run_central(central, host_specs(count, tag), params, None)[0]
+        timings.append((label, time.time() - start, server.stats['requests'],
+                        len([r for r in results if r['changed']]),
+                        len([r for r in results if r.get('failed')])))
+    state = snapshot(server.state)
+    server.shutdown()
+    return timings, state
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    print("%d hosts, %.1fms per request, concurrency %d" % (args.hosts, args.latency, args.concurrency))
+    print("%-8s %-8s %9s %9s %8s %6s" % ('backend', 'run', 'seconds', 'requests', 'changed', 'failed'))
+    states = []
+    for backend in ('v1', 'v2'):
+        timings, state = run(backend, args.hosts, args.latency, args.concurrency)
+        states.append(state)
+        for label, elapsed, requests, changed, failed in timings:
+            print("%-8s %-8s %9.1f %9d %8d %6d" % (backend, label, elapsed, requests, changed, failed))
+    print("same objects on both backends: %s" % (states[0] == states[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Forks of a play working on a degraded central, with and without the
+# circuit breaker: each fork is a process running `tasks` tasks one after
+# the other, each task a client sending a few reads (with retries) to a
+# stand-in timing out or answering 503. Reports how long until every task
+# failed and how many requests reached the central, then how the breaker
+# closes again once the central recovers, and that a request sent before it
+# opened does not close it when answered late.
+#
+#   python3 contrib/bench/bench_breaker.py --forks 20 --tasks 5 --timeout 1
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.breaker import circuit_breaker  # noqa: E402
+from ansible.module_utils.centreon.client import CentreonAPIError  # noqa: E402
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def task(url, timeout, breaker, calls=3):
+    """ One module run: `calls` reads, stopping at the first failure """
+    client = new_client('v1', url, 'admin', 'centreon', timeout=timeout, retries=2,
+                        retry_delay=0.1)
+    client.breaker = circuit_breaker(client.url, breaker, timeout)
+    try:
+        for i in range(calls):
+            client.call('show', 'HOST', 'seed-%05d' % i)
+    except CentreonAPIError as e:
+        return 'refused' if 'Circuit breaker' in str(e) else 'failed'
+    return 'ok'
+
+
+def fork(url, tasks, timeout, breaker):
+    return [task(url, timeout, breaker) for _ in range(tasks)]
+
+
+def degrade(url, status, delay):
+    base = url.rsplit('/centreon', 1)[0]
+    urlopen('%s/standin/degrade?status=%d&delay=%s' % (base, status, delay), b'').read()
+
+
+def run(server, url, args, breaker, status, delay):
+    degrade(url, status, delay)
+    server.reset()
+    pool = multiprocessing.Pool(args.forks)
+    start = time.time()
+    outcomes = pool.starmap(fork, [(url, args.tasks, args.timeout, breaker)] * args.forks)
+    elapsed = time.time() - start
+    pool.close()
+    degrade(url, 0, 0)
+    return elapsed, server.stats['requests'], sum(outcomes, [])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--forks', type=int, default=20)
+    parser.add_argument('--tasks', type=int, default=5, help='tasks run by each fork')
+    parser.add_argument('--timeout', type=float, default=1.0, help='client timeout, in seconds')
+    parser.add_argument('--failures', type=int, default=5)
+    args = parser.parse_args()
+
+    server, url = serve(hosts=3)
+    state_dir = tempfile.mkdtemp()
+    breaker = dict(failures=args.failures, cooldown=5, state_dir=state_dir)
+
+    print("%d forks x %d tasks, %.1fs timeout, 2 retries" % (args.forks, args.tasks, args.timeout))
+    print("%-8s %-8s %9s %9s %s" % ('central', 'breaker', 'seconds', 'requests', 'outcomes'))
+    for label, status, delay in (('timeout', 0, args.timeout + 1), ('503', 503, 0)):
+        for options in (None, breaker):
+            shutil.rmtree(state_dir, ignore_errors=True)
+            elapsed, requests, outcomes = run(server, url, args, options, status, delay)
+            counts = ', '.join('%s=%d' % (o, outcomes.count(o)) for o in sorted(set(outcomes)))
+            print("%-8s %-8s %9.1f %9d %s" % (label, 'on' if options else 'off',
+                                              elapsed, requests, counts))
+
+    # recovery: refused during the cooldown, closed by the first probe after it
+    outcome = task(url, args.timeout, breaker)
+    time.sleep(breaker['cooldown'])
+    print("after recovery: during cooldown %s, after cooldown %s" % (
+        outcome, task(url, args.timeout, breaker)))
+
+    # a request sent while closed, answered once the breaker opened: still open
+    shutil.rmtree(state_dir, ignore_errors=True)
+    late = circuit_breaker(url, breaker)
+    sent = late.before()
+    for _ in range(args.failures):
+        late.failure(late.before(), 'bench')
+    late.success(sent, 0.1)
+    print("answered after opening: %s" % task(url, args.timeout, breaker))
+    shutil.rmtree(state_dir, ignore_errors=True)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Bytes transferred and wall time of big reads and of a bulk write over a
+# slow link, for each `compression` setting of the client: host listings
+# (full and compact on v1, paginated on v2) and the deletion of thousands of
+# hostgroups in a single v2 request, on the in-memory stand-in with a fixed
+# latency per request and a capped bandwidth.
+#
+#   python3 contrib/bench/bench_compression.py --hosts 5000 --bandwidth 1024
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def host_show(client):
+    return len(client.call('show', 'HOST'))
+
+
+def host_compact(client):
+    return len(client.show('HOST', ['name', 'address']))
+
+
+def hostgroup_delete(client):
+    names = [r.name for r in client.show('HG', ['name'])]
+    client.call_many('del', 'HG', names)
+    return len(names)
+
+
+RUNS = [
+    ('v1 HOST show', 'v1', host_show),
+    ('v1 HOST compact', 'v1', host_compact),
+    ('v2 HOST show', 'v2', host_show),
+    ('v2 HG bulk del', 'v2', hostgroup_delete),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--hostgroups', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=20.0, help='per request, in ms')
+    parser.add_argument('--bandwidth', type=float, default=1024.0, help='KiB per second')
+    args = parser.parse_args()
+
+    print("%d hosts, %d hostgroups, %.1fms per request, %.0f KiB/s"
+          % (args.hosts, args.hostgroups, args.latency, args.bandwidth))
+    print("%-16s %-10s %9s %12s %12s %9s" % (
+        'run', 'compress', 'requests', 'KiB up', 'KiB down', 'seconds'))
+    for label, backend, run in RUNS:
+        for compression in ('off', 'responses', 'all'):
+            server, url = serve(latency=args.latency / 1000.0, hosts=args.hosts,
+                                hostgroups=args.hostgroups, bandwidth=args.bandwidth * 1024)
+            client = new_client(backend, url, 'admin', 'centreon', compression=compression)
+            client.authenticate()
+            server.reset()
+            start = time.time()
+            run(client)
+            elapsed = time.time() - start
+            stats = server.stats
+            print("%-16s %-10s %9d %12.1f %12.1f %9.2f" % (
+                label, compression, stats['requests'], stats['received'] / 1024.0,
+                stats['sent'] / 1024.0, elapsed))
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
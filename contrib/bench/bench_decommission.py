@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Removal of hosts spread over 4 pollers: one centreon_host `state: absent`
+# per host (a delete and a reload of its poller each) against
+# centreon_decommission (bulk grouping, concurrent deletes, one reload per
+# poller), on the in-memory stand-in.
+#
+#   python3 contrib/bench/bench_decommission.py --hosts 300 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.decommission import (  # noqa: E402
+    delete_hosts, emptied, host_pollers, hostgroup_members, select_hosts
+)
+from ansible.module_utils.centreon.host import ensure_host  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def per_host(client, names, pollers, concurrency):
+    for name in names:
+        result = dict()
+        ensure_host(client, dict(name=name, instance=pollers[name], state='absent'), result)
+        client.call('APPLYCFG', values=result['instance'])
+
+
+def bulk(client, names, pollers, concurrency):
+    selected = select_hosts(client, names)
+    pollers = host_pollers(client, selected, concurrency)
+    members = hostgroup_members(client, selected, concurrency)
+    results = delete_hosts(client, selected, pollers, concurrency)
+    deleted = [r['name'] for r in results if r['changed']]
+    client.call_many('del', 'HG', emptied(members, deleted))
+    for poller in sorted(set(r['poller'] for r in results if r['changed'])):
+        client.call('APPLYCFG', values=poller)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    print("%d hosts removed out of %d, 4 pollers, %.1fms per request"
+          % (args.hosts, args.hosts * 2, args.latency))
+    print("%-15s %9s %9s %8s" % ('run', 'seconds', 'requests', 'reloads'))
+    for label, run in (('per host', per_host), ('decommission', bulk)):
+        server, url = serve(latency=args.latency / 1000.0, hosts=args.hosts * 2, pollers=4)
+        names = sorted(server.state.hosts)[:args.hosts]
+        pollers = dict((n, server.state.hosts[n]['instance']) for n in names)
+        client = new_client('v1', url, 'admin', 'centreon', pool_size=args.concurrency)
+        server.reset()
+        start = time.time()
+        run(client, names, pollers, args.concurrency)
+        elapsed = time.time() - start
+        reloads = sum(p['generation'] for p in server.state.instances.values())
+        assert not any(n in server.state.hosts for n in names)
+        print("%-15s %9.1f %9d %8d" % (label, elapsed, server.stats['requests'], reloads))
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Drift report of a fleet, 1% of its hosts drifting: centreon_drift (bulk
+# reads, on v1, v2 and v1 with a configuration export) against a check mode
+# centreon_host_bulk run, which reads each host, on the in-memory stand-in.
+#
+#   python3 contrib/bench/bench_drift.py --hosts 5000 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'library'))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+import centreon_host_bulk  # noqa: E402
+from ansible.module_utils.centreon.clapi_import import host_import  # noqa: E402
+from ansible.module_utils.centreon.common import known_facts, new_client  # noqa: E402
+from ansible.module_utils.centreon.drift import fleet_drift  # noqa: E402
+from ansible.module_utils.centreon.host import host_spec  # noqa: E402
+from ansible.module_utils.centreon.state import KnownState  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+STANDIN = os.path.join(ROOT, 'contrib', 'standin', 'clapi_standin.py')
+
+
+def host_specs(count, pollers):
+    return [dict(
+        name='srv-%05d' % i,
+        alias='Server %d' % i,
+        ipaddr='10.2.%d.%d' % (i // 250, i % 250),
+        hosttemplates=['generic-tpl-%d' % (i % 10)],
+        hostgroups=['hg-%d' % (i % 10)],
+        instance=pollers[i % len(pollers)],
+        macros=[dict(name='SNMPCOMMUNITY', value='public')],
+    ) for i in range(count)]
+
+
+def drifting(specs):
+    """ `specs` with one host in 100 changed """
+    specs = [dict(s) for s in specs]
+    for i in range(0, len(specs), 100):
+        specs[i]['ipaddr'] = '10.9.9.9'
+        specs[i]['hostgroups'] = specs[i]['hostgroups'] + ['hg-0']
+    return specs
+
+
+PARAMS = dict(api_retries=0, lookup_threshold=20, pollers=[], balance_by='hosts', applycfg=False,
+              resume=False, write_mode='api', import_chunk_size=1000, backend='v1',
+              preflight=False, macros_inherit=False, compression='responses', fingerprint_dir=None)
+
+
+def run(server, url, label, specs, concurrency):
+    server.reset()
+    start = time.time()
+    if label == 'check mode':
+        central = dict(name='bench', url=url, username='admin', password='centreon')
+        results = centreon_host_bulk.run_central(
+            central, specs, dict(PARAMS, concurrency=concurrency), None, check_mode=True)[0]
+        drifted = len([r for r in results if r['changed']])
+    else:
+        backend = 'v2' if label == 'drift v2' else 'v1'
+        client = new_client(backend, url, 'admin', 'centreon', pool_size=concurrency)
+        if label == 'drift export':
+            command = '%s %s --export %s {select}' % (sys.executable, STANDIN, url.rsplit('/', 1)[0])
+            client.known_state = KnownState(known_facts(client, command=command))
+        drifted = fleet_drift(client, specs, concurrency=concurrency)['summary']['drifted']
+    return time.time() - start, server.stats['requests'], drifted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.latency / 1000.0, pollers=4)
+    specs = host_specs(args.hosts, sorted(server.state.instances))
+    errors = server.state.import_lines(host_import([host_spec(s) for s in specs],
+                                                   server.state.hostgroups).lines())
+    assert not errors, errors[:3]
+    specs = drifting(specs)
+
+    print("%d hosts, %d drifting, %.1fms per request, concurrency %d"
+          % (args.hosts, len(range(0, args.hosts, 100)), args.latency, args.concurrency))
+    print("%-13s %9s %9s %8s" % ('run', 'seconds', 'requests', 'drifted'))
+    try:
+        for label in ('check mode', 'drift v1', 'drift v2', 'drift export'):
+            elapsed, requests, drifted = run(server, url, label, specs, args.concurrency)
+            print("%-13s %9.1f %9d %8d" % (label, elapsed, requests, drifted))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
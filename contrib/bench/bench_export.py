@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# No-op run of centreon_host_bulk on hosts already in the expected state,
+# with per-object reads against reads answered by a configuration export,
+# on the in-memory stand-in.
+#
+#   python3 contrib/bench/bench_export.py --hosts 5000 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'library'))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+import centreon_host_bulk  # noqa: E402
+from ansible.module_utils.centreon.clapi_import import host_import  # noqa: E402
+from ansible.module_utils.centreon.host import host_spec  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+STANDIN = os.path.join(ROOT, 'contrib', 'standin', 'clapi_standin.py')
+
+
+def host_specs(count, pollers):
+    return [host_spec(dict(
+        name='srv-%05d' % i,
+        alias='Server %d' % i,
+        ipaddr='10.2.%d.%d' % (i // 250, i % 250),
+        hosttemplates=['generic-tpl-%d' % (i % 10)],
+        hostgroups=['hg-%d' % (i % 10)],
+        instance=pollers[i % len(pollers)],
+        macros=[dict(name='SNMPCOMMUNITY', value='public')],
+        params=[dict(name='notes_url', value='https://wiki/%d' % i)],
+    )) for i in range(count)]
+
+
+PARAMS = dict(api_retries=0, lookup_threshold=20, pollers=[], balance_by='hosts', applycfg=True,
+              resume=False, write_mode='api', import_chunk_size=1000, backend='v1',
+              preflight=True, macros_inherit=False, compression='responses', fingerprint_dir=None)
+
+
+def run(label, count, latency, concurrency, export):
+    server, url = serve(latency=latency / 1000.0, pollers=4)
+    specs = host_specs(count, sorted(server.state.instances))
+    errors = server.state.import_lines(host_import(specs, server.state.hostgroups).lines())
+    assert not errors, errors[:3]
+
+    central = dict(name='bench', url=url, username='admin', password='centreon')
+    if export:
+        central['export_command'] = '%s %s --export %s {select}' % (
+            sys.executable, STANDIN, url.rsplit('/', 1)[0])
+    start = time.time()
+    results, applied, client, lines = centreon_host_bulk.run_central(
+        central, specs, dict(PARAMS, concurrency=concurrency), None)
+    elapsed = time.time() - start
+    stats = dict(server.stats)
+    server.shutdown()
+    return dict(label=label, elapsed=elapsed, requests=stats['requests'], sent=stats['sent'],
+                changed=len([r for r in results if r['changed']]),
+                failed=len([r for r in results if r.get('failed')]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    print("no-op run of %d hosts, %.1fms per request, concurrency %d"
+          % (args.hosts, args.latency, args.concurrency))
+    print("%-10s %9s %9s %11s %8s %6s" % ('reads', 'seconds', 'requests', 'bytes in', 'changed', 'failed'))
+    for label, export in (('api', False), ('export', True)):
+        r = run(label, args.hosts, args.latency, args.concurrency, export)
+        print("%-10s %9.1f %9d %11d %8d %6d" % (
+            r['label'], r['elapsed'], r['requests'], r['sent'], r['changed'], r['failed']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Onboarding benchmark of centreon_host_bulk: per-call API writes against
+# CLAPI import files, on the in-memory stand-in.
+#
+#   python3 contrib/bench/bench_import.py --hosts 5000 --latency 2
+#
+# Each mode starts from a fresh stand-in with the same seeded pollers,
+# templates and hostgroups. --latency is added to every HTTP request, to
+# stand for the network and the PHP side of a real central.
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'library'))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+import requests  # noqa: E402
+import centreon_host_bulk  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def host_specs(count):
+    return [dict(
+        name='onboard-%05d' % i,
+        alias='Onboarded %d' % i,
+        ipaddr='10.1.%d.%d' % (i // 250, i % 250),
+        hosttemplates=['generic-tpl-%d' % (i % 10)],
+        hostgroups=['hg-%d' % (i % 10), 'hg-%d' % ((i + 1) % 10)],
+        instance='auto',
+        macros=[dict(name='SNMPCOMMUNITY', value='public'),
+                dict(name='OWNER', value='team-%d' % (i % 7))],
+        params=[dict(name='notes_url', value='https://wiki/%d' % i)],
+    ) for i in range(count)]
+
+
+PARAMS = dict(concurrency=4, api_retries=0, lookup_threshold=20, pollers=[],
+              balance_by='hosts', applycfg=True, resume=False, import_chunk_size=1000, backend='v1',
+              preflight=True, macros_inherit=False, compression='responses', fingerprint_dir=None)
+
+
+def run(mode, count, latency, concurrency):
+    server, url = serve(latency=latency / 1000.0, pollers=4)
+    params = dict(PARAMS, write_mode=mode, concurrency=concurrency)
+    central = dict(name='bench', url=url, username='admin', password='centreon')
+
+    def runner(content):
+        r = requests.post(url.rsplit('/', 1)[0] + '/standin/import', data=content.encode('utf-8'))
+        r.raise_for_status()
+
+    start = time.time()
+    results, applied, client, lines = centreon_host_bulk.run_central(
+        central, host_specs(count), params, None, runner=runner)
+    elapsed = time.time() - start
+
+    failed = [r for r in results if r.get('failed')]
+    state = server.state
+    created = len([h for h in state.hosts if h.startswith('onboard-')])
+    memberships = sum(len(hg['members']) for hg in state.hostgroups.values())
+    macros = sum(len(h['macros']) for h in state.hosts.values())
+    stats = dict(server.stats)
+    server.shutdown()
+    return dict(mode=mode, elapsed=elapsed, requests=stats['requests'],
+                sent=stats['sent'], received=stats['received'], lines=len(lines),
+                failed=len(failed), created=created, memberships=memberships,
+                macros=macros, applied=applied)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    print("%d hosts, %.1fms per request, concurrency %d"
+          % (args.hosts, args.latency, args.concurrency))
+    print("%-7s %9s %9s %11s %11s %7s %8s %7s %7s %6s" % (
+        'mode', 'seconds', 'requests', 'bytes out', 'bytes in', 'lines', 'created',
+        'members', 'macros', 'failed'))
+    for mode in ('api', 'import'):
+        r = run(mode, args.hosts, args.latency, args.concurrency)
+        print("%-7s %9.1f %9d %11d %11d %7d %8d %7d %7d %6d" % (
+            r['mode'], r['elapsed'], r['requests'], r['received'], r['sent'],
+            r['lines'], r['created'], r['memberships'], r['macros'], r['failed']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Existence checks of a few to many hostgroup names against a central with
+# thousands of hostgroups, as centreon_hostgroup runs them: one filtered
+# SHOW per name below `lookup_threshold`, a single full listing above.
+#
+#   python3 contrib/bench/bench_lookup.py --hostgroups 3000 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def run(server, url, backend, names, threshold):
+    client = new_client(backend, url, 'admin', 'centreon', lookup_threshold=threshold)
+    client.authenticate()
+    server.reset()
+    start = time.time()
+    found = client.exists('HG', names)
+    return time.time() - start, server.stats['requests'], server.stats['sent'], len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hostgroups', type=int, default=3000)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--threshold', type=int, default=20)
+    args = parser.parse_args()
+
+    server, url = serve(latency=args.latency / 1000.0, hostgroups=args.hostgroups)
+    print("%d hostgroups, %.1fms per request" % (args.hostgroups, args.latency))
+    print("%-8s %6s %-9s %9s %9s %10s %6s" % ('backend', 'names', 'lookup', 'seconds',
+                                             'requests', 'bytes in', 'found'))
+    for backend in ('v1', 'v2'):
+        for count in (1, 5, 20, 100):
+            names = ['hg-%d' % (i * 7) for i in range(count)]
+            for label, threshold in (('list', 0), ('filtered', args.threshold)):
+                elapsed, requests, sent, found = run(server, url, backend, names, threshold)
+                print("%-8s %6d %-9s %9.3f %9d %10d %6d" % (backend, count, label, elapsed,
+                                                           requests, sent, found))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Hosts declaring macros their templates already provide (3 of 4 here),
+# onboarded with and without macros_inherit, then a no-op run, then the
+# hosts onboarded without it run again with it (removing the copies).
+# Reports the macro rows left on the hosts and the overrides avoided.
+#
+#   python3 contrib/bench/bench_macros.py --hosts 1000 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'library'))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+import centreon_host_bulk  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+TEMPLATE_MACROS = dict(SNMPCOMMUNITY='public', SNMPVERSION='2c', SNMPPORT='161')
+
+
+def host_specs(count):
+    return [dict(
+        name='srv-%05d' % i,
+        ipaddr='10.4.%d.%d' % (i // 250, i % 250),
+        hosttemplates=['generic-tpl-%d' % (i % 10)],
+        instance='Central',
+        macros=[dict(name=k, value=v) for k, v in sorted(TEMPLATE_MACROS.items())] +
+               [dict(name='OWNER', value='team-%d' % (i % 7))],
+    ) for i in range(count)]
+
+
+PARAMS = dict(api_retries=0, lookup_threshold=20, pollers=[], balance_by='hosts', applycfg=False,
+              resume=False, write_mode='api', import_chunk_size=1000, preflight=False,
+              backend='v1', compression='responses', fingerprint_dir=None)
+
+
+def run(server, url, count, concurrency, inherit):
+    central = dict(name='bench', url=url, username='admin', password='centreon')
+    params = dict(PARAMS, concurrency=concurrency, macros_inherit=inherit)
+    server.reset()
+    start = time.time()
+    results = centreon_host_bulk.run_central(central, host_specs(count), params, None)[0]
+    rows = sum(len(h['macros']) for h in server.state.hosts.values())
+    return (time.time() - start, server.stats['requests'], rows,
+            sum(r.get('overrides_avoided', 0) for r in results),
+            len([r for r in results if r.get('failed')]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    print("%d hosts, %d macros each (%d inherited), %.1fms per request" % (
+        args.hosts, len(TEMPLATE_MACROS) + 1, len(TEMPLATE_MACROS), args.latency))
+    print("%-8s %-9s %9s %9s %11s %8s %6s" % ('inherit', 'run', 'seconds', 'requests',
+                                              'macro rows', 'avoided', 'failed'))
+    for inherit in (False, True):
+        server, url = serve(latency=args.latency / 1000.0)
+        for t in server.state.htpl.values():
+            t['macros'].update(TEMPLATE_MACROS)
+        runs = [('onboard', inherit), ('no-op', inherit)]
+        if not inherit:
+            runs.append(('cleanup', True))
+        for label, mode in runs:
+            elapsed, requests, rows, avoided, failed = run(server, url, args.hosts,
+                                                           args.concurrency, mode)
+            print("%-8s %-9s %9.1f %9d %11d %8d %6d" % ('on' if mode else 'off', label, elapsed,
+                                                       requests, rows, avoided, failed))
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Peak memory of big listings: the names of every host and the number of
+# services of every host (the balance_by: services input), read with
+# call('show') (whole response, a dict per object) or with show() (parsed
+# while read, records of the fields used). Each measure runs in its own
+# process, against a stand-in running in another one.
+#
+#   python3 contrib/bench/bench_memory.py --hosts 50000
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+STANDIN = os.path.join(ROOT, 'contrib', 'standin', 'clapi_standin.py')
+
+
+def measure(url, mode, listing):
+    """ Child process: (peak RSS growth in MB, seconds, objects) of one read """
+    import ansible.module_utils
+    ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+    from ansible.module_utils.centreon.common import new_client
+    from ansible.module_utils.centreon.pollers import host_service_counts
+
+    client = new_client('v1', url, 'admin', 'centreon', timeout=300)
+    client.authenticate()
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    if listing == 'hosts' and mode == 'call':
+        result = [h['name'] for h in client.call('show', 'HOST')]
+    elif listing == 'hosts':
+        result = [h.name for h in client.show('HOST', ['name'])]
+    elif mode == 'call':
+        result = {}
+        for svc in client.call('show', 'SERVICE'):
+            result[svc['host name']] = result.get(svc['host name'], 0) + 1
+    else:
+        result = host_service_counts(client)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("%.1f %.2f %d" % ((peak - base) / 1024.0, elapsed, len(result)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=50000)
+    parser.add_argument('--port', type=int, default=18099)
+    parser.add_argument('--child', nargs=3, metavar=('URL', 'MODE', 'LISTING'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(*args.child)
+
+    server = subprocess.Popen([sys.executable, STANDIN, '--port', str(args.port),
+                               '--hosts', str(args.hosts), '--pollers', '4'],
+                              stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        server.stdout.readline()
+        url = 'http://127.0.0.1:%d/centreon' % args.port
+        print("%d hosts, 3 services each" % args.hosts)
+        print("%-9s %-6s %12s %9s %9s" % ('listing', 'read', 'peak MB', 'seconds', 'objects'))
+        for listing in ('hosts', 'services'):
+            for mode in ('call', 'show'):
+                out = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                               '--child', url, mode, listing],
+                                              universal_newlines=True)
+                peak, elapsed, count = out.split()
+                print("%-9s %-6s %12s %9s %9s" % (listing, mode, peak, elapsed, count))
+    finally:
+        server.terminate()
+
+
+if __name__ == '__main__':
+    main()
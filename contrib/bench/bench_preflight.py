@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Pre-flight checks of centreon_host, centreon_host_template and
+# centreon_service_template on existing objects, on the in-memory stand-in:
+# requests of a run with nothing to change, with and without `preflight`,
+# and writes sent by an update also adding a missing reference (an alias
+# change, a new template and a missing hostgroup or command), which must be
+# none.
+#
+#   python3 contrib/bench/bench_preflight.py --latency 2
+
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.client import CentreonAPIError, is_write_action  # noqa: E402
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.host import ensure_host, ensure_host_template  # noqa: E402
+from ansible.module_utils.centreon.service_template import ensure_service_template  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+# ensure function, spec of the existing object, update with a missing reference
+OBJECTS = (
+    ('host', lambda c, s, r, p: ensure_host(c, s, r, parallel=True, preflight=p),
+     dict(name='seed-00000', alias='Seed', hosttemplates=['generic-tpl-1'],
+          hostgroups=['hg-1'], instance='Central'),
+     dict(alias='Changed', hosttemplates=['generic-tpl-5'], hostgroups=['no-such-hg'])),
+    ('host template', lambda c, s, r, p: ensure_host_template(c, s, r, parallel=True, preflight=p),
+     dict(name='tpl-preflight', alias='Template', hosttemplates=['generic-tpl-1']),
+     dict(alias='Changed', hosttemplates=['generic-tpl-5'],
+          params=[dict(name='check_command', value='no-such-cmd!1')])),
+    ('service template', lambda c, s, r, p: ensure_service_template(c, s, r, preflight=p),
+     dict(name='stpl-preflight', alias='Service', hosttemplates=['generic-tpl-1']),
+     dict(alias='Changed', hosttemplates=['generic-tpl-1', 'no-such-tpl'])),
+)
+
+
+def run(server, url, backend, ensure, spec, preflight):
+    """ (requests, writes, error) of one module run of `spec` """
+    client = new_client(backend, url, 'admin', 'centreon')
+    client.authenticate()
+    server.reset()
+    error = None
+    try:
+        ensure(client, spec, dict(), preflight)
+    except CentreonAPIError as e:
+        error = str(e)
+    writes = [r for r in client.stats()['calls']
+              if r[0] != 'authenticate' and is_write_action(r[0])]
+    return server.stats['requests'], len(writes), error
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    args = parser.parse_args()
+
+    print("%-8s %-17s %14s %14s %8s" % ('backend', 'object', 'no-op requests', 'with preflight',
+                                        'writes'))
+    for backend in ('v1', 'v2'):
+        server, url = serve(latency=args.latency / 1000.0, hosts=1)
+        for label, ensure, spec, broken in OBJECTS:
+            run(server, url, backend, ensure, spec, False)
+            plain = run(server, url, backend, ensure, spec, False)[0]
+            checked = run(server, url, backend, ensure, spec, True)[0]
+            assert checked == plain, (backend, label, plain, checked)
+            _, writes, error = run(server, url, backend, ensure, dict(spec, **broken), True)
+            assert error and error.startswith('Pre-flight check failed'), (backend, label, error)
+            assert writes == 0, (backend, label, writes)
+            print("%-8s %-17s %14d %14d %8d" % (backend, label, plain, checked, writes))
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# A series of deployments over 4 pollers, each followed by an apply on every
+# poller while only one deployment in 3 changes a host, of a single poller:
+# APPLYCFG on each poller (`reload: always`) against generation and
+# fingerprint, the rest only when the fingerprint changed (`reload:
+# changed`), on the in-memory stand-in.
+#
+#   python3 contrib/bench/bench_reload.py --deployments 30 --latency 2
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.generation import Fingerprints, apply_if_changed  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def deploy(client, server, i):
+    """ Deployment `i`: one in 3 changes the alias of a host """
+    if i % 3 == 0:
+        name = sorted(server.state.hosts)[i % len(server.state.hosts)]
+        client.call('setparam', 'HOST', [name, 'alias', 'Deployment %d' % i])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--deployments', type=int, default=30)
+    parser.add_argument('--hosts', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    args = parser.parse_args()
+
+    print("%d deployments, %d hosts on 4 pollers, %.1fms per request"
+          % (args.deployments, args.hosts, args.latency))
+    print("%-15s %9s %9s %8s" % ('reload', 'seconds', 'requests', 'reloads'))
+    for mode in ('always', 'changed'):
+        server, url = serve(latency=args.latency / 1000.0, hosts=args.hosts, pollers=4)
+        client = new_client('v1', url, 'admin', 'centreon')
+        client.authenticate()
+        pollers = dict((r.name, r.id) for r in client.show('INSTANCE', ['name', 'id']))
+        # curl starts faster than the --generated mode of the stand-in script
+        command = "curl -sf '%s/standin/generated?poller={poller}'" % url.rsplit('/', 1)[0]
+        state_dir = tempfile.mkdtemp(prefix='bench-reload-')
+        fingerprints = Fingerprints(url, state_dir)
+        server.reset()
+        start = time.time()
+        for i in range(args.deployments):
+            deploy(client, server, i)
+            for poller in sorted(pollers):
+                if mode == 'always':
+                    client.call('APPLYCFG', values=poller)
+                else:
+                    apply_if_changed(client, poller, pollers[poller], command, fingerprints)
+        elapsed = time.time() - start
+        reloads = sum(p['reloads'] for p in server.state.instances.values())
+        print("%-15s %9.1f %9d %8d" % (mode, elapsed, server.stats['requests'], reloads))
+        shutil.rmtree(state_dir)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Update of existing hosts, one at a time as centreon_host does, each
+# changing its alias, address, hostgroups, templates, a macro and two
+# params: sections run in order against sections run in threads
+# (`parallel`), on the in-memory stand-in with a fixed latency per request.
+#
+#   python3 contrib/bench/bench_sections.py --hosts 20 --latency 20
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.host import ensure_host  # noqa: E402
+from clapi_standin import serve  # noqa: E402
+
+
+def update(i):
+    return dict(
+        name='seed-%05d' % i,
+        alias='Updated %d' % i,
+        ipaddr='10.8.%d.%d' % (i // 250, i % 250),
+        hostgroups=['hg-%d' % ((i + 1) % 10)],
+        hosttemplates=['generic-tpl-%d' % ((i + 1) % 10)],
+        instance='Central',
+        macros=[dict(name='OWNER', value='team-%d' % i)],
+        params=[dict(name='notes_url', value='https://wiki/%d' % i),
+                dict(name='notes', value='host %d' % i)],
+    )
+
+
+def run(backend, parallel, count, latency):
+    server, url = serve(latency=latency / 1000.0, hosts=count)
+    client = new_client(backend, url, 'admin', 'centreon')
+    client.authenticate()
+    server.reset()
+    start = time.time()
+    changed = 0
+    for i in range(count):
+        result = dict()
+        ensure_host(client, update(i), result, parallel=parallel)
+        changed += result['changed']
+        # the next run starts from an empty cache, as a new module process would
+        if backend == 'v2':
+            client.details.clear()
+    elapsed = time.time() - start
+    requests = server.stats['requests']
+    server.shutdown()
+    return elapsed * 1000.0 / count, float(requests) / count, changed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hosts', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=20.0, help='per request, in ms')
+    args = parser.parse_args()
+
+    print("%d host updates, %.1fms per request" % (args.hosts, args.latency))
+    print("%-8s %-10s %12s %14s %8s" % ('backend', 'sections', 'ms per host', 'requests/host', 'changed'))
+    for backend in ('v1', 'v2'):
+        for parallel in (False, True):
+            ms, requests, changed = run(backend, parallel, args.hosts, args.latency)
+            print("%-8s %-10s %12.0f %14.1f %8d" % (
+                backend, 'parallel' if parallel else 'in order', ms, requests, changed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Startup cost of each module: size of the AnsiballZ payload sent to the
+# target, and the time from the start of the process to the first API call
+# (unpacking and imports, argument parsing, client construction), then to
+# the end of the run.
+#
+# The payloads are built once by ansible-playbook (ANSIBLE_KEEP_REMOTE_FILES),
+# in check mode, then each one is run `--runs` times against a stand-in and
+# the median is reported. The last line is a run answered by known_state,
+# sending no request. Process startup varies a lot from run to run: to
+# compare with a previous release, give its checkout as `--baseline`, both
+# are then run one after the other:
+#
+#   git worktree add /tmp/previous v0.2
+#   python3 contrib/bench/bench_startup.py --runs 15 --baseline /tmp/previous
+
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+from clapi_standin import serve  # noqa: E402
+
+# arguments of each module, besides the connection ones
+MODULES = [
+    ('centreon_facts', "gather_subset: [hostgroups, pollers]"),
+    ('centreon_hostgroup', "hg: [{name: hg-1}, {name: hg-2}]"),
+    ('centreon_host', "name: seed-00001\n        instance: Poller-1"),
+    ('centreon_host_bulk', "hosts: [{name: seed-00001, instance: Poller-1}, {name: seed-00002}]"),
+    ('centreon_host_template', "name: HTPL-bench"),
+    ('centreon_service_template', "name: STPL-bench"),
+    ('centreon_service_template_bulk', "templates: [{name: STPL-bulk}, {name: STPL-bulk-child, parenttemplate: STPL-bulk}]"),
+    ('centreon_poller', "instance: Poller-1\n        action: rebalance"),
+    ('centreon_decommission', "hosts: [seed-00001, seed-00002]"),
+    ('centreon_drift', "hosts: [{name: seed-00001, hostgroups: [hg-1]}, {name: seed-00002}]"),
+]
+
+# a second centreon_hostgroup task, answered by its snapshot
+KNOWN_STATE = ('centreon_hostgroup', "hg: [{name: hg-1}, {name: hg-2}]\n        known_state:"
+               " {hostgroups: {hg-1: {name: hg-1}, hg-2: {name: hg-2}}}")
+
+PLAYBOOK = """
+- hosts: localhost
+  connection: local
+  gather_facts: false
+  check_mode: true
+  tasks:
+%s
+"""
+
+TASK = """    - %s:
+        url: %s
+        username: admin
+        password: centreon
+        %s
+"""
+
+
+def build(url, workdir, root=ROOT):
+    """ {module: paths of the AnsiballZ payloads of the role in `root`, in task order} """
+    os.makedirs(workdir)
+    playbook = os.path.join(workdir, 'startup.yml')
+    with open(playbook, 'w') as f:
+        f.write(PLAYBOOK % ''.join(TASK % (m, url, args) for m, args in MODULES + [KNOWN_STATE]))
+    env = dict(os.environ,
+               ANSIBLE_LIBRARY=os.path.join(root, 'library'),
+               ANSIBLE_MODULE_UTILS=os.path.join(root, 'module_utils'),
+               ANSIBLE_KEEP_REMOTE_FILES='1',
+               ANSIBLE_REMOTE_TMP=os.path.join(workdir, 'remote'),
+               ANSIBLE_LOCALHOST_WARNING='0',
+               ANSIBLE_INVENTORY_UNPARSED_WARNING='0')
+    play = subprocess.Popen(['ansible-playbook', playbook], env=env, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+    output = play.communicate()[0]
+    if play.returncode:
+        sys.exit(output)
+    payloads = {}
+    paths = glob.glob(os.path.join(workdir, 'remote', '*', 'AnsiballZ_*.py'))
+    for path in sorted(paths, key=os.path.getmtime):
+        module = os.path.basename(path)[len('AnsiballZ_'):-len('.py')]
+        payloads.setdefault(module, []).append(path)
+    return payloads
+
+
+def run(server, payload):
+    """ (seconds to the first API call, seconds to the end) of one run """
+    server.reset()
+    start = time.time()
+    subprocess.check_call([sys.executable, payload], stdout=subprocess.DEVNULL)
+    end = time.time()
+    first = server.stats['first']
+    return (first - start if first else None), end - start
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def rows(payloads):
+    """ [(label, payload)] of the measured runs """
+    result = [(m, payloads[m][0]) for m, _ in MODULES]
+    result.append(('hostgroup, known_state', payloads[KNOWN_STATE[0]][1]))
+    return result
+
+
+def line(label, payload, runs):
+    first = [r[0] for r in runs if r[0] is not None]
+    return "%-30s %12.1f %14s %10.0f" % (
+        label, os.path.getsize(payload) / 1024.0,
+        '%.0f' % (median(first) * 1000) if first else '-',
+        median([r[1] for r in runs]) * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--baseline', metavar='DIR',
+                        help='checkout of the role to compare with, run alternately')
+    args = parser.parse_args()
+
+    server, url = serve(hosts=100, pollers=2)
+    workdir = tempfile.mkdtemp()
+    try:
+        current = rows(build(url, os.path.join(workdir, 'current')))
+        baseline = None
+        if args.baseline:
+            baseline = rows(build(url, os.path.join(workdir, 'baseline'), args.baseline))
+        print("median of %d runs, python %s" % (args.runs, sys.version.split()[0]))
+        print("%-30s %12s %14s %10s" % ('module', 'payload KB', 'first call ms', 'run ms'))
+        for i, (label, payload) in enumerate(current):
+            runs, previous = [], []
+            for _ in range(args.runs):
+                runs.append(run(server, payload))
+                if baseline:
+                    previous.append(run(server, baseline[i][1]))
+            print(line(label, payload, runs))
+            if baseline:
+                print(line('  baseline', baseline[i][1], previous))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
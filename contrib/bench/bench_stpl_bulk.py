@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Deployment of service templates in chains of 4 (a base template, its
+# child, grandchild, ...), each with an alias, a macro and a param: one
+# centreon_service_template per template, in parent order, against
+# centreon_service_template_bulk (one listing, levels in parallel), on the
+# in-memory stand-in.
+#
+#   python3 contrib/bench/bench_stpl_bulk.py --templates 400 --latency 2
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(ROOT, 'contrib', 'standin'))
+
+import ansible.module_utils  # noqa: E402
+ansible.module_utils.__path__.append(os.path.join(ROOT, 'module_utils'))
+
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.service_template import (  # noqa: E402
+    deploy_levels, ensure_service_template, service_template_spec, template_levels
+)
+from clapi_standin import serve  # noqa: E402
+
+DEPTH = 4
+
+
+def template_specs(count):
+    specs = list()
+    for i in range(count):
+        chain, depth = divmod(i, DEPTH)
+        specs.append(service_template_spec(dict(
+            name='stpl-%04d-%d' % (chain, depth),
+            alias='Chain %d level %d' % (chain, depth),
+            parenttemplate='stpl-%04d-%d' % (chain, depth - 1) if depth else None,
+            macros=[dict(name='WARNING', value=str(80 + depth))],
+            params=[dict(name='max_check_attempts', value='3')],
+        )))
+    return specs
+
+
+def per_template(client, specs, concurrency):
+    for spec in specs:
+        ensure_service_template(client, spec, dict())
+
+
+def bulk(client, specs, concurrency):
+    results = deploy_levels(client, template_levels(specs), concurrency)
+    assert not any(r.get('failed') for r in results), [r for r in results if r.get('failed')][:3]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--templates', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=2.0, help='per request, in ms')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    specs = template_specs(args.templates)
+    print("%d service templates in chains of %d, %.1fms per request"
+          % (args.templates, DEPTH, args.latency))
+    print("%-15s %-8s %9s %9s" % ('run', 'state', 'seconds', 'requests'))
+    for label, run in (('per template', per_template), ('bulk', bulk)):
+        server, url = serve(latency=args.latency / 1000.0)
+        client = new_client('v1', url, 'admin', 'centreon', pool_size=args.concurrency)
+        client.authenticate()
+        # a first run creates the templates, a second one finds them in sync
+        for state in ('new', 'in sync'):
+            server.reset()
+            start = time.time()
+            run(client, specs, args.concurrency)
+            elapsed = time.time() - start
+            print("%-15s %-8s %9.1f %9d" % (label, state, elapsed, server.stats['requests']))
+        assert len(server.state.stpl) == args.templates
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
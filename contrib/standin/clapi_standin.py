@@ -0,0 +1,968 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# In-memory stand-in for the Centreon web API: v1 (`centreon_clapi`
+# endpoint) and v2 (`/api/latest` configuration endpoints), sharing the same
+# objects.
+#
+# It implements the CLAPI actions and v2 endpoints used by the centreon_*
+# modules, plus:
+#
+#   POST /standin/import   apply a CLAPI import file (body), like `centreon -i`
+#   GET  /standin/export   CLAPI export of HTPL, HG, HOST and STPL objects,
+#                          like `centreon -e`, `select=OBJECT;name` to filter
+#   GET  /standin/generated  engine configuration of `poller` as of its last
+#                          generation, headed by the date of the generation
+#   GET  /standin/stats    requests and bytes served so far, time of the
+#                          first request
+#   POST /standin/reset    forget the counters
+#   POST /standin/degrade  answer the API with `status` (503, ...) after
+#                          `delay` seconds, `status=0&delay=0` to recover
+#
+# Answers of 1 KiB or more are gzipped for clients accepting it, and gzipped
+# request bodies are taken, or refused with a 415 with --plain-requests.
+# --bandwidth caps the bytes per second of each transfer, as a WAN link would;
+# the stats count the bytes as transferred.
+#
+# It is meant for benchmarks and offline runs of the modules, not as a
+# faithful emulation of Centreon: only the fields the modules read are kept.
+#
+#   python3 contrib/standin/clapi_standin.py --port 8080 --latency 5 --hosts 1000
+#
+# then point the modules at url: http://127.0.0.1:8080/centreon. With
+# --export, the script prints the export of a running stand-in instead, as a
+# stand-in for `centreon -e` in export_command:
+#
+#   python3 contrib/standin/clapi_standin.py --export http://127.0.0.1:8080 {select}
+#
+# and with --generated, the last generated configuration of a poller, for
+# the fingerprint_command of centreon_poller:
+#
+#   python3 contrib/standin/clapi_standin.py --generated http://127.0.0.1:8080 --poller {poller}
+
+import argparse
+import json
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs, quote
+    from urllib.request import urlopen
+except ImportError:
+    raise SystemExit("python 3.7+ is required")
+
+
+class ClapiError(Exception):
+
+    def __init__(self, msg, status=404):
+        Exception.__init__(self, msg)
+        self.status = status
+
+
+def _split(values):
+    return values.split(';') if values else []
+
+
+class State(object):
+    """ Configuration objects, indexed by name """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.next_id = 1
+        self.hosts = {}
+        self.htpl = {}
+        self.stpl = {}
+        self.hostgroups = {}
+        self.instances = {}
+        self.commands = {}
+        self.services = {}
+
+    def _id(self):
+        self.next_id += 1
+        return str(self.next_id)
+
+    # -- seeding
+
+    def seed(self, hosts=0, pollers=1, hostgroups=10, templates=10):
+        self.add_instance('Central')
+        for i in range(1, pollers):
+            self.add_instance('Poller-%d' % i)
+        for i in range(templates):
+            self.htpl_add(['generic-tpl-%d' % i, 'Template %d' % i, '', '', '', ''])
+        for i in range(hostgroups):
+            self.hg_add(['hg-%d' % i, 'Hostgroup %d' % i])
+        pollers = sorted(self.instances)
+        for i in range(hosts):
+            self.host_add([
+                'seed-%05d' % i, 'Seed %d' % i, '10.0.%d.%d' % (i // 250, i % 250),
+                'generic-tpl-%d' % (i % max(1, templates)) if templates else '',
+                pollers[i % len(pollers)],
+                'hg-%d' % (i % max(1, hostgroups)) if hostgroups else ''
+            ])
+            # as if its template had been applied
+            self.services['seed-%05d' % i] = 3 if templates else 0
+
+    def add_instance(self, name):
+        self.instances[name] = dict(id=self._id(), name=name, activate='1',
+                                    localhost='1' if name == 'Central' else '0',
+                                    generation=0, reloads=0, generated=None)
+
+    # -- lookups
+
+    def _get(self, index, name, kind):
+        if name not in index:
+            raise ClapiError("Object not found: %s %s" % (kind, name))
+        return index[name]
+
+    @staticmethod
+    def _show(index, values, fields):
+        pattern = values.split(';')[0] if values else None
+        result = []
+        for name in sorted(index):
+            if pattern and pattern.lower() not in name.lower():
+                continue
+            result.append(dict((f, index[name].get(f)) for f in fields))
+        return result
+
+    # -- HOST / HTPL
+
+    def _host_like(self, name, alias, address, templates):
+        return dict(id=self._id(), name=name, alias=alias, address=address,
+                    activate='1', templates=[t for t in templates.split('|') if t],
+                    hostgroups=[], macros={}, params={}, instance=None)
+
+    def host_add(self, v):
+        name, alias, address, templates, instance, hostgroups = (v + [''] * 6)[:6]
+        if name in self.hosts:
+            raise ClapiError("Object already exists (%s)" % name, 409)
+        for t in [t for t in templates.split('|') if t]:
+            self._get(self.htpl, t, 'HTPL')
+        self._get(self.instances, instance, 'INSTANCE')
+        for hg in [h for h in hostgroups.split('|') if h]:
+            self._get(self.hostgroups, hg, 'HG')
+        host = self._host_like(name, alias, address, templates)
+        host['instance'] = instance
+        self.hosts[name] = host
+        for hg in [h for h in hostgroups.split('|') if h]:
+            self._link_hg(name, hg)
+
+    def htpl_add(self, v):
+        name, alias, address, templates = (v + [''] * 4)[:4]
+        if name in self.htpl:
+            raise ClapiError("Object already exists (%s)" % name, 409)
+        tpl = self._host_like(name, alias, address, templates)
+        tpl['parents'] = tpl.pop('templates')
+        self.htpl[name] = tpl
+
+    def _link_hg(self, host, hg):
+        if hg not in self.hosts[host]['hostgroups']:
+            self.hosts[host]['hostgroups'].append(hg)
+        if host not in self.hostgroups[hg]['members']:
+            self.hostgroups[hg]['members'].append(host)
+
+    def _unlink_hg(self, host, hg):
+        if hg in self.hosts[host]['hostgroups']:
+            self.hosts[host]['hostgroups'].remove(hg)
+        if host in self.hostgroups[hg]['members']:
+            self.hostgroups[hg]['members'].remove(host)
+
+    def host(self, action, v):
+        index, kind = (self.hosts, 'HOST')
+        return self._host_common(index, kind, action, v)
+
+    def htpl_action(self, action, v):
+        return self._host_common(self.htpl, 'HTPL', action, v)
+
+    def _host_common(self, index, kind, action, v):
+        fields = ['id', 'name', 'alias', 'address', 'activate']
+        if action == 'show':
+            return self._show(index, ';'.join(v), fields)
+        if action == 'add':
+            (self.host_add if kind == 'HOST' else self.htpl_add)(v)
+            return None
+        obj = self._get(index, v[0], kind)
+        tpl_key = 'templates' if kind == 'HOST' else 'parents'
+        if action == 'del':
+            if kind == 'HOST':
+                for hg in list(obj['hostgroups']):
+                    self._unlink_hg(v[0], hg)
+                self.services.pop(v[0], None)
+            del index[v[0]]
+        elif action == 'setparam':
+            if v[1] in ('alias', 'address'):
+                obj[v[1]] = v[2]
+            elif v[1] == 'activate':
+                obj['activate'] = v[2]
+            else:
+                obj['params'][v[1]] = v[2]
+        elif action == 'getparam':
+            return [dict((p, obj.get(p, obj['params'].get(p, ''))) for p in v[1].split('|'))]
+        elif action in ('enable', 'disable'):
+            obj['activate'] = '1' if action == 'enable' else '0'
+        elif action == 'gettemplate':
+            return [dict(id=self._get(self.htpl, t, 'HTPL')['id'], name=t) for t in obj[tpl_key]]
+        elif action == 'settemplate':
+            obj[tpl_key] = [t for t in v[1].split('|') if t]
+        elif action == 'addtemplate':
+            obj[tpl_key].extend(t for t in v[1].split('|') if t and t not in obj[tpl_key])
+        elif action == 'deltemplate':
+            obj[tpl_key] = [t for t in obj[tpl_key] if t not in v[1].split('|')]
+        elif action == 'getmacro':
+            result = [{'macro name': '$_HOST%s$' % k, 'macro value': val,
+                       'is_password': '0', 'description': '', 'source': 'direct'}
+                      for k, val in sorted(obj['macros'].items())]
+            if kind == 'HOST' or True:
+                for t in obj[tpl_key]:
+                    for k, val in sorted(self.htpl.get(t, {}).get('macros', {}).items()):
+                        result.append({'macro name': '$_HOST%s$' % k, 'macro value': val,
+                                       'is_password': '0', 'description': '', 'source': t})
+            return result
+        elif action == 'setmacro':
+            obj['macros'][v[1].upper()] = v[2] if len(v) > 2 else ''
+        elif action == 'delmacro':
+            obj['macros'].pop(v[1].upper(), None)
+        elif kind == 'HOST' and action == 'applytpl':
+            self.services[v[0]] = len(obj['templates']) * 3
+        elif kind == 'HOST' and action == 'gethostgroup':
+            return [dict(id=self.hostgroups[h]['id'], name=h) for h in obj['hostgroups']]
+        elif kind == 'HOST' and action == 'addhostgroup':
+            for hg in [h for h in v[1].split('|') if h]:
+                self._get(self.hostgroups, hg, 'HG')
+                self._link_hg(v[0], hg)
+        elif kind == 'HOST' and action == 'sethostgroup':
+            for hg in list(obj['hostgroups']):
+                self._unlink_hg(v[0], hg)
+            for hg in [h for h in v[1].split('|') if h]:
+                self._get(self.hostgroups, hg, 'HG')
+                self._link_hg(v[0], hg)
+        elif kind == 'HOST' and action == 'delhostgroup':
+            for hg in [h for h in v[1].split('|') if h]:
+                self._unlink_hg(v[0], hg)
+        elif kind == 'HOST' and action == 'setinstance':
+            self._get(self.instances, v[1], 'INSTANCE')
+            obj['instance'] = v[1]
+        elif kind == 'HOST' and action == 'showinstance':
+            return [dict(id=self.instances[obj['instance']]['id'], name=obj['instance'])]
+        else:
+            raise ClapiError("Unknown action %s for %s" % (action, kind), 400)
+        return None
+
+    # -- HG
+
+    def hg_add(self, v):
+        name, alias = (v + [''] * 2)[:2]
+        if name in self.hostgroups:
+            raise ClapiError("Object already exists (%s)" % name, 409)
+        self.hostgroups[name] = dict(id=self._id(), name=name, alias=alias, members=[])
+
+    def hg(self, action, v):
+        if action == 'show':
+            return self._show(self.hostgroups, ';'.join(v), ['id', 'name', 'alias'])
+        if action == 'add':
+            return self.hg_add(v)
+        hg = self._get(self.hostgroups, v[0], 'HG')
+        if action == 'del':
+            for h in list(hg['members']):
+                self._unlink_hg(h, v[0])
+            del self.hostgroups[v[0]]
+        elif action == 'getmember':
+            return [dict(id=self.hosts[h]['id'], name=h) for h in hg['members']]
+        elif action == 'addmember':
+            for h in [h for h in v[1].split('|') if h]:
+                self._get(self.hosts, h, 'HOST')
+                self._link_hg(h, v[0])
+        elif action == 'delmember':
+            for h in [h for h in v[1].split('|') if h]:
+                self._unlink_hg(h, v[0])
+        elif action == 'setparam':
+            hg[v[1]] = v[2]
+        else:
+            raise ClapiError("Unknown action %s for HG" % action, 400)
+        return None
+
+    # -- STPL
+
+    def stpl_action(self, action, v):
+        if action == 'show':
+            return self._show(self.stpl, ';'.join(v), ['id', 'description', 'alias'])
+        if action == 'add':
+            name, alias, parent = (v + [''] * 3)[:3]
+            if name in self.stpl:
+                raise ClapiError("Object already exists (%s)" % name, 409)
+            if parent:
+                self._get(self.stpl, parent, 'STPL')
+            self.stpl[name] = dict(id=self._id(), description=name, alias=alias,
+                                   template=parent, hosttemplates=[], macros={}, params={})
+            return None
+        st = self._get(self.stpl, v[0], 'STPL')
+        if action == 'del':
+            del self.stpl[v[0]]
+        elif action == 'setparam':
+            if v[1] in ('alias', 'template', 'description'):
+                st[v[1]] = v[2]
+            else:
+                st['params'][v[1]] = v[2]
+        elif action == 'getparam':
+            return [dict((p, st.get(p, st['params'].get(p, ''))) for p in v[1].split('|'))]
+        elif action == 'gethosttemplate':
+            return [dict(id=self.htpl[t]['id'], name=t) for t in st['hosttemplates'] if t in self.htpl]
+        elif action in ('addhosttemplate', 'sethosttemplate'):
+            names = [t for t in v[1].split('|') if t]
+            for t in names:
+                self._get(self.htpl, t, 'HTPL')
+            if action == 'sethosttemplate':
+                st['hosttemplates'] = []
+            st['hosttemplates'].extend(t for t in names if t not in st['hosttemplates'])
+        elif action == 'delhosttemplate':
+            st['hosttemplates'] = [t for t in st['hosttemplates'] if t not in v[1].split('|')]
+        elif action == 'getmacro':
+            return [{'macro name': '$_SERVICE%s$' % k, 'macro value': val,
+                     'is_password': '0', 'description': '', 'source': 'direct'}
+                    for k, val in sorted(st['macros'].items())]
+        elif action == 'setmacro':
+            st['macros'][v[1].upper()] = v[2] if len(v) > 2 else ''
+        elif action == 'delmacro':
+            st['macros'].pop(v[1].upper(), None)
+        else:
+            raise ClapiError("Unknown action %s for STPL" % action, 400)
+        return None
+
+    # -- INSTANCE / CMD / SERVICE / poller actions
+
+    def instance(self, action, v):
+        if action == 'show':
+            return self._show(self.instances, ';'.join(v), ['id', 'name', 'localhost', 'activate'])
+        poller = self._get(self.instances, v[0], 'INSTANCE')
+        if action == 'gethosts':
+            return [dict(id=h['id'], name=h['name'], address=h['address'])
+                    for h in sorted(self.hosts.values(), key=lambda x: x['name'])
+                    if h['instance'] == poller['name']]
+        raise ClapiError("Unknown action %s for INSTANCE" % action, 400)
+
+    def cmd(self, action, v):
+        if action == 'show':
+            return self._show(self.commands, ';'.join(v), ['id', 'name', 'type', 'line'])
+        if action == 'add':
+            name, ctype, line = (v + [''] * 3)[:3]
+            self.commands[name] = dict(id=self._id(), name=name, type=ctype, line=line)
+            return None
+        raise ClapiError("Unknown action %s for CMD" % action, 400)
+
+    def service(self, action, v):
+        if action == 'show':
+            result = []
+            for host in sorted(self.services):
+                for i in range(self.services[host]):
+                    result.append({'host id': self.hosts[host]['id'], 'host name': host,
+                                   'id': '%s%d' % (self.hosts[host]['id'], i),
+                                   'description': 'svc-%d' % i})
+            return result
+        raise ClapiError("Unknown action %s for SERVICE" % action, 400)
+
+    def poller(self, action, values):
+        poller = self._get(self.instances, values, 'INSTANCE')
+        if action in ('pollergenerate', 'applycfg'):
+            poller['generation'] += 1
+            poller['generated'] = list(self.engine_lines(values))
+        if action in ('pollerreload', 'applycfg'):
+            poller['reloads'] += 1
+        return ["OK: %s %s" % (action, values)]
+
+    def engine_lines(self, poller):
+        """ Engine configuration of the hosts of `poller`, as generated now """
+        yield '# Generated for %s on %s' % (poller, time.strftime('%Y-%m-%d %H:%M:%S'))
+        for name in sorted(self.hosts):
+            h = self.hosts[name]
+            if h['instance'] != poller:
+                continue
+            yield 'define host {'
+            yield '    host_name %s' % name
+            yield '    alias %s' % h['alias']
+            yield '    address %s' % h['address']
+            yield '    use %s' % ','.join(h['templates'])
+            yield '    hostgroups %s' % ','.join(h['hostgroups'])
+            yield '    register %s' % h['activate']
+            for k, v in sorted(h['macros'].items()):
+                yield '    _%s %s' % (k, v)
+            for k, v in sorted(h['params'].items()):
+                yield '    %s %s' % (k, v)
+            yield '}'
+
+    def dispatch(self, action, obj, values):
+        action = action.lower()
+        v = _split(values)
+        with self.lock:
+            if obj is None:
+                if action in ('applycfg', 'pollergenerate', 'pollertest', 'cfgmove', 'pollerreload', 'pollerrestart'):
+                    return self.poller(action, values)
+                raise ClapiError("Unknown action %s" % action, 400)
+            handler = dict(
+                HOST=self.host, HTPL=self.htpl_action, HG=self.hg, STPL=self.stpl_action,
+                INSTANCE=self.instance, CMD=self.cmd, SERVICE=self.service,
+            ).get(obj.upper())
+            if handler is None:
+                raise ClapiError("Unknown object %s" % obj, 400)
+            return handler(action, v)
+
+    def import_lines(self, lines):
+        """ Apply CLAPI import lines (OBJECT;ACTION;values), like `centreon -i` """
+        errors = []
+        for n, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            obj, action, values = (line.split(';', 2) + ['', ''])[:3]
+            try:
+                self.dispatch(action, obj, values)
+            except ClapiError as e:
+                errors.append("line %d: %s" % (n, e))
+        return errors
+
+    def export_lines(self, select=None):
+        """ CLAPI export lines, of the `select` objects (OBJECT;name) only if given """
+        wanted = set(tuple(s.split(';', 1)) for s in select or [])
+
+        def selected(obj, name):
+            return not wanted or (obj, name) in wanted
+
+        def settings(obj, name, record, prefix=''):
+            for k, v in sorted(record['params'].items()):
+                yield '%s;setparam;%s;%s;%s' % (obj, name, k, v)
+            if record.get('activate') == '0':
+                yield '%s;setparam;%s;activate;0' % (obj, name)
+            for k, v in sorted(record['macros'].items()):
+                yield '%s;setmacro;%s;%s;%s;0;' % (obj, name, k, v)
+
+        with self.lock:
+            for name in sorted(self.htpl):
+                if selected('HTPL', name):
+                    t = self.htpl[name]
+                    yield 'HTPL;ADD;%s;%s;%s;%s;;' % (name, t['alias'], t['address'], '|'.join(t['parents']))
+                    for line in settings('HTPL', name, t):
+                        yield line
+            for name in sorted(self.hostgroups):
+                if selected('HG', name):
+                    yield 'HG;ADD;%s;%s' % (name, self.hostgroups[name]['alias'])
+            for name in sorted(self.hosts):
+                if selected('HOST', name):
+                    h = self.hosts[name]
+                    yield 'HOST;ADD;%s;%s;%s;%s;%s;%s' % (
+                        name, h['alias'], h['address'], '|'.join(h['templates']),
+                        h['instance'], '|'.join(h['hostgroups']))
+                    for line in settings('HOST', name, h):
+                        yield line
+            for name in sorted(self.stpl):
+                if selected('STPL', name):
+                    st = self.stpl[name]
+                    yield 'STPL;ADD;%s;%s;%s' % (name, st['alias'], st['template'])
+                    for line in settings('STPL', name, st):
+                        yield line
+                    if st['hosttemplates']:
+                        yield 'STPL;addhosttemplate;%s;%s' % (name, '|'.join(st['hosttemplates']))
+
+
+# monitoring server endpoints and the CLAPI action they run
+_POLLER_ENDPOINTS = {
+    'generate': 'pollergenerate',
+    'reload': 'pollerreload',
+    'generate-and-reload': 'applycfg',
+}
+
+# v2 command fields <prefix>_id, <prefix>_args -> CLAPI param (cmd!arg1!arg2)
+_V2_COMMANDS = dict(
+    check_command='check_command',
+    event_handler_command='event_handler',
+)
+
+# CLAPI param names the v2 API rejects
+_V2_UNKNOWN = ('check_command', 'event_handler', 'check_period', 'notification_period',
+               'timezone', 'notes', 'notes_url', 'activate', 'template')
+
+
+class V2(object):
+    """ REST API v2 (`/api/latest`) over the same State """
+
+    def __init__(self, state):
+        self.state = state
+
+    # -- representations
+
+    def _ref(self, index, name):
+        return dict(id=int(index[name]['id']), name=name)
+
+    def _macros(self, record):
+        return [dict(name=k, value=v, is_password=False, description='')
+                for k, v in sorted(record['macros'].items())]
+
+    def _params(self, params):
+        commands = self.state.commands
+        r = dict((k, v) for k, v in params.items() if k not in _V2_COMMANDS.values())
+        for prefix, param in _V2_COMMANDS.items():
+            command = (params.get(param) or '').split('!')
+            r[prefix + '_id'] = int(commands[command[0]]['id']) if command[0] in commands else None
+            r[prefix + '_args'] = command[1:]
+        return r
+
+    def host(self, h, detail=False):
+        s = self.state
+        r = dict(id=int(h['id']), name=h['name'], alias=h['alias'], address=h['address'],
+                 is_activated=h['activate'] == '1',
+                 monitoring_server=self._ref(s.instances, h['instance']),
+                 templates=[self._ref(s.htpl, t) for t in h['templates'] if t in s.htpl],
+                 groups=[self._ref(s.hostgroups, g) for g in h['hostgroups']])
+        if detail:
+            r.update(self._params(h['params']), macros=self._macros(h))
+        return r
+
+    def htpl(self, t, detail=False):
+        s = self.state
+        r = dict(id=int(t['id']), name=t['name'], alias=t['alias'], address=t['address'],
+                 is_activated=t['activate'] == '1',
+                 templates=[self._ref(s.htpl, p) for p in t['parents'] if p in s.htpl])
+        if detail:
+            r.update(self._params(t['params']), macros=self._macros(t))
+        return r
+
+    def hg(self, g, detail=False):
+        return dict(id=int(g['id']), name=g['name'], alias=g['alias'])
+
+    def stpl(self, st, detail=False):
+        s = self.state
+        parent = s.stpl.get(st['template'])
+        r = dict(id=int(st['id']), name=st['description'], alias=st['alias'],
+                 service_template_id=int(parent['id']) if parent else None,
+                 host_templates=[int(s.htpl[t]['id']) for t in st['hosttemplates'] if t in s.htpl])
+        if detail:
+            r.update(self._params(st['params']), macros=self._macros(st))
+        return r
+
+    def instance(self, p, detail=False):
+        return dict(id=int(p['id']), name=p['name'], address='127.0.0.1',
+                    is_localhost=p['localhost'] == '1', is_activated=p['activate'] == '1')
+
+    def cmd(self, c, detail=False):
+        return dict(id=int(c['id']), name=c['name'], type=c['type'], command_line=c['line'])
+
+    # -- helpers
+
+    def _by_id(self, index, oid, kind):
+        for name, record in index.items():
+            if record['id'] == '%s' % oid:
+                return name
+        raise ClapiError("%s %s not found" % (kind, oid))
+
+    def _names(self, index, ids, kind):
+        return [self._by_id(index, i, kind) for i in ids or []]
+
+    @staticmethod
+    def _match(value, op, wanted):
+        if op == '$eq':
+            return value == wanted
+        if op == '$lk':
+            return ('%s' % wanted).strip('%').lower() in (value or '').lower()
+        if op == '$in':
+            return value in wanted
+        raise ClapiError("Unsupported search operator %s" % op, 400)
+
+    def _search(self, records, search, fields):
+        if not search:
+            return records
+        result = []
+        for r in records:
+            ok = True
+            for field, cond in search.items():
+                (op, wanted), = cond.items()
+                values = fields[field](r)
+                if not any(self._match(v, op, wanted) for v in values):
+                    ok = False
+            if ok:
+                result.append(r)
+        return result
+
+    def _page(self, records, query, search):
+        limit = int(query.get('limit', ['10'])[0])
+        page = int(query.get('page', ['1'])[0])
+        return dict(result=records[(page - 1) * limit:page * limit],
+                    meta=dict(page=page, limit=limit, search=search, sort_by={}, total=len(records)))
+
+    # -- objects
+
+    def _patch_common(self, obj, name, record, body):
+        s = self.state
+        for field in body:
+            if field in _V2_UNKNOWN:
+                raise ClapiError("Unknown field %s" % field, 400)
+        for prefix, param in _V2_COMMANDS.items():
+            if body.get(prefix + '_id'):
+                record['params'][param] = '!'.join(
+                    [self._by_id(s.commands, body[prefix + '_id'], 'CMD')] +
+                    list(body.get(prefix + '_args') or []))
+            elif prefix + '_id' in body:
+                record['params'][param] = ''
+        for field, value in body.items():
+            if field in ('alias', 'address'):
+                record[field] = value
+            elif field == 'is_activated':
+                record['activate'] = '1' if value else '0'
+            elif field == 'macros':
+                record['macros'] = dict((m['name'].upper(), m.get('value') or '') for m in value)
+            elif field == 'templates' and obj == 'HOST':
+                record['templates'] = self._names(s.htpl, value, 'HTPL')
+                s.services[name] = len(record['templates']) * 3
+            elif field == 'templates':
+                record['parents'] = self._names(s.htpl, value, 'HTPL')
+            elif field == 'groups':
+                for hg in list(record['hostgroups']):
+                    s._unlink_hg(name, hg)
+                for hg in self._names(s.hostgroups, value, 'HG'):
+                    s._link_hg(name, hg)
+            elif field == 'monitoring_server_id':
+                record['instance'] = self._by_id(s.instances, value, 'INSTANCE')
+            elif field == 'service_template_id':
+                record['template'] = self._by_id(s.stpl, value, 'STPL') if value else ''
+            elif field == 'host_templates':
+                record['hosttemplates'] = self._names(s.htpl, value, 'HTPL')
+            elif field == 'name' or field.rsplit('_', 1)[0] in _V2_COMMANDS:
+                continue
+            else:
+                record['params'][field] = '' if value is None else '%s' % value
+
+    def _create(self, obj, body):
+        s = self.state
+        name = body['name']
+        if obj == 'HOST':
+            s.host_add([name, body.get('alias', ''), body.get('address', ''), '',
+                        self._by_id(s.instances, body['monitoring_server_id'], 'INSTANCE'), ''])
+            index = s.hosts
+        elif obj == 'HTPL':
+            s.htpl_add([name, body.get('alias', ''), body.get('address', ''), ''])
+            index = s.htpl
+        elif obj == 'HG':
+            s.hg_add([name, body.get('alias', '')])
+            return s.hostgroups[name]
+        else:
+            s.stpl_action('add', [name, body.get('alias', ''), ''])
+            index = s.stpl
+        self._patch_common(obj, name, index[name], dict((k, v) for k, v in body.items()
+                                                       if k not in ('name', 'alias', 'address')))
+        return index[name]
+
+    def _delete(self, obj, name):
+        s = self.state
+        if obj == 'HOST':
+            s.host('del', [name])
+        elif obj == 'HTPL':
+            s.htpl_action('del', [name])
+        elif obj == 'HG':
+            s.hg('del', [name])
+        else:
+            s.stpl_action('del', [name])
+
+    def dispatch(self, method, path, query, body):
+        s = self.state
+        objects = [
+            ('/configuration/hosts/templates', 'HTPL', s.htpl, self.htpl),
+            ('/configuration/hosts/groups', 'HG', s.hostgroups, self.hg),
+            ('/configuration/hosts', 'HOST', s.hosts, self.host),
+            ('/configuration/services/templates', 'STPL', s.stpl, self.stpl),
+            ('/configuration/monitoring-servers', 'INSTANCE', s.instances, self.instance),
+            ('/configuration/commands', 'CMD', s.commands, self.cmd),
+        ]
+        fields = {
+            'id': lambda r: [r['id']],
+            'name': lambda r: [r['name']],
+            'group.name': lambda r: [g['name'] for g in r.get('groups', [])],
+            'monitoring_server.name': lambda r: [r.get('monitoring_server', {}).get('name')],
+        }
+
+        with s.lock:
+            if path == '/configuration/services' and method == 'GET':
+                records = [dict(id=int('%s%d' % (s.hosts[h]['id'], i)), name='svc-%d' % i,
+                                hosts=[self._ref(s.hosts, h)])
+                           for h in sorted(s.services) for i in range(s.services[h])]
+                return 200, self._page(records, query, {})
+
+            for prefix, obj, index, render in objects:
+                if not path.startswith(prefix):
+                    continue
+                rest = path[len(prefix):].strip('/').split('/') if path != prefix else []
+                if not rest:
+                    if method == 'GET':
+                        search = json.loads(query['search'][0]) if 'search' in query else {}
+                        records = [render(index[n]) for n in sorted(index)]
+                        return 200, self._page(self._search(records, search, fields), query, search)
+                    if method == 'POST' and obj in ('HOST', 'HTPL', 'HG', 'STPL'):
+                        return 201, render(self._create(obj, body), True)
+                elif rest == ['_delete'] and method == 'POST':
+                    names = [self._by_id(index, i, obj) for i in body['ids']]
+                    for name in names:
+                        self._delete(obj, name)
+                    return 207, dict(results=[dict(href='%s/%s' % (prefix, i), status=204, message=None)
+                                              for i in body['ids']])
+                elif obj == 'INSTANCE' and len(rest) == 2 and rest[1] in _POLLER_ENDPOINTS \
+                        and method == 'POST':
+                    s.poller(_POLLER_ENDPOINTS[rest[1]], self._by_id(index, rest[0], obj))
+                    return 204, None
+                elif len(rest) == 1:
+                    name = self._by_id(index, rest[0], obj)
+                    if method == 'GET':
+                        return 200, render(index[name], True)
+                    if method == 'PATCH':
+                        self._patch_common(obj, name, index[name], body)
+                        return 204, None
+                    if method == 'DELETE':
+                        self._delete(obj, name)
+                        return 204, None
+                break
+        return 404, dict(code=404, message='Not found: %s %s' % (method, path))
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid the delayed ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, fmt, *args)
+
+    def _body(self):
+        """ Request body, decompressed; None when compressed and refused """
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        self.server.transfer('received', len(body))
+        encoding = self.headers.get('Content-Encoding', 'identity')
+        if encoding == 'identity':
+            return body
+        if self.server.plain_requests or encoding not in ('gzip', 'deflate'):
+            return None
+        return zlib.decompress(body, 31 if encoding == 'gzip' else 15)
+
+    def _send(self, status, payload, content_type='application/json'):
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode('utf-8')
+        gzipped = len(payload) >= 1024 and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+            payload = gz.compress(payload) + gz.flush()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        self.server.transfer('sent', len(payload))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _refused(self):
+        self._send(415, {'code': 415, 'message': 'Compressed request bodies are not accepted'})
+
+    def _degraded(self):
+        """ Answer as a failing central when degraded, return whether it did """
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        if self.server.status:
+            self._send(self.server.status, {'message': 'Degraded stand-in'})
+            return True
+        return False
+
+    def _v2(self, method):
+        url = urlparse(self.path)
+        body = self._body()
+        self.server.count('requests')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self._degraded():
+            return
+        if body is None:
+            return self._refused()
+        path = url.path.split('/api/latest', 1)[1]
+        if path == '/login' and method == 'POST':
+            return self._send(200, {'security': {'token': 'standin-token'}})
+        if self.headers.get('X-AUTH-TOKEN') != 'standin-token':
+            return self._send(401, {'code': 401, 'message': 'Unauthorized'})
+        try:
+            payload = json.loads(body.decode('utf-8')) if body else None
+            status, result = self.server.v2.dispatch(method, path, parse_qs(url.query), payload)
+        except ClapiError as e:
+            return self._send(e.status, {'code': e.status, 'message': str(e)})
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return self._send(400, {'code': 400, 'message': 'Bad request: %s' % e})
+        if result is None:
+            return self._send(status, b'')
+        self._send(status, result)
+
+    def do_PATCH(self):
+        if '/api/latest/' in self.path:
+            return self._v2('PATCH')
+        self._send(404, {'message': 'Not found'})
+
+    def do_DELETE(self):
+        if '/api/latest/' in self.path:
+            return self._v2('DELETE')
+        self._send(404, {'message': 'Not found'})
+
+    def do_GET(self):
+        if '/api/latest/' in self.path:
+            return self._v2('GET')
+        url = urlparse(self.path)
+        if url.path == '/standin/stats':
+            return self._send(200, self.server.stats)
+        if url.path == '/standin/export':
+            self.server.count('requests')
+            select = parse_qs(url.query).get('select')
+            body = ''.join(l + '\n' for l in self.server.state.export_lines(select))
+            return self._send(200, body.encode('utf-8'), 'text/plain')
+        if url.path == '/standin/generated':
+            poller = self.server.state.instances.get(parse_qs(url.query).get('poller', [''])[0])
+            if poller is None or poller['generated'] is None:
+                return self._send(404, {'message': 'Not generated'})
+            body = ''.join(l + '\n' for l in poller['generated'])
+            return self._send(200, body.encode('utf-8'), 'text/plain')
+        self._send(404, {'message': 'Not found'})
+
+    def do_POST(self):
+        if '/api/latest/' in self.path:
+            return self._v2('POST')
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        body = self._body()
+        self.server.count('requests')
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if body is None:
+            return self._refused()
+
+        if url.path == '/standin/reset':
+            self.server.reset()
+            return self._send(200, {})
+
+        if url.path == '/standin/degrade':
+            self.server.status = int(query.get('status', ['503'])[0])
+            self.server.delay = float(query.get('delay', ['0'])[0])
+            return self._send(200, {})
+
+        if url.path == '/standin/import':
+            errors = self.server.state.import_lines(body.decode('utf-8').splitlines())
+            return self._send(200 if not errors else 400, {'errors': errors})
+
+        if not url.path.endswith('/api/index.php'):
+            return self._send(404, {'message': 'Not found'})
+        if self._degraded():
+            return
+
+        if query.get('action') == ['authenticate']:
+            return self._send(200, {'authToken': 'standin-token'})
+
+        if self.headers.get('centreon-auth-token') != 'standin-token':
+            return self._send(401, {'message': 'Unauthorized'})
+
+        try:
+            payload = json.loads(body.decode('utf-8'))
+            result = self.server.state.dispatch(
+                payload['action'], payload.get('object'), payload.get('values'))
+        except ClapiError as e:
+            return self._send(e.status, str(e))
+        except (ValueError, KeyError, IndexError) as e:
+            return self._send(400, 'Bad request: %s' % e)
+        self._send(200, {'result': result if result is not None else []})
+
+
+class StandinServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # many forks connect at once, the default backlog of 5 refuses some
+    request_queue_size = 128
+
+    def __init__(self, address, state, latency=0.0, verbose=False, bandwidth=0,
+                 plain_requests=False):
+        ThreadingHTTPServer.__init__(self, address, Handler)
+        self.state = state
+        self.v2 = V2(state)
+        self.latency = latency
+        self.verbose = verbose
+        # bytes per second of each transfer, 0 for no limit
+        self.bandwidth = bandwidth
+        # refuse compressed request bodies (415)
+        self.plain_requests = plain_requests
+        # degraded mode: status answered and delay added to API requests
+        self.status = 0
+        self.delay = 0.0
+        self.stats_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stats = dict(requests=0, received=0, sent=0, first=None)
+
+    def count(self, key, n=1):
+        with self.stats_lock:
+            if key == 'requests' and self.stats['first'] is None:
+                self.stats['first'] = time.time()
+            self.stats[key] += n
+
+    def transfer(self, key, n):
+        """ Count `n` bytes `sent` or `received`, taking as long as the bandwidth allows """
+        self.count(key, n)
+        if self.bandwidth:
+            time.sleep(float(n) / self.bandwidth)
+
+
+def serve(port=0, latency=0.0, hosts=0, pollers=1, verbose=False, hostgroups=10, bandwidth=0,
+          plain_requests=False):
+    """ Start a stand-in in a background thread, return (server, url) """
+    state = State()
+    state.seed(hosts=hosts, pollers=pollers, hostgroups=hostgroups)
+    server = StandinServer(('127.0.0.1', port), state, latency, verbose, bandwidth, plain_requests)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:%d/centreon' % server.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-memory stand-in for the Centreon API')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='added latency per request, in milliseconds')
+    parser.add_argument('--hosts', type=int, default=0, help='hosts to seed')
+    parser.add_argument('--pollers', type=int, default=1, help='pollers to seed')
+    parser.add_argument('--hostgroups', type=int, default=10, help='hostgroups to seed')
+    parser.add_argument('--bandwidth', type=float, default=0.0,
+                        help='KiB per second of each transfer, 0 for no limit')
+    parser.add_argument('--plain-requests', action='store_true',
+                        help='refuse compressed request bodies')
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--export', metavar='URL',
+                        help='print the export of the stand-in running at URL')
+    parser.add_argument('--select', action='append', help='OBJECT;name to export')
+    parser.add_argument('--generated', metavar='URL',
+                        help='print the engine configuration of --poller generated by the stand-in at URL')
+    parser.add_argument('--poller', help='poller of --generated')
+    args = parser.parse_args()
+
+    if args.generated:
+        url = '%s/standin/generated?poller=%s' % (args.generated, quote(args.poller or ''))
+        sys.stdout.write(urlopen(url).read().decode('utf-8'))
+        return
+
+    if args.export:
+        query = '&'.join('select=%s' % quote(s) for s in args.select or [])
+        sys.stdout.write(urlopen('%s/standin/export?%s' % (args.export, query)).read().decode('utf-8'))
+        return
+
+    server, url = serve(args.port, args.latency / 1000.0, args.hosts, args.pollers, args.verbose,
+                        args.hostgroups, args.bandwidth * 1024, args.plain_requests)
+    print("Centreon stand-in listening on %s" % url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
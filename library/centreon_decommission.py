@@ -0,0 +1,235 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# import module snippets
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json, reload_pollers
+)
+from ansible.module_utils.centreon.decommission import (
+    delete_hosts, emptied, host_pollers, hostgroup_members, select_hosts
+)
+from ansible.module_utils.centreon.profiling import run_module
+
+ANSIBLE_METADATA = {
+    'status': ['preview'],
+    'supported_by': 'community',
+    'metadata_version': '0.2',
+    'version': '0.2'
+}
+
+DOCUMENTATION = '''
+---
+module: centreon_decommission
+version_added: "2.2"
+short_description: remove many hosts from centreon, reloading each poller once
+
+description:
+  - Deletes the selected hosts, C(concurrency) at a time, then reloads once
+    every poller which lost a host.
+  - Hosts are grouped by poller with one C(INSTANCE;GETHOSTS) per poller.
+    Selected names which do not exist are ignored.
+
+options:
+  url:
+    description:
+      - Centreon URL
+    required: True
+  username:
+    description:
+      - Centreon API username
+    required: True
+  password:
+    description:
+      - Centreon API username's password
+    required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, so hosts, hostgroups and templates are gathered
+        without per-object calls
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  hosts:
+    description:
+      - Names of the hosts to remove (or hosts with a C(name))
+    type: list
+  hostgroups:
+    description:
+      - Remove the members of these hostgroups
+    type: list
+  match:
+    description:
+      - Remove the hosts whose name matches this regex
+  cleanup_hostgroups:
+    description:
+      - Also delete the hostgroups left empty by the removal (hostgroups
+        already empty are kept). The hostgroups of each removed host are
+        read, then the members of those hostgroups only
+    type: bool
+    default: False
+  concurrency:
+    description:
+      - Number of hosts deleted in parallel
+    default: 4
+  applycfg:
+    description:
+      - Apply configuration once on each poller which lost a host
+    default: True
+    type: bool
+requirements:
+  - python requests
+author:
+    - Guillaume Watteeux
+'''
+
+EXAMPLES = '''
+# Retire a project
+ - centreon_decommission:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     hostgroups:
+       - ProjectA
+     cleanup_hostgroups: true
+   run_once: true
+   delegate_to: localhost
+
+# Hosts gone from the inventory, or following a naming pattern
+ - centreon_decommission:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     hosts: "{{ retired_hosts }}"
+     match: '^tmp-build-[0-9]+$'
+     concurrency: 8
+   run_once: true
+   delegate_to: localhost
+'''
+
+# =============================================
+# Centreon module API Rest
+#
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=centreon_argument_spec(
+            # no defaults, required_one_of needs them unset
+            hosts=dict(type='list'),
+            hostgroups=dict(type='list'),
+            match=dict(default=None),
+            cleanup_hostgroups=dict(default=False, type='bool'),
+            concurrency=dict(default=4, type='int'),
+            applycfg=dict(default=True, type='bool'),
+        ),
+        required_one_of=[['hosts', 'hostgroups', 'match']],
+        supports_check_mode=True
+    )
+
+    concurrency = module.params["concurrency"]
+    names = [h.get('name') if isinstance(h, dict) else h for h in module.params["hosts"] or []]
+
+    centreon = centreon_client(module, pool_size=max(10, concurrency))
+
+    try:
+        selected = select_hosts(centreon, names, module.params["hostgroups"], module.params["match"])
+        pollers = host_pollers(centreon, selected, concurrency)
+        members = dict()
+        if module.params["cleanup_hostgroups"] and selected:
+            members = hostgroup_members(centreon, selected, concurrency)
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg="Unable to select hosts: %s" % e)
+
+    results = delete_hosts(centreon, selected, pollers, concurrency)
+    deleted = [r['name'] for r in results if r['changed']]
+    has_changed = bool(deleted)
+
+    hostgroups = emptied(members, deleted)
+    if hostgroups:
+        try:
+            centreon.call_many('del', 'HG', hostgroups)
+        except CentreonAPIError as e:
+            fail_json(module, centreon, msg="Unable to delete hostgroups %s: %s" % (hostgroups, e),
+                      changed=has_changed, hosts=results)
+
+    touched = sorted(set(r['poller'] for r in results if r['changed'] and r['poller']))
+    if module.params["applycfg"]:
+        reload_pollers(module, centreon, touched, has_changed)
+
+    failed = [r['name'] for r in results if r.get('failed')]
+    if failed:
+        fail_json(module, centreon, msg="%d of %d hosts failed" % (len(failed), len(results)),
+                  failed_hosts=failed, hosts=results, hostgroups_deleted=hostgroups,
+                  pollers=touched, changed=has_changed)
+
+    exit_json(module, centreon, changed=has_changed,
+              msg="Removed %d hosts from %d pollers" % (len(deleted), len(touched)),
+              hosts=results, hostgroups_deleted=hostgroups, pollers=touched)
+
+
+if __name__ == '__main__':
+    run_module(main)
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# import module snippets
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json
+)
+from ansible.module_utils.centreon.drift import FIELDS, fleet_drift
+from ansible.module_utils.centreon.profiling import run_module
+
+ANSIBLE_METADATA = {
+    'status': ['preview'],
+    'supported_by': 'community',
+    'metadata_version': '0.2',
+    'version': '0.2'
+}
+
+DOCUMENTATION = '''
+---
+module: centreon_drift
+version_added: "2.2"
+short_description: report hosts differing from their desired state
+
+description:
+  - Compares the desired state of many hosts with Centreon and returns the
+    differences, field by field. Nothing is changed.
+  - The current state is read in bulk, not per host - one host listing,
+    the members of each hostgroup (C(hostgroups)) and the hosts of each
+    poller (C(poller)). Templates and macros are read per host, unless
+    C(known_state) or C(export_command) answers them. With C(backend=v2)
+    the host listing also gives pollers, templates and hostgroups.
+
+options:
+  url:
+    description:
+      - Centreon URL
+    required: True
+  username:
+    description:
+      - Centreon API username
+    required: True
+  password:
+    description:
+      - Centreon API username's password
+    required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, so hosts, hostgroups and templates are gathered
+        without per-object calls
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  hosts:
+    description:
+      - Desired state of the hosts, each one with the centreon_host options
+        (name, alias, ipaddr, hosttemplates, hosttemplates_action, instance,
+        hostgroups, hostgroups_action, macros, macros_inherit, state,
+        status). Omitted options are not compared, but for C(status) and
+        C(state)
+      - C(instance) is only compared when given, C(auto) never
+    type: list
+    required: True
+  fields:
+    description:
+      - Fields compared
+    type: list
+    default: [address, alias, status, poller, templates, hostgroups, macros]
+  macros_inherit:
+    description:
+      - Default C(macros_inherit) of the hosts. A macro not set on the host
+        is compared with the value inherited through its templates
+    type: bool
+    default: False
+  concurrency:
+    description:
+      - Number of per-object reads sent in parallel
+    default: 4
+requirements:
+  - python requests
+author:
+    - Guillaume Watteeux
+'''
+
+EXAMPLES = '''
+# Nightly drift report, the export answering templates and macros
+ - centreon_drift:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     export_command: "ssh centreon centreon -u admin -p {{ clapi_pass }} -e"
+     hosts: "{{ centreon_hosts }}"
+   register: drift
+   run_once: true
+   delegate_to: localhost
+
+ - copy:
+     content: "{{ drift.drift | to_nice_json }}"
+     dest: /var/log/centreon-drift.json
+   delegate_to: localhost
+'''
+
+RETURN = '''
+drift:
+  description:
+    - Drifting hosts, C({host: {field: diff}}). Diffs are C(wanted) and
+      C(current) values, with C(missing) and C(extra) names for templates
+      and hostgroups; macros are C({MACRO: {wanted, current}}). A host
+      missing, or present when it should be absent, has a C(state) diff
+  type: dict
+summary:
+  description:
+    - Number of C(hosts), C(in_sync) and C(drifted) ones, drifting hosts
+      per field (C(fields)) and the names of the C(missing) hosts
+  type: dict
+'''
+
+# =============================================
+# Centreon module API Rest
+#
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=centreon_argument_spec(
+            hosts=dict(type='list', required=True),
+            fields=dict(type='list', default=list(FIELDS)),
+            macros_inherit=dict(default=False, type='bool'),
+            concurrency=dict(default=4, type='int'),
+        ),
+        supports_check_mode=True
+    )
+
+    unknown = set(module.params["fields"]) - set(FIELDS)
+    if unknown:
+        module.fail_json(msg="Unknown fields %s, valid ones: %s" % (
+            ', '.join(sorted(unknown)), ', '.join(FIELDS)))
+    for h in module.params["hosts"]:
+        if not isinstance(h, dict) or not h.get('name'):
+            module.fail_json(msg="Every host needs a name: %s" % h)
+
+    centreon = centreon_client(module)
+    hosts = [dict(h, macros_inherit=h.get('macros_inherit', module.params["macros_inherit"]))
+             for h in module.params["hosts"]]
+
+    try:
+        report = fleet_drift(centreon, hosts, module.params["fields"], module.params["concurrency"])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg="Unable to read the hosts: %s" % e)
+
+    exit_json(module, centreon, changed=False, drift=report['hosts'], summary=report['summary'])
+
+
+if __name__ == '__main__':
+    run_module(main)
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# import module snippets
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json
+)
+from ansible.module_utils.centreon.profiling import run_module
+from ansible.module_utils.centreon.state import SUBSETS, gather_facts
+
+ANSIBLE_METADATA = {
+    'status': ['preview'],
+    'supported_by': 'community',
+    'metadata_version': '0.2',
+    'version': '0.2'
+}
+
+DOCUMENTATION = '''
+---
+module: centreon_facts
+version_added: "2.2"
+short_description: gather centreon configuration in bulk
+
+description:
+  - Reads the selected parts of the Centreon configuration with as few calls
+    as possible and returns them indexed by name as the C(centreon) fact.
+  - The other centreon_* modules accept this fact as C(known_state) and then
+    skip the reads it answers.
+
+options:
+  url:
+    description:
+      - Centreon URL
+    required: True
+  username:
+    description:
+      - Centreon API username
+    required: True
+  password:
+    description:
+      - Centreon API username's password
+    required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, so hosts, hostgroups and templates are gathered
+        without per-object calls
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
+  gather_subset:
+    description:
+      - Parts of the configuration to gather, C(all) or a list of
+        C(hosts) (1 call), C(hostgroups) with their members (1 call + 1 per
+        hostgroup), C(host_templates) with their parents (1 call + 1 per
+        template), C(service_templates) (1 call), C(pollers) with their hosts
+        (1 call + 1 per poller), C(commands) (1 call). C(!subset) excludes one.
+      - Host hostgroups are filled when both C(hosts) and C(hostgroups) are
+        gathered, host pollers when both C(hosts) and C(pollers) are.
+    type: list
+    default: all
+  concurrency:
+    description:
+      - Number of per-object calls sent in parallel
+    default: 4
+requirements:
+  - python requests
+author:
+    - Guillaume Watteeux
+'''
+
+EXAMPLES = '''
+- centreon_facts:
+    url: 'https://centreon.company.net/centreon'
+    username: 'ansible_api'
+    password: 'strong_pass_from_vault'
+    gather_subset:
+      - hosts
+      - hostgroups
+  run_once: true
+  delegate_to: localhost
+
+- centreon_host:
+    url: 'https://centreon.company.net/centreon'
+    username: 'ansible_api'
+    password: 'strong_pass_from_vault'
+    name: "{{ ansible_fqdn }}"
+    hostgroups:
+      - Linux-Servers
+    known_state: "{{ centreon }}"
+  delegate_to: localhost
+'''
+
+# =============================================
+# Centreon module API Rest
+#
+
+
+def subsets(gather_subset):
+    selected = set()
+    for s in gather_subset:
+        if s == 'all':
+            selected.update(SUBSETS)
+        elif not s.startswith('!'):
+            selected.add(s)
+    for s in gather_subset:
+        if s.startswith('!'):
+            selected.discard(s[1:])
+    return selected
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=centreon_argument_spec(
+            gather_subset=dict(type='list', default=['all']),
+            concurrency=dict(default=4, type='int'),
+        ),
+        supports_check_mode=True
+    )
+
+    selected = subsets(module.params["gather_subset"])
+    unknown = selected - set(SUBSETS)
+    if unknown:
+        module.fail_json(msg="Unknown subsets %s, valid ones: %s" % (
+            ', '.join(sorted(unknown)), ', '.join(SUBSETS)))
+
+    centreon = centreon_client(module)
+
+    try:
+        facts = gather_facts(centreon, selected, module.params["concurrency"])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg="Unable to gather facts: %s" % e)
+
+    exit_json(module, centreon, changed=False, ansible_facts=dict(centreon=facts))
+
+
+if __name__ == '__main__':
+    run_module(main)
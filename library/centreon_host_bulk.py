@@ -0,0 +1,633 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+# import module snippets
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.centreon.breaker import circuit_breaker
+from ansible.module_utils.centreon.clapi_import import host_import, submit
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    api_stats, centreon_argument_spec, known_facts, new_client, profile_result
+)
+from ansible.module_utils.centreon.host import (
+    TemplateMacros, drop_inherited, ensure_host, host_spec
+)
+from ansible.module_utils.centreon.journal import Journal, JournaledClient
+from ansible.module_utils.centreon.pollers import PollerBalancer
+from ansible.module_utils.centreon.preflight import describe, host_references, missing_references
+from ansible.module_utils.centreon.profiling import run_module
+from ansible.module_utils.centreon.sharding import route_host
+from ansible.module_utils.centreon.state import KnownState
+from multiprocessing.pool import ThreadPool
+
+ANSIBLE_METADATA = {
+    'status': ['preview'],
+    'supported_by': 'community',
+    'metadata_version': '0.2',
+    'version': '0.2'
+}
+
+DOCUMENTATION = '''
+---
+module: centreon_host_bulk
+version_added: "2.2"
+short_description: add many hosts to one or several centreon centrals
+
+options:
+  url:
+    description:
+      - Centreon URL, when working on a single central
+  username:
+    description:
+      - Centreon API username
+  password:
+    description:
+      - Centreon API username's password
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API. Not allowed with C(centrals), each of them
+        takes its own
+    type: dict
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, as C(known_state) does. Not allowed with
+        C(centrals), each of them takes its own
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
+  centrals:
+    description:
+      - List of centrals (name, url, username, password, hostgroups, match,
+        backend, compression, known_state, import_command, export_command,
+        export_filter, circuit_breaker). Username, password, backend,
+        compression, import_command, export_filter and circuit_breaker
+        default to the module ones. C(known_state) and C(export_command)
+        describe a single central and are only taken from each central.
+        Hosts are routed to a central according to C(route_by)
+    type: list
+    elements: dict
+  route_by:
+    description:
+      - How hosts are routed when several C(centrals) are given
+      - C(hash) spreads hosts with a consistent hash of their name
+      - C(hostgroup) picks the first central whose C(hostgroups) contains
+        one of the host's hostgroups
+      - C(regex) picks the first central whose C(match) regex matches the hostname
+    default: hash
+    choices: ['hash', 'hostgroup', 'regex']
+  hosts:
+    description:
+      - List of hosts, each one accepting the centreon_host options (name,
+        alias, ipaddr, hosttemplates, hosttemplates_action, instance,
+        hostgroups, hostgroups_action, params, macros, macros_inherit, state,
+        status)
+    type: list
+    required: True
+  macros_inherit:
+    description:
+      - Default C(macros_inherit) of the hosts. Macros equal to the value
+        inherited through the template chain are not written (nor imported),
+        and removed when set on the host; each template is read once per
+        central. The total is returned as C(overrides_avoided)
+    type: bool
+    default: False
+  concurrency:
+    description:
+      - Number of hosts handled in parallel on each central
+    default: 4
+  pollers:
+    description:
+      - Pollers eligible for hosts using C(instance=auto)
+    type: list
+  balance_by:
+    description:
+      - Load measure used by C(instance=auto)
+    default: hosts
+    choices: ['hosts', 'services']
+  applycfg:
+    description:
+      - Apply configuration once per changed poller at the end of the run
+    default: True
+    type: bool
+  journal:
+    description:
+      - Path of a local journal recording every planned and completed write,
+        every completed host and every poller reload of the run. It is
+        created readable by its owner only, macro values are left out
+  resume:
+    description:
+      - Resume from C(journal) instead of starting over. Hosts completed with
+        the same spec are only checked for existence (one HOST;SHOW per
+        central), the others are reconciled again, and pollers left without
+        a reload are reloaded. Writes the interrupted run sent without
+        getting their answer are returned as C(resumed_incomplete) (central,
+        host, object and action)
+    default: False
+    type: bool
+  write_mode:
+    description:
+      - C(api) sends every write as an API call
+      - C(import) creates the missing hosts with CLAPI import files run by
+        C(import_command) (host, params, macros, status, hostgroup
+        memberships and template application); existing hosts and hosts to
+        remove still go through the API
+    default: api
+    choices: ['api', 'import']
+  import_command:
+    description:
+      - Command receiving each chunk of CLAPI import lines, on its standard
+        input or, when it contains C({file}), in the file named there. For
+        instance C(ssh central centreon -u admin -p secret -i {file}) for
+        a central reachable with ssh, or any upload hook
+  import_chunk_size:
+    description:
+      - Number of CLAPI lines per C(import_command) run. Chunks only hold
+        whole hosts, a host with more lines is sent alone
+    default: 1000
+  preflight:
+    description:
+      - Before any write on a central, check that the host templates,
+        hostgroups, pollers and commands (C(check_command), C(event_handler)
+        params) its hosts refer to exist, each object type looked up once.
+        When some are missing, no host of the central is changed and each
+        host failing the check lists its missing objects
+    type: bool
+    default: True
+requirements:
+  - python requests
+author:
+    - Guillaume Watteeux
+'''
+
+EXAMPLES = '''
+# Add hosts across two regional centrals
+ - centreon_host_bulk:
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     centrals:
+       - name: eu
+         url: 'https://centreon-eu.company.net/centreon'
+         match: '\\.eu\\.'
+       - name: us
+         url: 'https://centreon-us.company.net/centreon'
+         match: '\\.us\\.'
+     route_by: regex
+     hosts: "{{ groups['all'] | map('extract', hostvars, 'centreon_host') | list }}"
+   run_once: true
+   delegate_to: localhost
+
+# Rerun of an interrupted rollout
+ - centreon_host_bulk:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     hosts: "{{ centreon_hosts }}"
+     journal: /var/tmp/centreon-rollout.journal
+     resume: true
+   run_once: true
+   delegate_to: localhost
+
+# Onboarding of thousands of hosts, new hosts are imported on the central
+ - centreon_host_bulk:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     hosts: "{{ centreon_hosts }}"
+     write_mode: import
+     import_command: "scp {file} centreon:/tmp/ansible.clapi && ssh centreon centreon -u admin -p {{ clapi_pass }} -i /tmp/ansible.clapi"
+   run_once: true
+   delegate_to: localhost
+'''
+
+# =============================================
+# Centreon module API Rest
+#
+
+
+def run_host(client, balancer, spec, central, journal, templates=None):
+    result = dict(name=spec['name'], changed=False, msg=list())
+    if journal is not None:
+        client = JournaledClient(client, journal, central, spec['name'])
+    try:
+        ensure_host(client, spec, result, balancer, templates)
+    except CentreonAPIError as e:
+        result['failed'] = True
+        result['error'] = str(e)
+        return result
+    if journal is not None:
+        journal.host_done(central, spec, result)
+    return result
+
+
+def import_runner(module, command):
+    """ Runner handing an import chunk to `command` """
+    def run(content):
+        if '{file}' in command:
+            fd, path = tempfile.mkstemp(prefix='centreon-', suffix='.clapi')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    f.write(content)
+                rc, out, err = module.run_command(command.replace('{file}', path),
+                                                  use_unsafe_shell=True)
+            finally:
+                os.unlink(path)
+        else:
+            rc, out, err = module.run_command(command, data=content, binary_data=True,
+                                              use_unsafe_shell=True)
+        if rc != 0:
+            raise CentreonAPIError("Import command failed (rc=%d): %s" % (rc, err or out))
+    return run
+
+
+def import_hosts(client, balancer, hosts, central, params, journal, runner, templates):
+    """
+    Create the hosts of `hosts` missing on the central with CLAPI import
+    files, leaving out the macros inherited from their templates with
+    `macros_inherit`. Returns (hosts left to the API path, results of the
+    new hosts, import lines)
+    """
+    present = [h for h in hosts if h['state'] == 'present']
+    existing = client.exists('HOST', [h['name'] for h in present])
+    new = [h for h in present if h['name'] not in existing]
+    if not new:
+        return hosts, [], []
+    hostgroups = client.exists('HG', set(hg for h in new for hg in h['hostgroups']))
+
+    specs = list()
+    avoided = dict()
+    for h in new:
+        instance = h['instance']
+        if instance == 'auto':
+            instance = balancer.place(h['name'])
+        spec = dict(h, instance=instance)
+        if h['macros_inherit'] and h['macros']:
+            spec['macros'] = drop_inherited(h['macros'], templates.inherited(h['hosttemplates']))
+            avoided[h['name']] = len(h['macros']) - len(spec['macros'])
+        specs.append(spec)
+    blocks = host_import(specs, hostgroups).blocks()
+    lines = [line for _, block in blocks for line in block]
+
+    names = set(h['name'] for h in new)
+    rest = [h for h in hosts if h['name'] not in names]
+    results = [dict(name=s['name'], changed=True, instance=s['instance'],
+                    msg=["Import host: %s" % s['name']]) for s in specs]
+    for r in results:
+        if r['name'] in avoided:
+            r['overrides_avoided'] = avoided[r['name']]
+    if client.check_mode:
+        return rest, results, lines
+
+    error, partial = submit(client, blocks, runner, params['import_chunk_size'])
+    # the import went around the client, a snapshot no longer knows these hosts
+    if client.known_state is not None:
+        for h in new:
+            client.known_state.forget('add', 'HOST', h['name'])
+
+    created = client.exists('HOST', [h['name'] for h in new])
+    partial = set(partial)
+    for h, r in zip(new, results):
+        if h['name'] in partial and h['name'] in created:
+            # its APPLYTPL line may not have run, and a later run would not
+            # send it: the templates are linked. The rest is reconciled then
+            r.update(failed=True, error=error)
+            if h['hosttemplates']:
+                try:
+                    client.call('applytpl', 'HOST', h['name'])
+                    r['msg'].append("Apply templates: %s" % h['name'])
+                except CentreonAPIError as e:
+                    r['error'] = '%s; templates not applied: %s' % (error, e)
+        elif h['name'] not in created:
+            # in the failed chunk or in a later one, never sent
+            r.update(failed=True, changed=False, msg=[],
+                     error=error or "Host not created by the import")
+        elif journal is not None:
+            journal.host_done(central, h, r)
+    return rest, results, lines
+
+
+def verify_completed(client, central, hosts, journal):
+    """
+    Split `hosts` into (hosts to reconcile, results of hosts the journal
+    reports as completed and which are still in the expected state)
+    """
+    completed = [(h, journal.completed(central, h)) for h in hosts]
+    if not any(r for _, r in completed):
+        return hosts, []
+
+    existing = client.exists('HOST', [h['name'] for h, r in completed if r is not None])
+    todo, skipped = list(), list()
+    for h, record in completed:
+        if record is not None and (h['name'] in existing) == (h['state'] == 'present'):
+            skipped.append(dict(name=h['name'], changed=False, skipped=True,
+                                instance=record.get('instance'),
+                                msg=["Completed by a previous run"]))
+        else:
+            todo.append(h)
+    return todo, skipped
+
+
+def preflight(client, hosts):
+    """
+    Results failing every host of `hosts` when some of them refer to missing
+    objects (each one naming its own), None when every reference exists
+    """
+    present = [h for h in hosts if h['state'] == 'present']
+    missing = missing_references(client, [host_references(h) for h in present])
+    if not missing:
+        return None
+    results = list()
+    for h in hosts:
+        problem = describe(missing, host_references(h)) if h['state'] == 'present' else None
+        results.append(dict(
+            name=h['name'], changed=False, failed=True,
+            error='Pre-flight check failed: %s' % problem if problem else
+            'Not applied, other hosts of the central refer to missing objects'))
+    return results
+
+
+def run_central(central, hosts, params, journal, check_mode=False, runner=None):
+    client = new_client(
+        central.get('backend', params['backend']),
+        central['url'], central['username'], central['password'],
+        pool_size=params['concurrency'], check_mode=check_mode,
+        retries=params['api_retries'], lookup_threshold=params['lookup_threshold'],
+        compression=central.get('compression', params['compression'])
+    )
+    client.breaker = circuit_breaker(client.url, central.get('circuit_breaker'), client.timeout)
+    client.fingerprint_dir = params['fingerprint_dir']
+    try:
+        facts = known_facts(client, central.get('known_state'),
+                            central.get('export_command'), central.get('export_filter'))
+    except CentreonAPIError as e:
+        failed = dict(failed=True, error=str(e), changed=False, central=central['name'])
+        return [dict(failed, name=h['name']) for h in hosts], [], client, []
+    if facts:
+        client.known_state = KnownState(facts)
+    balancer = PollerBalancer(client, params['pollers'], params['balance_by'])
+    hosts = [host_spec(dict(h, macros_inherit=h.get('macros_inherit', params['macros_inherit'])))
+             for h in hosts]
+    templates = TemplateMacros(client)
+
+    skipped = list()
+    if journal is not None and params['resume']:
+        try:
+            hosts, skipped = verify_completed(client, central['name'], hosts, journal)
+        except CentreonAPIError as e:
+            failed = dict(failed=True, error='Unable to verify journal: %s' % e,
+                          changed=False, central=central['name'])
+            return [dict(failed, name=h['name']) for h in hosts], [], client, []
+
+    if params['preflight']:
+        try:
+            failed = preflight(client, hosts)
+        except CentreonAPIError as e:
+            failed = [dict(name=h['name'], failed=True, changed=False,
+                           error='Pre-flight check failed: %s' % e) for h in hosts]
+        if failed:
+            failed.extend(skipped)
+            for r in failed:
+                r['central'] = central['name']
+            return failed, [], client, []
+
+    imported, lines = list(), list()
+    if params['write_mode'] == 'import':
+        try:
+            hosts, imported, lines = import_hosts(
+                client, balancer, hosts, central['name'], params, journal, runner, templates)
+        except CentreonAPIError as e:
+            failed = dict(failed=True, error='Unable to import hosts: %s' % e,
+                          changed=False, central=central['name'])
+            return [dict(failed, name=h['name']) for h in hosts], [], client, []
+
+    pool = ThreadPool(params['concurrency'])
+    try:
+        results = pool.map(
+            lambda h: run_host(client, balancer, h, central['name'], journal, templates), hosts)
+    finally:
+        pool.close()
+    results.extend(imported)
+    results.extend(skipped)
+
+    for r in results:
+        r['central'] = central['name']
+
+    applied = list()
+    if params['applycfg']:
+        pollers = set(r['instance'] for r in results
+                      if r['changed'] and r.get('instance'))
+        if journal is not None:
+            pollers.update(p for c, p in journal.pending_pollers if c == central['name'])
+        for p in sorted(pollers):
+            try:
+                client.call('APPLYCFG', values=p)
+                applied.append(p)
+                if journal is not None:
+                    journal.applied(central['name'], p)
+            except CentreonAPIError as e:
+                for r in results:
+                    if r.get('instance') == p:
+                        r['failed'] = True
+                        r['error'] = 'Failed while reloading poller: %s' % e
+    return results, applied, client, lines
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=centreon_argument_spec(
+            # not required: each of `centrals` has its own
+            url=dict(default=None),
+            centrals=dict(type='list', elements='dict', options=dict(
+                name=dict(required=True),
+                url=dict(required=True),
+                username=dict(default=None, no_log=True),
+                password=dict(default=None, no_log=True),
+                hostgroups=dict(default=None, type='list'),
+                match=dict(default=None),
+                backend=dict(default=None, choices=['v1', 'v2']),
+                compression=dict(default=None, choices=['off', 'responses', 'all']),
+                known_state=dict(default=None, type='dict'),
+                import_command=dict(default=None),
+                export_command=dict(default=None),
+                export_filter=dict(default=None, type='list'),
+                circuit_breaker=dict(default=None, type='dict'),
+            )),
+            route_by=dict(default='hash', choices=['hash', 'hostgroup', 'regex']),
+            hosts=dict(type='list', required=True),
+            concurrency=dict(default=4, type='int'),
+            pollers=dict(type='list', default=[]),
+            balance_by=dict(default='hosts', choices=['hosts', 'services']),
+            applycfg=dict(default=True, type='bool'),
+            journal=dict(default=None, type='path'),
+            resume=dict(default=False, type='bool'),
+            write_mode=dict(default='api', choices=['api', 'import']),
+            import_command=dict(default=None),
+            import_chunk_size=dict(default=1000, type='int'),
+            preflight=dict(default=True, type='bool'),
+            macros_inherit=dict(default=False, type='bool')
+        ),
+        required_one_of=[['url', 'centrals']],
+        supports_check_mode=True
+    )
+
+    username = module.params["username"]
+    password = module.params["password"]
+    route_by = module.params["route_by"]
+    hosts = module.params["hosts"]
+
+    # a snapshot or an export describes one central, it would answer the
+    # reads of the others
+    single = dict(name='default', url=module.params["url"],
+                  known_state=module.params["known_state"],
+                  export_command=module.params["export_command"])
+    if module.params["centrals"] and (module.params["known_state"] or module.params["export_command"]):
+        module.fail_json(msg="known_state and export_command describe one central, "
+                             "set them on each of centrals")
+
+    centrals = list()
+    for c in module.params["centrals"] or [single]:
+        central = dict(username=username, password=password,
+                       import_command=module.params["import_command"],
+                       export_filter=module.params["export_filter"],
+                       circuit_breaker=module.params["circuit_breaker"])
+        # suboptions not given are None
+        central.update((k, v) for k, v in c.items() if v is not None)
+        if module.params["write_mode"] == 'import' and not central['import_command']:
+            module.fail_json(msg="write_mode import needs an import_command for central %s"
+                             % central['name'])
+        centrals.append(central)
+
+    for h in hosts:
+        if not h.get('name'):
+            module.fail_json(msg="Each host needs a name")
+
+    # Route every host before touching any central
+    routed = dict((c['name'], list()) for c in centrals)
+    unrouted = list()
+    for h in hosts:
+        target = centrals[0]['name'] if len(centrals) == 1 else route_host(h, centrals, route_by)
+        if target is None:
+            unrouted.append(h['name'])
+        else:
+            routed[target].append(h)
+    if unrouted:
+        module.fail_json(msg="No central matches hosts: %s" % ', '.join(unrouted))
+
+    journal = None
+    extra = dict()
+    if module.params["journal"] and not module.check_mode:
+        try:
+            journal = Journal(module.params["journal"], module.params["resume"])
+        except (IOError, OSError) as e:
+            module.fail_json(msg="Unable to open journal %s: %s" % (module.params["journal"], e))
+        if module.params["resume"]:
+            extra['resumed_incomplete'] = journal.incomplete_writes()
+
+    work = [(c, routed[c['name']]) for c in centrals if routed[c['name']]]
+    pool = ThreadPool(max(1, len(work)))
+    try:
+        outcome = pool.map(
+            lambda w: run_central(w[0], w[1], module.params, journal, module.check_mode,
+                                  import_runner(module, w[0]['import_command'])), work)
+    finally:
+        pool.close()
+        if journal is not None:
+            journal.close()
+
+    results = list()
+    applied = dict()
+    plan = dict()
+    clients = list()
+    for (c, _), (central_results, central_applied, client, lines) in zip(work, outcome):
+        results.extend(central_results)
+        applied[c['name']] = central_applied
+        plan[c['name']] = client.plan()
+        if lines:
+            plan[c['name']]['import'] = lines
+        clients.append(client)
+    centreon_api = api_stats(*clients)
+    if any('overrides_avoided' in r for r in results):
+        extra['overrides_avoided'] = sum(r.get('overrides_avoided', 0) for r in results)
+
+    has_changed = any(r['changed'] for r in results)
+    failed = [r for r in results if r.get('failed')]
+    if failed:
+        module.fail_json(**profile_result(dict(
+            msg="%d of %d hosts failed" % (len(failed), len(results)),
+            failed_hosts=[r['name'] for r in failed],
+            hosts=results, applied=applied, changed=has_changed,
+            centreon_api=centreon_api, **extra
+        ), *clients))
+
+    if module.check_mode:
+        module.exit_json(**profile_result(dict(
+            changed=has_changed, hosts=results, plan=plan, centreon_api=centreon_api, **extra
+        ), *clients))
+    module.exit_json(**profile_result(dict(
+        changed=has_changed, hosts=results, applied=applied, centreon_api=centreon_api,
+        **extra
+    ), *clients))
+
+
+if __name__ == '__main__':
+    run_module(main)
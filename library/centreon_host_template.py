@@ -3,7 +3,12 @@
 
 # import module snippets
 from ansible.module_utils.basic import AnsibleModule
-import requests
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json
+)
+from ansible.module_utils.centreon.host import ensure_host_template
+from ansible.module_utils.centreon.profiling import run_module
 
 ANSIBLE_METADATA = {
     'status': ['preview'],
@@ -31,6 +36,73 @@ options:
     description:
       - Centreon API username's password
     required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, as C(known_state) does
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
 
   name:
     description:
@@ -52,6 +124,14 @@ options:
   macros:
     description:
       - Set Host Macros (dict)
+  macros_inherit:
+    description:
+      - Compare the macros with the value inherited through the template
+        chain (C(gettemplate) and C(getmacro) of each template, read once):
+        macros equal to their inherited value are not written, and removed
+        when set on the template. Their number is returned as C(overrides_avoided)
+    type: bool
+    default: False
   state:
     description:
       - Create / Delete host template on Centreon
@@ -62,8 +142,16 @@ options:
       - Enable / Disable host template on Centreon
     default: enabled
     choices: c
+  preflight:
+    description:
+      - Before any write, check that the parent templates and commands
+        (C(check_command), C(event_handler) params) about to be linked
+        exist, and fail listing every missing one: all of them for a new
+        template, the added ones for an existing template
+    type: bool
+    default: True
 requirements:
-  - Python Centreon API
+  - python requests
 author:
     - Guillaume Watteeux
 '''
@@ -98,21 +186,11 @@ EXAMPLES = '''
 # Centreon module API Rest
 #
 
-try:
-    from centreonapi.centreon import Centreon
-except ImportError:
-    centreonapi_found = False
-else:
-    centreonapi_found = True
-
 
 def main():
 
     module = AnsibleModule(
-        argument_spec=dict(
-            url=dict(required=True),
-            username=dict(default='admin', no_log=True),
-            password=dict(default='centreon', no_log=True),
+        argument_spec=centreon_argument_spec(
             name=dict(required=True),
             hosttemplates=dict(type='list', default=[]),
             hosttemplates_action=dict(default='add', choices=['add', 'set']),
@@ -120,209 +198,31 @@ def main():
             ipaddr=dict(default=None),
             params=dict(type='list', default=[]),
             macros=dict(type='list', default=[]),
+            macros_inherit=dict(default=False, type='bool'),
             state=dict(default='present', choices=['present', 'absent']),
-            status=dict(default='enabled', choices=['enabled', 'disabled'])
-        )
+            status=dict(default='enabled', choices=['enabled', 'disabled']),
+            preflight=dict(default=True, type='bool')
+        ),
+        supports_check_mode=True
     )
 
-    if not centreonapi_found:
-        module.fail_json(msg="Python centreonapi module is required (>0.1.0)")
-
-    url = module.params["url"]
-    username = module.params["username"]
-    password = module.params["password"]
-    name = module.params["name"]
-    alias = module.params["alias"]
-    ipaddr = module.params["ipaddr"]
-    hosttemplates = module.params["hosttemplates"]
-    hosttemplates_action = module.params["hosttemplates_action"]
-    params = module.params["params"]
-    macros = module.params["macros"]
-    state = module.params["state"]
-    status = module.params["status"]
-
-    has_changed = False
-
-    try:
-        centreon = Centreon(url, username, password)
-    except Exception as e:
-        module.fail_json(
-            msg="Unable to connect to Centreon API: %s" % e.message
-        )
-
-    data = list()
+    centreon = centreon_client(module)
 
-    ht = None
+    result = dict(changed=False, msg=list())
     try:
-        ht = centreon.host_template.get(name)
-    except requests.exceptions.HTTPError as e:
-        data.append("Host template %s not found" % name)
-
-    is_creation = False
-
-    if ht is None and state == "present":
-        is_creation = True
-        try:
-            data.append("Add %s %s %s %s" %
-                        (name, alias, ipaddr, hosttemplates))
-            centreon.host_template.add(
-                name,
-                alias,
-                ipaddr,
-                hosttemplates
-            )
-            has_changed = True
-            data.append("Add host template: %s" % name)
-        except Exception as e:
-            module.fail_json(msg='Create: %s - %s' % (e.message, data), changed=has_changed)
-
-        try:
-            ht = centreon.host_template.get(name)
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Failed to retrieve host template %s after creation: %s' % (name, e.message), changed=has_changed)
-
-    if not ht:
-        module.fail_json(msg="Unable to find host template %s " % name, changed=has_changed)
-
-    if state == "absent":
-        try:
-            centreon.host_template.delete(name)
-            has_changed = True
-            module.exit_json(
-                changed=has_changed, result="Host %s deleted" % name
-            )
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Failed to delete host template: %s' % e.message, changed=has_changed)
-
-    if status == "disabled" and int(ht.state) == 1:
-        try:
-            centreon.host_template.disable(name)
-            has_changed = True
-            data.append("Host disabled")
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Unable to disable host template: %s' % e.message, changed=has_changed)
-
-    if status == "enabled" and int(ht.state) == 0:
-        try:
-            centreon.host_template.enable(name)
-            has_changed = True
-            data.append("Host enabled")
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Unable to enable host template: %s' % e.message, changed=has_changed)
-
-    if not ht.address == ipaddr and ipaddr:
-        try:
-            centreon.host_template.setparam(name, 'address', ipaddr)
-            has_changed = True
-            data.append(
-                "Change ip addr: %s -> %s" % (ht.address, ipaddr)
-            )
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Unable to change ip addr: %s' % e.message, changed=has_changed)
-
-    if not ht.alias == alias and alias:
-        try:
-            centreon.host_template.setparam(name, 'alias', alias)
-            has_changed = True
-            data.append("Change alias: %s -> %s" % (ht.alias, alias))
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Unable to change alias: %s' % e.message, changed=has_changed)
-
-    #### HostTemplates
-    if hosttemplates and not is_creation:
-        try:
-            gettemplate_result = centreon.host_template.gettemplate(name)
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(
-                msg="Unable to retrieve list of parent templates: %s" % e.message,
-                changed=has_changed
-            )
-
-        parent_template_list = list()
-        for parent_ht in gettemplate_result['result']:
-            parent_template_list.append(parent_ht['name'])
-
-        is_there_any_change = False
-
-        if hosttemplates_action == 'add':
-            # NB: they are returned in reverse order
-            current_templates = parent_template_list[::-1]
-            # NB: we assume those also are configured in reverse order, to mimick
-            #     Centreon GUI
-            new_templates = hosttemplates[::-1]
-            new_template_list = []
-            for curr_t in current_templates:
-                if curr_t in new_templates:
-                    i = new_templates.index(curr_t)
-                    new_template_list.extend(new_templates[0:i+1])
-                    new_templates = new_templates[i+1:]
-                else:
-                    new_template_list.append(curr_t)
-                    new_template_list.extend(new_templates)
-                    new_template_list = new_template_list[::-1]
-        elif hosttemplates_action == 'set':
-            new_template_list = hosttemplates
-
-        is_there_any_change = len(parent_template_list) != len(new_template_list)
-        if not is_there_any_change:
-            for i, ht in enumerate(parent_template_list):
-                if ht != new_template_list[i]:
-                    is_there_any_change = True
-                    break
-
-        if is_there_any_change:
-            try:
-                centreon.host_template.setparent(name, new_template_list)
-                has_changed = True
-                data.append("%s parent HostTemplate: %s" % (hosttemplates_action, new_templates))
-            except requests.exceptions.HTTPError as e:
-                module.fail_json(
-                    msg="Unable to %s parent templates: %s" % (hosttemplates_action, e.message),
-                    changed=has_changed
-                )
-
-    #### Macros
-    if macros:
-        # try:
-        #     getmacro_result = centreon.host_template.getmacro(name)
-        # except requests.exceptions.HTTPError as e:
-        #     module.fail_json(
-        #         msg="Unable to retrieve list of macros: %s" % e.message,
-        #         changed=has_changed
-        #     )
-        # current_macro_dict = {}
-        # for current_macro in getmacro_result['result']:
-        #     k = current_macro['macro name']
-        #     v = current_macro['macro value']
-        #     macro_dict[k] = v
-
-        # NB: cannot seem to set `description` and `is_password` w/ current clapi version
-
-        for k in macros:
-            try:
-                centreon.host_template.setmacro(name, k.get('name').upper(), k.get('value'))
-                has_changed = True
-                data.append("Add macros %s" % k.get('name').upper())
-            except requests.exceptions.HTTPError as e:
-                module.fail_json(
-                    msg="Unable to set macro %s: %s" % (k.get('name'), e.message),
-                    changed=has_changed
-                )
-
-    #### Params
-    if params:
-        for k in params:
-            try:
-                centreon.host_template.setparam(name, k.get('name'), k.get('value'))
-                has_changed = True
-            except requests.exceptions.HTTPError as e:
-                module.fail_json(
-                    msg='Unable to set param %s: %s' % (k.get('name'), e.message),
-                    changed=has_changed
-                )
+        ensure_host_template(centreon, module.params, result, parallel=True,
+                             preflight=module.params["preflight"])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg=str(e), changed=result['changed'])
 
-    module.exit_json(changed=has_changed, msg=data)
+    if module.params["state"] == "absent":
+        exit_json(module, centreon, changed=result['changed'],
+                  result="Host %s deleted" % module.params["name"])
+    if module.params["macros_inherit"]:
+        exit_json(module, centreon, changed=result['changed'], msg=result['msg'],
+                  overrides_avoided=result.get('overrides_avoided', 0))
+    exit_json(module, centreon, changed=result['changed'], msg=result['msg'])
 
 
 if __name__ == '__main__':
-    main()
+    run_module(main)
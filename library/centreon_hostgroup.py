@@ -3,7 +3,11 @@
 
 # import module snippets
 from ansible.module_utils.basic import AnsibleModule
-import requests
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json
+)
+from ansible.module_utils.centreon.profiling import run_module
 
 ANSIBLE_METADATA = {
     'status': ['preview'],
@@ -30,6 +34,73 @@ options:
     description:
       - Centreon API username's password
     required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, as C(known_state) does
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
   hg:
     description:
       - Hostgroup name (/ alias)
@@ -39,7 +110,7 @@ options:
     default: present
     choices: ['present', 'absent']
 requirements:
-  - Python Centreon API
+  - python requests
 author:
     - Guillaume Watteeux
 '''
@@ -70,65 +141,43 @@ EXAMPLES = '''
 # Centreon module API Rest
 #
 
-try:
-    from centreonapi.centreon import Centreon
-except ImportError:
-    centreonapi_found = False
-else:
-    centreonapi_found = True
-
 
 def main():
 
     module = AnsibleModule(
-        argument_spec=dict(
-            url=dict(required=True),
-            username=dict(default='admin', no_log=True),
-            password=dict(default='centreon', no_log=True),
+        argument_spec=centreon_argument_spec(
             hg=dict(required=True, type='list'),
             state=dict(default='present', choices=['present', 'absent'])
-        )
+        ),
+        supports_check_mode=True
     )
 
-    if not centreonapi_found:
-        module.fail_json(msg="Python centreonapi module is required")
-
-    url = module.params["url"]
-    username = module.params["username"]
-    password = module.params["password"]
     name = module.params["hg"]
     state = module.params["state"]
 
     has_changed = False
 
-    try:
-        centreon = Centreon(url, username, password)
-    except Exception as e:
-        module.fail_json(
-            msg="Unable to connect to Centreon API: %s" % e.message
-        )
+    centreon = centreon_client(module)
 
     try:
-        hostgroups_list_result = centreon.hostgroups.list()
-    except requests.exceptions.HTTPError as e:
-        module.fail_json(msg="Unable to hostgroups list %s " % e.message)
-
-    hostgroups = [hg['name'] for hg in hostgroups_list_result["result"]]
+        hostgroups = centreon.exists('HG', [hg.get('name') for hg in name])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg="Unable to hostgroups list %s " % e)
 
     if state == "absent":
-        for hg in name:
-            hg_name = hg.get('name')
-            if hg_name in hostgroups:
-                try:
-                    centreon.hostgroups.delete(hg_name)
-                    has_changed = True
-                except requests.exceptions.HTTPError as e:
-                    module.fail_json(
-                        msg="Unable to delete hostgroup %s: %s" % (hg, e.message),
-                        changed=has_changed
-                    )
+        deleted = [hg.get('name') for hg in name if hg.get('name') in hostgroups]
+        if deleted:
+            try:
+                centreon.call_many('del', 'HG', deleted)
+                has_changed = True
+            except CentreonAPIError as e:
+                fail_json(
+                    module, centreon,
+                    msg="Unable to delete hostgroups %s: %s" % (deleted, e),
+                    changed=has_changed
+                )
         if has_changed:
-            module.exit_json(msg="Hostgroups deleted %s" % name, changed=has_changed)
+            exit_json(module, centreon, msg="Hostgroups deleted %s" % name, changed=has_changed)
 
     else:
         for hg in name:
@@ -136,15 +185,15 @@ def main():
                 hg_name = hg.get('name')
                 hg_alias = hg.get('alias', hg_name)
                 try:
-                    centreon.hostgroups.add(hg_name, hg_alias)
+                    centreon.call('add', 'HG', [hg_name, hg_alias])
                     has_changed = True
-                except requests.exceptions.HTTPError as e:
-                    module.fail_json(msg="Unable to create hostgroup: %s" % e.message)
+                except CentreonAPIError as e:
+                    fail_json(module, centreon, msg="Unable to create hostgroup: %s" % e)
 
         if has_changed:
-            module.exit_json(msg="Hostgroups created %s" % name, changed=has_changed)
+            exit_json(module, centreon, msg="Hostgroups created %s" % name, changed=has_changed)
 
-    module.exit_json(changed=has_changed)
+    exit_json(module, centreon, changed=has_changed)
 
 if __name__ == '__main__':
-    main()
+    run_module(main)
@@ -3,7 +3,15 @@
 
 # import module snippets
 from ansible.module_utils.basic import AnsibleModule
-import requests
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json, reload_pollers
+)
+from ansible.module_utils.centreon.generation import Fingerprints, apply_if_changed
+from ansible.module_utils.centreon.pollers import (
+    list_pollers, poller_hosts, host_service_counts, host_costs, plan_rebalance
+)
+from ansible.module_utils.centreon.profiling import run_module
 
 ANSIBLE_METADATA = {
     'status': ['preview'],
@@ -31,6 +39,66 @@ options:
     description:
       - Centreon API username's password
     required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, as C(known_state) does
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
   instance:
     description:
       - Poller instance to check host
@@ -38,10 +106,53 @@ options:
   action:
     description:
       - action for poller
+      - C(rebalance) moves at most C(max_moves) hosts from the most loaded
+        to the least loaded of C(pollers), then applies the configuration of
+        every poller involved
     default: applycfg
-    choices: ['applycfg']
+    choices: ['applycfg', 'rebalance']
+  pollers:
+    description:
+      - Pollers to balance hosts across, all enabled pollers if empty
+    type: list
+  balance_by:
+    description:
+      - Load measure used by C(rebalance)
+    default: hosts
+    choices: ['hosts', 'services']
+  max_moves:
+    description:
+      - Maximum number of hosts moved by one C(rebalance) run
+    default: 10
+  applycfg:
+    description:
+      - Apply configuration on the pollers touched by C(rebalance)
+    default: True
+    type: bool
+  reload:
+    description:
+      - C(always) runs APPLYCFG (generate, test, move and reload)
+      - C(changed) generates the configuration, fingerprints it with
+        C(fingerprint_command) and only tests, moves and reloads it when the
+        fingerprint differs from the one of the last successful apply
+    default: always
+    choices: ['always', 'changed']
+  fingerprint_command:
+    description:
+      - Command printing the generated configuration of a poller,
+        C({poller}) and C({id}) being replaced by its name and id, for
+        instance C(ssh central 'cat /var/cache/centreon/config/engine/{id}/*.cfg').
+        Comment lines are left out of the fingerprint. Required with
+        C(reload: changed)
+  fingerprint_dir:
+    description:
+      - Where the fingerprints of the last applies are kept, default a
+        C(centreon-fingerprints) directory in the temporary directory.
+        Every APPLYCFG, of any module, drops the fingerprint of its poller
+        there: give the other modules the same one
+    type: path
 requirements:
-  - Python Centreon API
+  - python requests
 author:
     - Guillaume Watteeux
 '''
@@ -54,6 +165,27 @@ EXAMPLES = '''
      password: 'strong_pass_from_vault'
      instance: Central
      action: applycfg
+# Reload only when the generated configuration changed
+ - centreon_poller:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     instance: Poller-1
+     reload: changed
+     fingerprint_command: "ssh central 'cat /var/cache/centreon/config/engine/{id}/*.cfg'"
+     fingerprint_dir: /var/lib/ansible/centreon-fingerprints
+
+# Move at most 20 hosts towards the least loaded pollers
+ - centreon_poller:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     action: rebalance
+     pollers:
+       - Poller-1
+       - Poller-2
+       - Poller-3
+     max_moves: 20
 '''
 
 # =============================================
@@ -61,59 +193,90 @@ EXAMPLES = '''
 #
 
 
-try:
-    from centreonapi.centreon import Centreon
-except ImportError:
-    centreonapi_found = False
-else:
-    centreonapi_found = True
-
-
 def main():
 
     module = AnsibleModule(
-        argument_spec=dict(
-            url=dict(required=True),
-            username=dict(default='admin', no_log=True),
-            password=dict(default='centreon', no_log=True),
+        argument_spec=centreon_argument_spec(
             instance=dict(default='Central'),
-            action=dict(default='applycfg', choices=['applycfg']),
-        )
+            action=dict(default='applycfg', choices=['applycfg', 'rebalance']),
+            pollers=dict(type='list', default=[]),
+            balance_by=dict(default='hosts', choices=['hosts', 'services']),
+            max_moves=dict(default=10, type='int'),
+            applycfg=dict(default=True, type='bool'),
+            reload=dict(default='always', choices=['always', 'changed']),
+            fingerprint_command=dict(default=None),
+        ),
+        required_if=[('reload', 'changed', ['fingerprint_command'])],
+        supports_check_mode=True
     )
 
-    if not centreonapi_found:
-        module.fail_json(msg="Python centreonapi module is required")
-
-    url = module.params["url"]
-    username = module.params["username"]
-    password = module.params["password"]
     instance = module.params["instance"]
     action = module.params["action"]
+    pollers = module.params["pollers"]
+    balance_by = module.params["balance_by"]
+    max_moves = module.params["max_moves"]
+    applycfg = module.params["applycfg"]
 
     has_changed = False
 
-    try:
-        centreon = Centreon(url, username, password)
-    except Exception as exc:
-        module.fail_json(
-            msg="Unable to connect to Centreon API: %s" % exc.message
+    client = centreon_client(module)
+
+    if action == "rebalance":
+        try:
+            if not pollers:
+                pollers = list_pollers(client)
+            assignments = poller_hosts(client, pollers)
+            service_counts = None
+            if balance_by == 'services':
+                service_counts = host_service_counts(client)
+        except CentreonAPIError as e:
+            fail_json(module, client, msg="Unable to get poller load: %s" % e)
+
+        moves = plan_rebalance(
+            assignments, host_costs(assignments, service_counts), max_moves
+        )
+        touched = set()
+        for host, src, dst in moves:
+            try:
+                client.call('setinstance', 'HOST', [host, dst])
+                has_changed = True
+                touched.update([src, dst])
+            except CentreonAPIError as e:
+                fail_json(module, client, msg="Unable to move host %s to %s: %s" % (host, dst, e), changed=has_changed)
+
+        if applycfg:
+            reload_pollers(module, client, sorted(touched), has_changed)
+
+        exit_json(
+            module, client,
+            msg="Moved %d hosts" % len(moves),
+            moves=[dict(host=h, src=s, dst=d) for h, s, d in moves],
+            changed=has_changed
         )
 
     try:
-        poller = centreon.poller.get(instance)
-    except requests.exceptions.HTTPError as e:
-        module.fail_json(msg="Unable to get poller list %s " % e.message)
+        poller = [p for p in client.call('show', 'INSTANCE', instance) if p['name'] == instance]
+    except CentreonAPIError as e:
+        fail_json(module, client, msg="Unable to get poller list %s " % e)
+    if not poller:
+        fail_json(module, client, msg="Unable to find poller %s" % instance)
 
-    if action == "applycfg":
+    if action == "applycfg" and module.params["reload"] == 'changed' and not module.check_mode:
+        fingerprints = Fingerprints(client.url, client.fingerprint_dir)
         try:
-            centreon.poller.applycfg(instance)
-            has_changed = True
-        except requests.exceptions.HTTPError as e:
-            module.fail_json(msg='Failed while reloading poller: %s' % e.message, changed=has_changed)
-        module.exit_json(msg="Applied config on poller", changed=has_changed)
+            reloaded, digest = apply_if_changed(client, instance, poller[0]['id'],
+                                                module.params["fingerprint_command"], fingerprints)
+        except CentreonAPIError as e:
+            fail_json(module, client, msg='Failed while applying config on poller %s: %s' % (instance, e))
+        exit_json(module, client, changed=reloaded, fingerprint=digest,
+                  msg="Applied config on poller" if reloaded else "Configuration of poller unchanged")
+
+    if action == "applycfg":
+        reload_pollers(module, client, [instance])
+        exit_json(module, client, msg="Applied config on poller", changed=True)
 
-    module.exit_json(changed=has_changed)
+    exit_json(module, client, changed=has_changed)
 
 
 if __name__ == '__main__':
-    main()
+    run_module(main)
@@ -0,0 +1,221 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# import module snippets
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.common import (
+    centreon_argument_spec, centreon_client, exit_json, fail_json
+)
+from ansible.module_utils.centreon.preflight import describe
+from ansible.module_utils.centreon.profiling import run_module
+from ansible.module_utils.centreon.service_template import (
+    deploy_levels, missing_template_references, service_template_spec, template_levels
+)
+
+ANSIBLE_METADATA = {
+    'status': ['preview'],
+    'supported_by': 'community',
+    'metadata_version': '0.2',
+    'version': '0.2'
+}
+
+DOCUMENTATION = '''
+---
+module: centreon_service_template_bulk
+version_added: "2.2"
+short_description: add many service templates to centreon, parents first
+
+description:
+  - Orders the templates by their C(parenttemplate) links within the list,
+    then creates or updates them level by level, the templates of a level
+    in parallel. Templates to remove go last, children first.
+  - Before any write, the run fails on a cycle of parents, or on a parent
+    neither in the list nor on the central.
+  - Alias, host templates, macros and params are only written when they
+    differ, as centreon_service_template does.
+
+options:
+  url:
+    description:
+      - Centreon URL
+    required: True
+  username:
+    description:
+      - Centreon API username
+    required: True
+  password:
+    description:
+      - Centreon API username's password
+    required: True
+  api_retries:
+    description:
+      - Number of times a read failing on a connection or server error is sent again
+    default: 0
+  backend:
+    description:
+      - API used, C(v1) (centreon_clapi endpoint) or C(v2) (REST API,
+        C(/api/latest), with paginated and filtered listings)
+    default: v1
+    choices: ['v1', 'v2']
+  compression:
+    description:
+      - C(responses) lets the central gzip its answers, C(all) also gzips
+        request bodies of 1 KiB or more (sent as is again if the central
+        refuses them), C(off) asks for plain answers
+    default: responses
+    choices: ['off', 'responses', 'all']
+  lookup_threshold:
+    description:
+      - Number of names above which existence checks list the whole object
+        once instead of searching each name
+    default: 20
+  circuit_breaker:
+    description:
+      - Fail fast while the central is failing. Keys C(failures) (consecutive
+        connection errors, timeouts, 5xx or slow calls opening the breaker,
+        default 5), C(slow_call) (seconds above which a call counts as failed),
+        C(cooldown) (seconds before a probe request is let through, default 30),
+        C(wait) (seconds a task waits for the breaker to close before failing,
+        default 0) and C(state_dir) (where the state shared by the forks is kept,
+        default a C(centreon-breaker) directory in the temporary directory)
+    type: dict
+  profile_dir:
+    description:
+      - Profile the run and write the profile and its phases (import, connect,
+        read, write, applycfg) to a new directory under this one. The
+        C(CENTREON_PROFILE_DIR) environment variable does the same
+    type: path
+  profiler:
+    description:
+      - C(cprofile), or C(sampling) to use pyinstrument when it is installed.
+        Defaults to the C(CENTREON_PROFILER) environment variable
+    default: cprofile
+    choices: ['cprofile', 'sampling']
+  export_command:
+    description:
+      - Command printing a CLAPI configuration export of the central, for
+        instance C(ssh central centreon -u admin -p secret -e {select}).
+        Its HOST, HG, HTPL and STPL objects are parsed while it runs and
+        answer the reads, so hosts, hostgroups and templates are gathered
+        without per-object calls
+  export_filter:
+    description:
+      - Objects to export (C(OBJECT;name)), each given as a C(--select) in
+        place of C({select}). Objects left out are read from the API
+    type: list
+  fingerprint_dir:
+    description:
+      - Where centreon_poller keeps the fingerprints of the configurations
+        applied with C(reload=changed), default a C(centreon-fingerprints)
+        directory in the temporary directory. Every APPLYCFG drops the
+        fingerprint of its poller there, give every task the same one
+    type: path
+  known_state:
+    description:
+      - C(centreon) fact returned by centreon_facts. Reads it can answer are
+        not sent to the API
+    type: dict
+  templates:
+    description:
+      - List of service templates, each one accepting the
+        centreon_service_template options (name, alias, parenttemplate,
+        hosttemplates, hosttemplates_action, params, macros, state)
+    type: list
+    required: True
+  concurrency:
+    description:
+      - Number of templates of a level handled in parallel
+    default: 4
+  preflight:
+    description:
+      - Also check, before any write, that the host templates and commands
+        (C(check_command), C(event_handler) params) the templates refer to
+        exist, and fail listing every missing one. Parents are always checked
+    type: bool
+    default: True
+requirements:
+  - python requests
+author:
+    - Guillaume Watteeux
+'''
+
+EXAMPLES = '''
+# Plugin pack rollout
+ - centreon_service_template_bulk:
+     url: 'https://centreon.company.net/centreon'
+     username: 'ansible_api'
+     password: 'strong_pass_from_vault'
+     templates:
+       - name: App-Base
+         macros:
+           - name: WARNING
+             value: 80
+       - name: App-Http
+         parenttemplate: App-Base
+         hosttemplates: [App-Server]
+         params:
+           - name: check_command
+             value: check_http
+       - name: App-Http-Latency
+         parenttemplate: App-Http
+     concurrency: 8
+   run_once: true
+   delegate_to: localhost
+'''
+
+# =============================================
+# Centreon module API Rest
+#
+
+
+def main():
+
+    module = AnsibleModule(
+        argument_spec=centreon_argument_spec(
+            templates=dict(type='list', required=True),
+            concurrency=dict(default=4, type='int'),
+            preflight=dict(default=True, type='bool'),
+        ),
+        supports_check_mode=True
+    )
+
+    specs = list()
+    for t in module.params["templates"]:
+        if not isinstance(t, dict) or not t.get('name'):
+            module.fail_json(msg="Each template needs a name: %s" % t)
+        specs.append(service_template_spec(t))
+    names = [s['name'] for s in specs]
+    duplicates = sorted(set(n for n in names if names.count(n) > 1))
+    if duplicates:
+        module.fail_json(msg="Templates listed more than once: %s" % ', '.join(duplicates))
+
+    centreon = centreon_client(module, pool_size=max(10, module.params["concurrency"]))
+
+    try:
+        levels = template_levels([s for s in specs if s['state'] == 'present'])
+        # children are removed before their parents
+        removals = template_levels([s for s in specs if s['state'] == 'absent'])[::-1]
+        missing = missing_template_references(centreon, specs, module.params["preflight"])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg=str(e))
+    if missing:
+        fail_json(module, centreon, msg='Pre-flight check failed: %s' % describe(missing))
+
+    try:
+        results = deploy_levels(centreon, levels + removals, module.params["concurrency"])
+    except CentreonAPIError as e:
+        fail_json(module, centreon, msg=str(e))
+
+    has_changed = any(r['changed'] for r in results)
+    failed = [r['name'] for r in results if r.get('failed')]
+    if failed:
+        fail_json(module, centreon, msg="%d of %d templates failed" % (len(failed), len(results)),
+                  failed_templates=failed, templates=results, changed=has_changed)
+
+    exit_json(module, centreon, changed=has_changed, templates=results,
+              levels=len(levels))
+
+
+if __name__ == '__main__':
+    run_module(main)
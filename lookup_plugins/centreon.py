@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+#
+# Centreon configuration data for templates, read on the controller.
+#
+# Lookups are templated in the forks of the play, a new process per task and
+# host: results are memoized in files shared by the forks (one per query,
+# under `cache_dir`, in a directory of the ansible-playbook process) and kept
+# `ttl` seconds. The fork missing a result fetches it under a lock while the
+# others wait and then read it, so the same query for thousands of hosts
+# reaches the API once. `poller` and `show` read one listing answering every
+# name. Within a process, one client per central is kept for the lookups
+# that follow.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    lookup: centreon
+    short_description: Read Centreon configuration data, memoized for the play
+    description:
+      - Returns, for each name, the answer to a query on the Centreon API,
+        memoized for the play so that repeated lookups across hosts send the
+        query once.
+      - C(poller) is the poller of a host, C(members) the hosts of a
+        hostgroup, C(macros) the macros set on an object (C(object) HTPL by
+        default, or HOST or STPL) and C(show) the SHOW record of an object of
+        type C(object).
+    options:
+      _terms:
+        description: The query (C(poller), C(members), C(macros) or C(show)), then names
+        required: True
+      url:
+        description: Centreon URL, the C(centreon_url) variable by default
+      username:
+        description: API username, the C(centreon_api_user) variable by default
+        default: admin
+      password:
+        description: API password, the C(centreon_api_pass) variable by default
+        default: centreon
+      backend:
+        description: API used, C(v1) or C(v2)
+        default: v1
+      object:
+        description: CLAPI object of C(macros) and C(show) (HOST, HTPL, STPL, HG, INSTANCE, CMD)
+      ttl:
+        description: Seconds a result is reused, 0 to always read it again
+        default: 300
+      cache_dir:
+        description: Where results are kept, a C(centreon-lookup) directory of the temporary directory by default
+'''
+
+EXAMPLES = '''
+- debug:
+    msg: "{{ inventory_hostname }} is monitored by {{ lookup('centreon', 'poller', inventory_hostname) }}"
+
+- set_fact:
+    linux_servers: "{{ lookup('centreon', 'members', 'Linux-Servers') }}"
+    snmp_community: "{{ lookup('centreon', 'macros', 'OS-Linux-SNMP-custom')['SNMPCOMMUNITY'] }}"
+    host_alias: "{{ lookup('centreon', 'show', inventory_hostname, object='HOST').alias }}"
+'''
+
+RETURN = '''
+  _list:
+    description:
+      - One answer per name. C(poller) and C(show) answer None for unknown
+        objects, C(members) and C(macros) fail
+    type: list
+'''
+
+import errno
+import fcntl
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import ansible.module_utils
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+
+# the client lives in the module_utils of the role
+_MODULE_UTILS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'module_utils')
+if _MODULE_UTILS not in ansible.module_utils.__path__:
+    ansible.module_utils.__path__.append(_MODULE_UTILS)
+
+from ansible.module_utils.centreon.client import CentreonAPIError  # noqa: E402
+from ansible.module_utils.centreon.common import new_client  # noqa: E402
+from ansible.module_utils.centreon.host import get_macros  # noqa: E402
+from ansible.module_utils.centreon.pollers import poller_hosts  # noqa: E402
+
+# clients of this process, by (backend, url, username)
+_clients = {}
+
+
+def _poller_index(client, obj, name):
+    """ {host: poller} of every host """
+    pollers = [p.name for p in client.show('INSTANCE', ['name'])]
+    return dict((h, p) for p, hosts in poller_hosts(client, pollers).items() for h in hosts)
+
+
+def _show_index(client, obj, name):
+    """ {name: SHOW record} of every `obj` """
+    key = 'description' if obj == 'STPL' else 'name'
+    return dict((r[key], r) for r in client.call('show', obj))
+
+
+def _members(client, obj, name):
+    return [m['name'] for m in client.call('getmember', 'HG', name)]
+
+
+# query -> (whether one fetch answers every name, fetch(client, object, name))
+QUERIES = dict(
+    poller=(True, _poller_index),
+    show=(True, _show_index),
+    members=(False, _members),
+    macros=(False, get_macros),
+)
+
+
+def _controller_pid():
+    """ Pid of the ansible-playbook process, whose forks share the memo """
+    if multiprocessing.current_process().name == 'MainProcess':
+        return os.getpid()
+    return os.getppid()
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # alive, owned by another user
+        return e.errno == errno.EPERM
+    return True
+
+
+class Memo(object):
+    """ Results of the play kept in files, `ttl` seconds """
+
+    def __init__(self, cache_dir, ttl):
+        self.ttl = ttl
+        base = cache_dir or os.path.join(tempfile.gettempdir(), 'centreon-lookup')
+        self.directory = os.path.join(base, str(_controller_pid()))
+        if not os.path.isdir(self.directory):
+            self._prune(base)
+            try:
+                os.makedirs(self.directory, 0o700)
+            except OSError:
+                # created by another fork meanwhile
+                if not os.path.isdir(self.directory):
+                    raise
+
+    @staticmethod
+    def _prune(base):
+        """ Drop the memos of plays no longer running """
+        if not os.path.isdir(base):
+            return
+        for entry in os.listdir(base):
+            if entry.isdigit() and not _alive(int(entry)):
+                shutil.rmtree(os.path.join(base, entry), ignore_errors=True)
+
+    def _fresh(self, f):
+        f.seek(0)
+        content = f.read()
+        try:
+            entry = json.loads(content) if content else None
+        except ValueError:
+            return None
+        if entry is not None and time.time() - entry['time'] < self.ttl:
+            return entry
+        return None
+
+    def get(self, key, fetch):
+        """ Memoized result of `fetch()` for `key` """
+        path = os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            with os.fdopen(os.dup(fd), 'r+') as f:
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                entry = self._fresh(f)
+                if entry is not None:
+                    return entry['value']
+                # one fork fetches, the others wait for its result
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                entry = self._fresh(f)
+                if entry is not None:
+                    return entry['value']
+                value = fetch()
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(dict(time=time.time(), value=value)))
+                f.flush()
+                return value
+        finally:
+            os.close(fd)
+
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        variables = variables or {}
+        if not terms or terms[0] not in QUERIES:
+            raise AnsibleError("centreon lookup: the first term is one of %s" % ', '.join(sorted(QUERIES)))
+        query, names = terms[0], terms[1:]
+        indexed, fetch = QUERIES[query]
+        obj = kwargs.get('object') or ('HTPL' if query == 'macros' else None)
+        if query == 'show' and not obj:
+            raise AnsibleError("centreon lookup: show needs an object")
+
+        url = kwargs.get('url') or variables.get('centreon_url')
+        if not url:
+            raise AnsibleError("centreon lookup: no url nor centreon_url variable")
+        username = kwargs.get('username') or variables.get('centreon_api_user') or 'admin'
+        password = kwargs.get('password') or variables.get('centreon_api_pass') or 'centreon'
+        backend = kwargs.get('backend', 'v1')
+        memo = Memo(kwargs.get('cache_dir'), int(kwargs.get('ttl', 300)))
+
+        def client():
+            key = (backend, url.rstrip('/'), username)
+            if key not in _clients:
+                _clients[key] = new_client(backend, url, username, password)
+            return _clients[key]
+
+        def answer(name):
+            key = json.dumps([backend, url.rstrip('/'), username, query, obj, None if indexed else name])
+            return memo.get(key, lambda: fetch(client(), obj, name))
+
+        try:
+            if indexed:
+                index = answer(None)
+                return [index.get(n) for n in names] if names else [index]
+            return [answer(n) for n in names]
+        except CentreonAPIError as e:
+            raise AnsibleError("centreon lookup %s: %s" % (query, e))
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+#
+# Shared helpers for the centreon_* modules of this role.
+#
+# Ansible ships everything below `module_utils/` of a role together with the
+# modules, so the centreon_* modules can import it as
+# `ansible.module_utils.centreon`.
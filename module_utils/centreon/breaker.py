@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# Circuit breaker shared by every process talking to one central.
+#
+# When a central degrades, each fork keeps sending requests and waits for
+# its timeouts, which delays the failure of the play and the recovery of the
+# central. After `failures` consecutive failed requests (connection errors,
+# timeouts, 5xx, and calls slower than `slow_call` seconds), the breaker
+# opens: requests are refused at once, or wait up to `wait` seconds for it to
+# close. After `cooldown` seconds, a single request is let through as a probe
+# (half-open); its success closes the breaker, its failure opens it again.
+# Only the probe decides: the answers of requests sent before the breaker
+# opened, or of a probe given up, leave it as it is.
+#
+# The state lives in a small JSON file per central URL under `state_dir`,
+# read and written under an exclusive flock (statefile.py), so the forks of a
+# play (and the threads of centreon_host_bulk) share it.
+
+import time
+
+from ansible.module_utils.centreon import statefile
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, url, failures=5, slow_call=None, cooldown=30, wait=0,
+                 state_dir=None, probe_timeout=30):
+        self.url = url
+        self.failures = max(1, failures)
+        self.slow_call = slow_call
+        self.cooldown = cooldown
+        self.wait = wait
+        # a probe not reported after this long is given up (dead process)
+        self.probe_timeout = probe_timeout
+        self.path = statefile.state_path(url, state_dir, 'centreon-breaker')
+
+    def _update(self, change):
+        """ Run `change(state)` on the shared state, returning its result """
+        def defaults(state):
+            state.setdefault('state', CLOSED)
+            state.setdefault('failures', 0)
+            return change(state)
+        return statefile.update(self.path, defaults)
+
+    def before(self):
+        """
+        Wait for or refuse a request while the breaker is open. Returns
+        the id of the half-open probe when the request is one, else False
+        """
+        deadline = time.time() + self.wait
+        while True:
+            now = time.time()
+            allowed, retry_in, state = self._update(lambda s: self._admit(s, now))
+            if allowed is not None:
+                return allowed
+            if now + retry_in > deadline:
+                raise CentreonAPIError(
+                    "Circuit breaker open for %s after %d consecutive failures (%s), "
+                    "next attempt in %ds" % (self.url, state['failures'], state.get('error'),
+                                             max(1, int(retry_in))))
+            time.sleep(min(retry_in, 1.0))
+
+    def _admit(self, state, now):
+        """ (probe id or False, 0, state) when a request may be sent, else (None, seconds to wait, state) """
+        if state['state'] == CLOSED:
+            return False, 0, state
+        if state['state'] == OPEN and now - state['opened'] >= self.cooldown:
+            state.update(state=HALF_OPEN, probe=now)
+            return now, 0, state
+        if state['state'] == HALF_OPEN and now - state.get('probe', 0) >= self.probe_timeout:
+            state['probe'] = now
+            return now, 0, state
+        if state['state'] == OPEN:
+            return None, state['opened'] + self.cooldown - now, dict(state)
+        return None, state['probe'] + self.probe_timeout - now, dict(state)
+
+    @staticmethod
+    def _decides(state, probe):
+        """ Whether the answer of a request sent as `probe` may change `state` """
+        if state['state'] == CLOSED:
+            return True
+        return bool(probe) and state['state'] == HALF_OPEN and state.get('probe') == probe
+
+    def success(self, probe, seconds):
+        """ Report a request sent, answered in `seconds` """
+        if self.slow_call is not None and seconds > self.slow_call:
+            return self.failure(probe, "slow call: %.1fs" % seconds)
+
+        def change(state):
+            if (state['failures'] or state['state'] != CLOSED) and self._decides(state, probe):
+                state.clear()
+                state.update(state=CLOSED, failures=0)
+        self._update(change)
+
+    def failure(self, probe, error):
+        """ Report a request failed on a connection error, a timeout or a 5xx """
+        now = time.time()
+
+        def change(state):
+            if not self._decides(state, probe):
+                return
+            state['failures'] += 1
+            state['error'] = '%s' % error
+            if state['state'] == HALF_OPEN or state['failures'] >= self.failures:
+                state.update(state=OPEN, opened=now)
+                state.pop('probe', None)
+        self._update(change)
+
+
+def circuit_breaker(url, options, timeout=30):
+    """ CircuitBreaker of the `circuit_breaker` module option, None without it """
+    if not options:
+        return None
+    return CircuitBreaker(
+        url,
+        failures=int(options.get('failures', 5)),
+        slow_call=float(options['slow_call']) if options.get('slow_call') is not None else None,
+        cooldown=float(options.get('cooldown', 30)),
+        wait=float(options.get('wait', 0)),
+        state_dir=options.get('state_dir'),
+        probe_timeout=timeout,
+    )
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# CLAPI import files, the bulk write path of centreon_host_bulk.
+#
+# Creating a host through the API costs one call per action (HOST;ADD,
+# APPLYTPL, one SETMACRO per macro, ...). For an onboarding the same writes
+# are rather written as CLAPI import lines (`OBJECT;ACTION;values`, the format
+# of `centreon -i`) and submitted a chunk at a time by a runner: a command run
+# on the central, or any upload hook.
+#
+# Lines are ordered by what they depend on, whatever order they were added
+# in: templates and hostgroups first, then each host with its settings, its
+# memberships and last the template application which creates its services.
+# The lines of a host are kept together and chunks only hold whole hosts:
+# a chunk failing cannot leave a host of an earlier chunk without its
+# APPLYTPL, which no later run would send since the templates are linked.
+
+import time
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+# (object, action) -> rank, lines of a lower rank are submitted first
+_RANKS = {
+    ('HTPL', 'ADD'): 0,
+    ('HTPL', 'SETPARAM'): 1,
+    ('HTPL', 'SETMACRO'): 1,
+    ('HTPL', 'SETTEMPLATE'): 1,
+    ('HG', 'ADD'): 2,
+    ('HG', 'SETPARAM'): 3,
+    ('HOST', 'ADD'): 4,
+    ('HOST', 'SETPARAM'): 5,
+    ('HOST', 'SETMACRO'): 5,
+    ('HOST', 'SETINSTANCE'): 5,
+    ('HOST', 'DISABLE'): 5,
+    ('HOST', 'ADDHOSTGROUP'): 6,
+    ('HG', 'ADDMEMBER'): 6,
+    ('HOST', 'APPLYTPL'): 7,
+}
+
+
+def _value(v):
+    # one line per action: a newline would start another one
+    return '' if v is None else ('%s' % v).replace('\r', ' ').replace('\n', ' ')
+
+
+class ImportFile(object):
+
+    def __init__(self):
+        self.entries = []
+        # hosts in the order they were added
+        self.hosts = []
+
+    def add(self, obj, action, values, host=None):
+        """ Add a line, kept in the block of `host` when given """
+        if (obj.upper(), action.upper()) not in _RANKS:
+            raise ValueError("%s;%s cannot be imported" % (obj, action))
+        if host is not None and host not in self.hosts:
+            self.hosts.append(host)
+        self.entries.append((host, obj.upper(), action.upper(),
+                             ';'.join(_value(v) for v in values)))
+
+    def blocks(self):
+        """
+        (host, lines) blocks, dependencies first (the sort is stable): the
+        lines of no host, then the block of each host
+        """
+        order = dict((h, i) for i, h in enumerate(self.hosts, 1))
+        entries = sorted(self.entries, key=lambda e: (order.get(e[0], 0), _RANKS[(e[1], e[2])]))
+        blocks = list()
+        for host, obj, action, values in entries:
+            if not blocks or blocks[-1][0] != host:
+                blocks.append((host, list()))
+            blocks[-1][1].append('%s;%s;%s' % (obj, action, values))
+        return blocks
+
+    def lines(self):
+        """ Import lines, dependencies first """
+        return [line for _, lines in self.blocks() for line in lines]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def host_import(specs, existing_hostgroups=()):
+    """
+    ImportFile creating the hosts of `specs`, complete host specs with their
+    poller resolved in `instance`. Each host joins its hostgroups with one
+    HOST;ADDHOSTGROUP line of its own block
+    """
+    missing = sorted(set(hg for spec in specs for hg in spec['hostgroups']
+                         if hg not in existing_hostgroups))
+    if missing:
+        raise CentreonAPIError("Unknown hostgroups: %s" % ', '.join(missing))
+
+    f = ImportFile()
+    for spec in specs:
+        name = spec['name']
+        f.add('HOST', 'ADD', [name, spec['alias'], spec['ipaddr'],
+                              '|'.join(spec['hosttemplates']), spec['instance'], ''], name)
+        for p in spec['params']:
+            f.add('HOST', 'SETPARAM', [name, p.get('name'), p.get('value')], name)
+        for m in spec['macros']:
+            f.add('HOST', 'SETMACRO', [name, m.get('name').upper(), m.get('value')], name)
+        if spec['status'] == 'disabled':
+            f.add('HOST', 'DISABLE', [name], name)
+        if spec['hostgroups']:
+            f.add('HOST', 'ADDHOSTGROUP', [name, '|'.join(spec['hostgroups'])], name)
+        if spec['hosttemplates']:
+            f.add('HOST', 'APPLYTPL', [name], name)
+    return f
+
+
+def chunks(blocks, size):
+    """ Lists of whole `blocks` of up to `size` lines, a bigger block alone """
+    chunk, count = list(), 0
+    for block in blocks:
+        if chunk and count + len(block[1]) > size:
+            yield chunk
+            chunk, count = list(), 0
+        chunk.append(block)
+        count += len(block[1])
+    if chunk:
+        yield chunk
+
+
+def submit(client, blocks, runner, chunk_size=1000):
+    """
+    Hand the (host, lines) `blocks` to `runner(content)` in chunks of whole
+    blocks, up to `chunk_size` lines each, in order. Each chunk is timed as
+    an `import` call of `client`. Returns (error, hosts of the chunk that
+    failed, possibly imported in part): (None, []) when every chunk went
+    through. The chunks after a failed one are not sent
+    """
+    for chunk in chunks(blocks, max(1, chunk_size)):
+        lines = [line for _, block in chunk for line in block]
+        start = time.time()
+        ok = False
+        try:
+            runner('\n'.join(lines) + '\n')
+            ok = True
+        except CentreonAPIError as e:
+            return str(e), [host for host, _ in chunk if host is not None]
+        finally:
+            client._record('import', None, '%d lines' % len(lines), start, ok)
+    return None, []
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+#
+# Minimal client for the Centreon web API (v1, `centreon_clapi` object).
+#
+# Every module goes through this client: it sends any CLAPI action
+# (INSTANCE;GETHOSTS, HOST;SETINSTANCE, ...), not only the subset wrapped by
+# centreonapi.
+#
+# Unlike centreonapi, which keeps one process-wide connection, each client owns
+# its session: one client per central, shared by the threads working on it
+# (keep-alive connections are pooled by the session).
+#
+# In check mode, writes are not sent but recorded: reads go through as usual,
+# so a check run computes the same diff as a real run and `plan()` tells what
+# the real run would send.
+#
+# Every call sent is timed; `stats()` returns the timings so modules can hand
+# them to the centreon_api_cost callback plugin. Reads failing on a connection
+# error or a 5xx are sent again up to `retries` times.
+#
+# With `known_state` set, reads are first looked up in a centreon_facts
+# snapshot and only sent when it cannot answer them.
+#
+# With `breaker` set (a CircuitBreaker), requests are refused while the
+# central is failing instead of each one waiting for its timeout.
+#
+# An APPLYCFG makes centreon_poller forget the configuration fingerprint it
+# stored for the poller under `fingerprint_dir` (generation.py, an option of
+# every module): whatever sends it, the next `reload: changed` run reloads
+# instead of comparing with a configuration no longer deployed.
+#
+# show() reads big listings as compact records of the fields asked for,
+# parsed while the response is read (listing.py).
+#
+# exists() checks names with one filtered SHOW per name, listing the whole
+# object only when more than `lookup_threshold` names are asked: a full
+# listing of thousands of hostgroups costs more than a few small requests.
+#
+# requests is imported, and the session built, with the first request: runs
+# answered by known_state or an export never pay for loading it.
+#
+# `compression` trades CPU for bytes on slow links: `responses` (the default)
+# lets the central gzip its answers, `all` also gzips JSON bodies of
+# COMPRESS_MIN_SIZE bytes or more, `off` asks for plain answers. HTTP has no
+# way to tell whether a server takes compressed bodies: the first one
+# refused (400 or 415) is sent again as is, and so are the next ones.
+
+import json
+import threading
+import time
+import zlib
+
+from ansible.module_utils.centreon.listing import compact, iter_result, record_type
+
+
+# smaller bodies are sent as is, gzip would barely shrink them
+COMPRESS_MIN_SIZE = 1024
+
+
+class CentreonAPIError(Exception):
+    pass
+
+
+def _transient(e):
+    """ Whether `e` tells the central is failing: connection error, timeout or 5xx """
+    import requests
+    if isinstance(e, requests.exceptions.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+# applying the configuration of a poller, in one go or step by step
+APPLY_ACTIONS = ('applycfg', 'pollergenerate', 'fingerprint', 'pollertest', 'cfgmove', 'pollerreload')
+
+
+def is_write_action(action):
+    """ CLAPI actions either read (show*, get*) or change the configuration """
+    return not action.lower().startswith(('show', 'get'))
+
+
+class CentreonClient(object):
+
+    def __init__(self, url, username, password, timeout=30, pool_size=10,
+                 check_mode=False, retries=0, retry_delay=0.5, lookup_threshold=20,
+                 compression='responses'):
+        self.url = url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self.token = None
+        # guards the counters and records; authentication has its own lock
+        # as it records its call while holding it
+        self.lock = threading.Lock()
+        self.auth_lock = threading.Lock()
+        self.check_mode = check_mode
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retried = 0
+        # names checked one by one up to this count, with a listing above
+        self.lookup_threshold = lookup_threshold
+        # off, responses or all; request bodies stop being compressed once
+        # the central refused one
+        self.compression = compression
+        self.compress_requests = compression == 'all'
+        # KnownState answering reads from a centreon_facts snapshot
+        self.known_state = None
+        # CircuitBreaker shared with the other processes using the central
+        self.breaker = None
+        # `fingerprint_dir` of the fingerprints of centreon_poller forgotten
+        # on APPLYCFG, default directory when None
+        self.fingerprint_dir = None
+        self.planned = []
+        self.calls = 0
+        # [action, object, name, seconds, ok]
+        self.records = []
+
+    @property
+    def session(self):
+        """ requests session, built on first use """
+        if self._session is None:
+            with self.lock:
+                if self._session is None:
+                    self._session = self._new_session()
+        return self._session
+
+    def _new_session(self):
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # proxies, CA bundle and netrc credentials are read from the
+        # environment once: requests looks them up again for every request
+        settings = session.merge_environment_settings(self.url, {}, None, None, None)
+        session.proxies.update(settings['proxies'])
+        session.verify = settings['verify']
+        session.cert = settings['cert']
+        session.auth = requests.utils.get_netrc_auth(self.url)
+        session.trust_env = False
+        if self.compression == 'off':
+            session.headers['Accept-Encoding'] = 'identity'
+        return session
+
+    def authenticate(self):
+        with self.auth_lock:
+            if self.token is None:
+                self._authenticate()
+
+    def _authenticate(self):
+        import requests
+        probe = self.breaker.before() if self.breaker is not None else False
+        start = time.time()
+        try:
+            header, token = self._login()
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            self._record('authenticate', None, None, start, False)
+            self._report(probe, start, e)
+            raise CentreonAPIError("Unable to authenticate on %s: %s" % (self.url, e))
+        self._record('authenticate', None, None, start, True)
+        self._report(probe, start)
+        self.session.headers[header] = token
+        self.token = token
+
+    def _login(self):
+        """ (header, token) authenticating the next requests """
+        r = self.session.post(
+            self.url + '/api/index.php',
+            params={'action': 'authenticate'},
+            data={'username': self.username, 'password': self.password},
+            timeout=self.timeout
+        )
+        r.raise_for_status()
+        return 'centreon-auth-token', r.json()['authToken']
+
+    def call(self, action, obj=None, values=None):
+        """
+        Run one CLAPI action and return its `result` member.
+        `values` may be a string or a list, lists are joined with ';'
+        """
+        if isinstance(values, (list, tuple)):
+            values = ';'.join(['' if v is None else '%s' % v for v in values])
+
+        if self.known_state is not None:
+            if is_write_action(action):
+                self.known_state.forget(action, obj, values)
+            else:
+                try:
+                    return self.known_state.lookup(action, obj, values)
+                except KeyError:
+                    pass
+
+        if self.check_mode and is_write_action(action):
+            with self.lock:
+                self.planned.append(dict(object=obj, action=action, values=values))
+            return []
+
+        if self.token is None:
+            self.authenticate()
+
+        if action.lower() == 'applycfg':
+            # forgotten first, the APPLYCFG may fail once the files are moved
+            from ansible.module_utils.centreon.generation import Fingerprints
+            Fingerprints(self.url, self.fingerprint_dir).forget(values)
+
+        with self.lock:
+            self.calls += 1
+        return self._send(action, obj, values)
+
+    def _send(self, action, obj, values, **kwargs):
+        payload = {'action': action}
+        if obj is not None:
+            payload['object'] = obj
+        if values is not None:
+            payload['values'] = values
+        r = self._request(
+            'post', '/api/index.php', action, obj, values, not is_write_action(action),
+            params={'action': 'action', 'object': 'centreon_clapi'}, json=payload, **kwargs
+        )
+        if kwargs.get('stream'):
+            return r
+        try:
+            return r.json().get('result')
+        except ValueError as e:
+            raise CentreonAPIError("%s %s: %s" % (obj or '', action, e))
+
+    def show(self, obj, fields, values=None):
+        """
+        SHOW of `obj`, filtered on `values`, as records of `fields` only:
+        namedtuples whose attributes are the field names, spaces replaced
+        by `_`
+        """
+        if self.known_state is not None:
+            try:
+                return compact(self.known_state.lookup('show', obj, values), fields)
+            except KeyError:
+                pass
+        if self.token is None:
+            self.authenticate()
+        with self.lock:
+            self.calls += 1
+        return self._show(obj, record_type(fields), values)
+
+    def _show(self, obj, cls, values):
+        import requests
+        r = self._send('show', obj, values, stream=True)
+        try:
+            return [cls(*[e.get(f) for f in cls.sources])
+                    for e in iter_result(r.iter_content(65536))]
+        except (ValueError, requests.exceptions.RequestException) as e:
+            raise CentreonAPIError("%s show: %s" % (obj, e))
+        finally:
+            r.close()
+
+    def _request(self, method, path, action, obj, values, idempotent, **kwargs):
+        """
+        Send one HTTP request, timed as a call of `action`. Failures on a
+        connection error or a 5xx are sent again when `idempotent`
+        """
+        import requests
+        attempt = 0
+        while True:
+            probe = self.breaker.before() if self.breaker is not None else False
+            start = time.time()
+            ok = False
+            sent, compressed = self._encode(kwargs)
+            try:
+                r = self.session.request(method, self.url + path, timeout=self.timeout, **sent)
+                r.raise_for_status()
+                self._report(probe, start)
+                ok = True
+                return r
+            except requests.exceptions.HTTPError as e:
+                self._report(probe, start, e)
+                if compressed and e.response is not None and e.response.status_code in (400, 415):
+                    # the central does not take compressed bodies
+                    self.compress_requests = False
+                    continue
+                if self._retry(idempotent, attempt, e.response is not None and e.response.status_code >= 500):
+                    attempt += 1
+                    continue
+                raise CentreonAPIError("%s %s %s: %s" % (obj or '', action, values or '', e))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._report(probe, start, e)
+                if self._retry(idempotent, attempt, True):
+                    attempt += 1
+                    continue
+                raise CentreonAPIError("%s %s: %s" % (obj or '', action, e))
+            except requests.exceptions.RequestException as e:
+                self._report(probe, start, e)
+                raise CentreonAPIError("%s %s: %s" % (obj or '', action, e))
+            finally:
+                self._record(action, obj, values, start, ok)
+
+    def _encode(self, kwargs):
+        """
+        Request arguments `kwargs` with their JSON body gzipped when request
+        bodies are compressed and it is big enough, and whether it was
+        """
+        if not self.compress_requests or kwargs.get('json') is None:
+            return kwargs, False
+        body = json.dumps(kwargs['json']).encode('utf-8')
+        if len(body) < COMPRESS_MIN_SIZE:
+            return kwargs, False
+        # wbits 31: gzip header, zlib has no gzip.compress on python 2
+        gz = zlib.compressobj(6, zlib.DEFLATED, 31)
+        sent = dict(kwargs, data=gz.compress(body) + gz.flush(),
+                    headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+        del sent['json']
+        return sent, True
+
+    def _report(self, probe, start, error=None):
+        """ Tell the breaker a request got an answer, or failed on `error` """
+        if self.breaker is None:
+            return
+        if error is not None and _transient(error):
+            self.breaker.failure(probe, error)
+        else:
+            self.breaker.success(probe, time.time() - start)
+
+    def _retry(self, idempotent, attempt, transient):
+        """
+        Whether to send a failed request again: only reads are retried,
+        writes are not idempotent
+        """
+        if not transient or attempt >= self.retries or not idempotent:
+            return False
+        with self.lock:
+            self.retried += 1
+        time.sleep(self.retry_delay * (2 ** attempt))
+        return True
+
+    def call_many(self, action, obj, values_list):
+        """
+        Run `action` once per item of `values_list`. Backends with a bulk
+        endpoint for the action send a single request
+        """
+        return [self.call(action, obj, values) for values in values_list]
+
+    def exists(self, obj, names):
+        """
+        Names of `names` existing as `obj`: a SHOW filtered on each name, or
+        a single full SHOW above `lookup_threshold` names
+        """
+        key = 'description' if obj == 'STPL' else 'name'
+        names = set(names)
+        if len(names) > self.lookup_threshold:
+            return names & set(r[0] for r in self.show(obj, [key]))
+        found = set()
+        for name in names:
+            # SHOW filters with LIKE, `name` also matches longer names
+            if any(r[key] == name for r in self.call('show', obj, name)):
+                found.add(name)
+        return found
+
+    def _record(self, action, obj, values, start, ok):
+        name = values.split(';', 1)[0] if values else None
+        with self.lock:
+            self.records.append(
+                [action.lower(), obj, name, round(time.time() - start, 4), ok]
+            )
+
+    def stats(self):
+        """ Timings of the calls sent so far """
+        return dict(
+            calls=list(self.records),
+            retries=self.retried,
+            elapsed=round(sum(r[3] for r in self.records), 4)
+        )
+
+    def plan(self):
+        """
+        Writes recorded in check mode, with the number of API calls a real
+        run would cost and the pollers it would reload
+        """
+        writes = len(self.planned)
+        return dict(
+            mutations=self.planned,
+            api_calls=dict(
+                reads=self.calls,
+                writes=writes,
+                # authentication included
+                total=self.calls + writes + (1 if self.calls + writes else 0)
+            ),
+            applycfg=sorted(set(
+                p['values'] for p in self.planned if p['action'].upper() == 'APPLYCFG'
+            ))
+        )
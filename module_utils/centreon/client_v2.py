@@ -0,0 +1,515 @@
+# -*- coding: utf-8 -*-
+#
+# Client for the Centreon REST API v2 (`/api/latest`), with the interface of
+# CentreonClient (`backend: v2`).
+#
+# The modules speak CLAPI: call('addhostgroup', 'HOST', 'srv01;Linux'). This
+# client translates every action to the configuration endpoints and returns
+# results in the CLAPI shape, so the modules behave the same on both
+# backends:
+#
+#   - listings are filtered by the server (`search`) and read a page at a
+#     time (`limit`, `page`), show() keeping records a page at a time
+#   - objects are changed with PATCH, lists (templates, groups, macros) are
+#     read first and written back whole
+#   - names are resolved to ids with a search on the names (`$in`), a
+#     single listing of the object replacing it above `lookup_threshold`
+#     names; resolved ids are kept
+#   - an object read in detail (macros, links, params) is kept until it is
+#     written, so the get* actions on one object cost a single GET, even
+#     when sent by several threads at once
+#   - the bulk endpoints are used by call_many where they exist
+#   - show() of HOST may also ask for `instance`, `templates` and
+#     `hostgroups`, given by the listing itself
+#
+# APPLYTPL is not sent: the v2 API deploys the services of the host
+# templates by itself. Params are sent under their v2 field name, the CLAPI
+# names of _PARAMS being translated; the command params become a command id
+# and its arguments, the params naming other objects by id are refused.
+
+import json
+import threading
+
+from ansible.module_utils.centreon.client import CentreonAPIError, CentreonClient
+
+# CLAPI object -> configuration endpoint
+_PATHS = dict(
+    HOST='/configuration/hosts',
+    HTPL='/configuration/hosts/templates',
+    HG='/configuration/hosts/groups',
+    STPL='/configuration/services/templates',
+    INSTANCE='/configuration/monitoring-servers',
+    CMD='/configuration/commands',
+    SERVICE='/configuration/services',
+)
+
+# CLAPI param -> v2 field
+_PARAMS = dict(
+    notes_url='note_url',
+    notes='note',
+    activate='is_activated',
+    template='service_template_id',
+)
+
+# CLAPI command param (cmd!arg1!arg2) -> v2 fields <prefix>_id, <prefix>_args
+_COMMAND_PARAMS = dict(
+    check_command='check_command',
+    event_handler='event_handler_command',
+)
+
+# CLAPI params naming an object the v2 backend cannot resolve
+_UNSUPPORTED_PARAMS = ('check_period', 'notification_period', 'timezone')
+
+_MACRO_PREFIX = dict(HOST='_HOST', HTPL='_HOST', STPL='_SERVICE')
+
+# CLAPI poller actions and their monitoring server endpoint. The generate
+# endpoint moves the files itself, POLLERTEST and CFGMOVE have nothing to send.
+# APPLYCFG forgets the stored fingerprint of the poller in CentreonClient.call
+_POLLER_ACTIONS = {
+    'applycfg': 'generate-and-reload',
+    'pollergenerate': 'generate',
+    'pollertest': None,
+    'cfgmove': None,
+    'pollerreload': 'reload',
+}
+
+# (action, object) sent in one request by call_many
+_BULK = {
+    ('del', 'HG'): '/configuration/hosts/groups/_delete',
+}
+
+
+def _str(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return '%s' % value
+
+
+def _names(value):
+    return [n for n in (value or '').split('|') if n]
+
+
+def _clapi_record(obj, r):
+    """ SHOW record of v2 record `r` """
+    if obj in ('HOST', 'HTPL'):
+        return dict(id=_str(r['id']), name=r['name'], alias=_str(r.get('alias')),
+                    address=_str(r.get('address')),
+                    activate=_str(r.get('is_activated', True)))
+    if obj == 'HG':
+        return dict(id=_str(r['id']), name=r['name'], alias=_str(r.get('alias')))
+    if obj == 'STPL':
+        return dict(id=_str(r['id']), description=r['name'], alias=_str(r.get('alias')))
+    if obj == 'INSTANCE':
+        return dict(id=_str(r['id']), name=r['name'], localhost=_str(r.get('is_localhost', False)),
+                    activate=_str(r.get('is_activated', True)))
+    if obj == 'CMD':
+        return dict(id=_str(r['id']), name=r['name'], type=_str(r.get('type')),
+                    line=_str(r.get('command_line')))
+    if obj == 'SERVICE':
+        host = (r.get('hosts') or [{}])[0]
+        return {'id': _str(r['id']), 'description': r['name'],
+                'host id': _str(host.get('id')), 'host name': host.get('name')}
+    return r
+
+
+def _host_links(r):
+    """
+    Poller, templates and hostgroups of host listing record `r`, the ones
+    it only gives as ids left out
+    """
+    links = dict()
+    server = r.get('monitoring_server')
+    if isinstance(server, dict) and 'name' in server:
+        links['instance'] = server['name']
+    for field, key in (('templates', 'templates'), ('groups', 'hostgroups')):
+        refs = r.get(field)
+        if isinstance(refs, list) and all(isinstance(x, dict) and 'name' in x for x in refs):
+            links[key] = [x['name'] for x in refs]
+    return links
+
+
+class CentreonV2Client(CentreonClient):
+
+    def __init__(self, url, username, password, page_size=1000, **kwargs):
+        CentreonClient.__init__(self, url, username, password, **kwargs)
+        self.page_size = page_size
+        # {object: {name: id}} of the names resolved so far, and the objects
+        # listed whole
+        self.ids = {}
+        self.complete = set()
+        # {(object, name): detail record}, and the locks of the records being read
+        self.details = {}
+        self.fetching = {}
+
+    def _login(self):
+        r = self.session.post(
+            self.url + '/api/latest/login',
+            json={'security': {'credentials': {'login': self.username, 'password': self.password}}},
+            timeout=self.timeout
+        )
+        r.raise_for_status()
+        return 'X-AUTH-TOKEN', r.json()['security']['token']
+
+    # -- HTTP
+
+    def _json(self, r, action, obj):
+        if not r.content:
+            return None
+        try:
+            return r.json()
+        except ValueError as e:
+            raise CentreonAPIError("%s %s: %s" % (obj or '', action, e))
+
+    def _get(self, path, action, obj, values, params=None):
+        r = self._request('get', '/api/latest' + path, action, obj, values, True, params=params)
+        return self._json(r, action, obj)
+
+    def _write(self, method, path, action, obj, values, body=None):
+        r = self._request(method, '/api/latest' + path, action, obj, values, False, json=body)
+        return self._json(r, action, obj)
+
+    def _pages(self, obj, action, values, search=None):
+        """ Pages of the records of `obj` matching `search` """
+        params = dict(limit=self.page_size)
+        if search:
+            params['search'] = json.dumps(search)
+        seen = 0
+        page = 1
+        while True:
+            params['page'] = page
+            r = self._get(_PATHS[obj], action, obj, values, params)
+            yield r['result']
+            seen += len(r['result'])
+            if not r['result'] or seen >= r['meta']['total']:
+                return
+            page += 1
+
+    def _list(self, obj, action, values, search=None):
+        """ Records of `obj` matching `search`, a page at a time """
+        records = list()
+        for page in self._pages(obj, action, values, search):
+            records.extend(page)
+        return records
+
+    # -- name resolution
+
+    def _resolve(self, obj, names, action, values):
+        """
+        {name: id} of `obj`, knowing `names`: the unknown ones are searched
+        in one request, or the whole object is listed above
+        `lookup_threshold` names
+        """
+        with self.lock:
+            ids = dict(self.ids.get(obj, {}))
+            complete = obj in self.complete
+        missing = sorted(set(n for n in names if n and n not in ids))
+        if not missing or complete:
+            return ids
+        listing = len(missing) > self.lookup_threshold
+        found = self._list(obj, action, values, None if listing else {'name': {'$in': missing}})
+        with self.lock:
+            if listing:
+                self.ids[obj] = dict()
+                self.complete.add(obj)
+            self.ids.setdefault(obj, dict()).update((r['name'], r['id']) for r in found)
+            return dict(self.ids[obj])
+
+    def _id(self, obj, name, action, values):
+        ids = self._resolve(obj, [name], action, values)
+        if name not in ids:
+            raise CentreonAPIError("%s %s %s: Object not found: %s" % (obj, action, values or '', name))
+        return ids[name]
+
+    def _ids_of(self, obj, names, action, values):
+        """ Ids of `names`, resolved together """
+        ids = self._resolve(obj, names, action, values)
+        return [ids[n] if n in ids else self._id(obj, n, action, values) for n in names]
+
+    def _names_of(self, obj, oids, action, values):
+        """ Names of the `obj` ids `oids`, the unknown ones searched in one request """
+        with self.lock:
+            by_id = dict((i, n) for n, i in self.ids.get(obj, {}).items())
+        missing = sorted(set(i for i in oids if i not in by_id))
+        if missing:
+            found = self._list(obj, action, values, {'id': {'$in': missing}})
+            with self.lock:
+                self.ids.setdefault(obj, dict()).update((r['name'], r['id']) for r in found)
+            by_id.update((r['id'], r['name']) for r in found)
+        return [by_id.get(i, '') for i in oids]
+
+    def _forget(self, obj, name=None, added=False):
+        with self.lock:
+            if name is None:
+                self.ids.pop(obj, None)
+                self.complete.discard(obj)
+            else:
+                self.ids.get(obj, {}).pop(name, None)
+                if added:
+                    # a complete listing no longer is
+                    self.complete.discard(obj)
+            self.details.pop((obj, name), None)
+
+    def exists(self, obj, names):
+        """
+        Names of `names` existing as `obj`, searched in one request or
+        listed above `lookup_threshold` names
+        """
+        if self.known_state is not None:
+            return CentreonClient.exists(self, obj, names)
+        names = set(names)
+        if not names:
+            return set()
+        if self.token is None:
+            self.authenticate()
+        with self.lock:
+            self.calls += 1
+        return names & set(self._resolve(obj, names, 'show', None))
+
+    def _path(self, obj, name, action, values):
+        return '%s/%s' % (_PATHS[obj], self._id(obj, name, action, values))
+
+    def _detail(self, obj, name, action, values):
+        with self.lock:
+            record = self.details.get((obj, name))
+            fetching = self.fetching.setdefault((obj, name), threading.Lock())
+        if record is None:
+            # threads reading the same object wait for a single GET
+            with fetching:
+                with self.lock:
+                    record = self.details.get((obj, name))
+                if record is None:
+                    record = self._get(self._path(obj, name, action, values), action, obj, values)
+                    with self.lock:
+                        self.details[(obj, name)] = record
+        return record
+
+    def _patch(self, obj, name, action, values, body):
+        with self.lock:
+            self.details.pop((obj, name), None)
+        self._write('patch', self._path(obj, name, action, values), action, obj, values, body)
+        # a read sent meanwhile may have kept the record as it was
+        with self.lock:
+            self.details.pop((obj, name), None)
+        return []
+
+    # -- CLAPI translation
+
+    def _send(self, action, obj, values):
+        action = action.lower()
+        v = values.split(';') if values else []
+        if obj is None:
+            if action in _POLLER_ACTIONS:
+                poller = self._id('INSTANCE', values, action, values)
+                endpoint = _POLLER_ACTIONS[action]
+                if endpoint:
+                    self._write('post', '%s/%s/%s' % (_PATHS['INSTANCE'], poller, endpoint),
+                                action, obj, values)
+                return []
+            raise CentreonAPIError("%s is not supported by the v2 backend" % action)
+        if obj not in _PATHS:
+            raise CentreonAPIError("%s is not supported by the v2 backend" % obj)
+
+        if action == 'show':
+            return [_clapi_record(obj, r) for r in self._shown(obj, values)]
+
+        if action == 'add':
+            self._add(obj, v, action, values)
+            self._forget(obj, v[0], added=True)
+            return []
+
+        name = v[0] if v else None
+        if action == 'del':
+            self._write('delete', self._path(obj, name, action, values), action, obj, values)
+            self._forget(obj, name)
+            return []
+
+        if action in ('setparam', 'getparam'):
+            for param in _names(v[1]):
+                if param in _UNSUPPORTED_PARAMS:
+                    raise CentreonAPIError("%s %s %s: param %s is not supported by the v2 backend"
+                                           % (obj, action, values, param))
+
+        if action == 'setparam':
+            field = _PARAMS.get(v[1], v[1])
+            value = ';'.join(v[2:])
+            if v[1] in _COMMAND_PARAMS:
+                command = value.split('!')
+                field = _COMMAND_PARAMS[v[1]]
+                return self._patch(obj, name, action, values, {
+                    field + '_id': self._id('CMD', command[0], action, values) if command[0] else None,
+                    field + '_args': command[1:]})
+            if field == 'is_activated':
+                value = value == '1'
+            elif field == 'service_template_id':
+                value = self._id('STPL', value, action, values) if value else None
+            return self._patch(obj, name, action, values, {field: value})
+
+        if action == 'getparam':
+            record = self._detail(obj, name, action, values)
+            result = dict()
+            for param in _names(v[1]):
+                if param in _COMMAND_PARAMS:
+                    field = _COMMAND_PARAMS[param]
+                    command = record.get(field + '_id')
+                    if command:
+                        command = '!'.join(self._names_of('CMD', [command], action, values) +
+                                           list(record.get(field + '_args') or []))
+                    result[param] = _str(command)
+                    continue
+                value = record.get(_PARAMS.get(param, param))
+                if param == 'template' and value:
+                    value = self._names_of('STPL', [value], action, values)[0]
+                result[param] = _str(value)
+            return [result]
+
+        if action in ('enable', 'disable'):
+            return self._patch(obj, name, action, values, {'is_activated': action == 'enable'})
+
+        if action == 'getmacro':
+            return [{'macro name': '$%s%s$' % (_MACRO_PREFIX[obj], m['name']),
+                     'macro value': _str(m.get('value')),
+                     'is_password': _str(m.get('is_password', False)),
+                     'description': _str(m.get('description')),
+                     'source': 'direct'}
+                    for m in self._detail(obj, name, action, values).get('macros', [])]
+
+        if action in ('setmacro', 'delmacro'):
+            macro = v[1].upper()
+            macros = [m for m in self._detail(obj, name, action, values).get('macros', [])
+                      if m['name'].upper() != macro]
+            if action == 'setmacro':
+                macros.append(dict(
+                    name=macro, value=';'.join(v[2:3]),
+                    is_password=len(v) > 3 and v[3] == '1',
+                    description=v[4] if len(v) > 4 else ''))
+            return self._patch(obj, name, action, values, {'macros': macros})
+
+        if obj == 'HOST' and action == 'applytpl':
+            return []
+
+        if obj == 'HOST' and action == 'showinstance':
+            return [dict(id=_str(h['monitoring_server']['id']), name=h['monitoring_server']['name'])
+                    for h in self._list('HOST', action, values, {'name': {'$eq': name}})
+                    if h.get('monitoring_server')]
+
+        if obj == 'HOST' and action == 'setinstance':
+            return self._patch(obj, name, action, values,
+                               {'monitoring_server_id': self._id('INSTANCE', v[1], action, values)})
+
+        links = self._links(obj, action)
+        if links is not None:
+            field, target = links
+            return self._link(obj, name, action, values, field, target, v[1] if len(v) > 1 else '')
+
+        if obj == 'HG' and action in ('getmember', 'addmember', 'delmember'):
+            if action == 'getmember':
+                return [dict(id=_str(h['id']), name=h['name']) for h in
+                        self._list('HOST', action, values, {'group.name': {'$eq': name}})]
+            for host in _names(v[1]):
+                self._link('HOST', host, action, values, 'groups', 'HG',
+                           name, action[:3])
+            return []
+
+        if obj == 'INSTANCE' and action == 'gethosts':
+            return [dict(id=_str(h['id']), name=h['name'], address=_str(h.get('address')))
+                    for h in self._list('HOST', action, values,
+                                        {'monitoring_server.name': {'$eq': name}})]
+
+        raise CentreonAPIError("%s %s is not supported by the v2 backend" % (obj, action))
+
+    def _shown(self, obj, values):
+        """ Records of a SHOW of `obj`, a page at a time, their ids kept """
+        search = {'name': {'$lk': '%%%s%%' % values.split(';', 1)[0]}} if values else None
+        if not search:
+            with self.lock:
+                self.ids[obj] = dict()
+        for page in self._pages(obj, 'show', values, search):
+            with self.lock:
+                self.ids.setdefault(obj, dict()).update((r['name'], r['id']) for r in page)
+            for r in page:
+                yield r
+        if not search:
+            with self.lock:
+                self.complete.add(obj)
+
+    def _show(self, obj, cls, values):
+        if obj not in _PATHS:
+            raise CentreonAPIError("%s is not supported by the v2 backend" % obj)
+        records = list()
+        for r in self._shown(obj, values):
+            record = _clapi_record(obj, r)
+            if obj == 'HOST':
+                record.update(_host_links(r))
+            records.append(cls(*[record.get(f) for f in cls.sources]))
+        return records
+
+    @staticmethod
+    def _links(obj, action):
+        """ (field, linked object) of the link list `action` works on """
+        if obj in ('HOST', 'HTPL') and action.endswith('template'):
+            return 'templates', 'HTPL'
+        if obj == 'HOST' and action.endswith('hostgroup'):
+            return 'groups', 'HG'
+        if obj == 'STPL' and action.endswith('hosttemplate'):
+            return 'host_templates', 'HTPL'
+        return None
+
+    def _link(self, obj, name, action, values, field, target, names, verb=None):
+        """ get, set, add or del (`verb`, from `action` by default) links to `target` objects """
+        verb = verb or action[:3]
+        links = self._detail(obj, name, action, values).get(field, [])
+        # links are listed as ids or as {id, name}
+        current = [c['id'] if isinstance(c, dict) else c for c in links]
+        if verb == 'get':
+            if all(isinstance(c, dict) for c in links):
+                return [dict(id=_str(c['id']), name=c['name']) for c in links]
+            return [dict(id=_str(i), name=n) for i, n in
+                    zip(current, self._names_of(target, current, action, values))]
+        wanted = self._ids_of(target, _names(names), action, values)
+        if verb == 'set':
+            links = wanted
+        elif verb == 'add':
+            links = current + [i for i in wanted if i not in current]
+        else:
+            links = [i for i in current if i not in wanted]
+        return self._patch(obj, name, action, values, {field: links})
+
+    def _add(self, obj, v, action, values):
+        v = v + [''] * 6
+        if obj == 'HOST':
+            body = dict(name=v[0], alias=v[1], address=v[2],
+                        templates=self._ids_of('HTPL', _names(v[3]), action, values),
+                        monitoring_server_id=self._id('INSTANCE', v[4], action, values),
+                        groups=self._ids_of('HG', _names(v[5]), action, values))
+        elif obj == 'HTPL':
+            body = dict(name=v[0], alias=v[1], address=v[2],
+                        templates=self._ids_of('HTPL', _names(v[3]), action, values))
+        elif obj == 'HG':
+            body = dict(name=v[0], alias=v[1])
+        elif obj == 'STPL':
+            body = dict(name=v[0], alias=v[1],
+                        service_template_id=self._id('STPL', v[2], action, values) if v[2] else None)
+        else:
+            raise CentreonAPIError("%s add is not supported by the v2 backend" % obj)
+        self._write('post', _PATHS[obj], action, obj, values, body)
+
+    def call_many(self, action, obj, values_list):
+        path = _BULK.get((action.lower(), obj))
+        if path is None or self.check_mode or len(values_list) < 2:
+            return CentreonClient.call_many(self, action, obj, values_list)
+
+        names = [values.split(';', 1)[0] for values in values_list]
+        if self.known_state is not None:
+            for values in values_list:
+                self.known_state.forget(action, obj, values)
+        if self.token is None:
+            self.authenticate()
+        with self.lock:
+            self.calls += 1
+        label = '|'.join(names)
+        ids = self._ids_of(obj, names, action, label)
+        self._write('post', path, action, obj, label, dict(ids=ids))
+        self._forget(obj)
+        return [[] for _ in names]
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Boilerplate shared by the centreon_* modules: connection options, client
+# construction, poller reloads, check mode plan and API timings reporting.
+#
+# The helpers of optional features (v2 backend, circuit breaker, export,
+# known state, profiling) are imported by the code path using them, so a
+# module only loads what its options need.
+
+from ansible.module_utils.centreon.client import CentreonAPIError, CentreonClient
+
+
+def centreon_argument_spec(**kwargs):
+    """ Connection options common to every module, plus `kwargs` """
+    spec = dict(
+        url=dict(required=True),
+        username=dict(default='admin', no_log=True),
+        password=dict(default='centreon', no_log=True),
+        api_retries=dict(default=0, type='int'),
+        lookup_threshold=dict(default=20, type='int'),
+        circuit_breaker=dict(default=None, type='dict'),
+        profile_dir=dict(default=None, type='path'),
+        profiler=dict(default='cprofile', choices=['cprofile', 'sampling']),
+        backend=dict(default='v1', choices=['v1', 'v2']),
+        compression=dict(default='responses', choices=['off', 'responses', 'all']),
+        known_state=dict(default=None, type='dict'),
+        export_command=dict(default=None),
+        export_filter=dict(default=None, type='list'),
+        fingerprint_dir=dict(default=None, type='path'),
+    )
+    spec.update(kwargs)
+    return spec
+
+
+def new_client(backend, url, username, password, **kwargs):
+    """ Client of the `backend` API: v1 (centreon_clapi) or v2 (/api/latest) """
+    if backend == 'v2':
+        from ansible.module_utils.centreon.client_v2 import CentreonV2Client
+        return CentreonV2Client(url, username, password, **kwargs)
+    return CentreonClient(url, username, password, **kwargs)
+
+
+def centreon_client(module, url=None, username=None, password=None, **kwargs):
+    client = new_client(
+        module.params.get('backend', 'v1'),
+        url or module.params['url'],
+        username or module.params['username'],
+        password or module.params['password'],
+        check_mode=module.check_mode,
+        retries=module.params['api_retries'],
+        lookup_threshold=module.params.get('lookup_threshold', 20),
+        compression=module.params.get('compression', 'responses'),
+        **kwargs
+    )
+    if module.params.get('circuit_breaker'):
+        from ansible.module_utils.centreon.breaker import circuit_breaker
+        client.breaker = circuit_breaker(client.url, module.params['circuit_breaker'], client.timeout)
+    client.fingerprint_dir = module.params.get('fingerprint_dir')
+    try:
+        facts = known_facts(client, module.params.get('known_state'),
+                            module.params.get('export_command'),
+                            module.params.get('export_filter'))
+    except CentreonAPIError as e:
+        fail_json(module, client, msg=str(e))
+    if facts:
+        from ansible.module_utils.centreon.state import KnownState
+        client.known_state = KnownState(facts)
+    return client
+
+
+def known_facts(client, known_state=None, command=None, export_filter=None):
+    """
+    Snapshot answering the reads of `client`: `known_state`, updated with
+    the configuration export of `command` when given
+    """
+    facts = dict(known_state or {})
+    if command:
+        from ansible.module_utils.centreon.export import read_export
+        export = read_export(client, command, export_filter)
+        filtered = set(export.pop('partial', []))
+        partial = set(facts.get('partial', []))
+        for index, records in export.items():
+            if index in filtered and index in facts:
+                # a filtered export refreshes some records of the snapshot
+                merged = dict(facts[index])
+                merged.update(records)
+                records = merged
+            elif index in filtered:
+                partial.add(index)
+            else:
+                partial.discard(index)
+            facts[index] = records
+        facts['partial'] = sorted(partial)
+    return facts
+
+
+def reload_pollers(module, client, pollers, changed=False):
+    """ APPLYCFG on each of `pollers`, failing the module at the first error """
+    for poller in pollers:
+        try:
+            client.call('APPLYCFG', values=poller)
+        except CentreonAPIError as e:
+            fail_json(module, client, msg='Failed while reloading poller %s: %s' % (poller, e),
+                      changed=changed)
+
+
+def api_stats(*clients):
+    """ Merged timings of `clients`, returned as `centreon_api` """
+    calls = []
+    retries = 0
+    for c in clients:
+        stats = c.stats()
+        calls.extend(stats['calls'])
+        retries += stats['retries']
+    return dict(calls=calls, retries=retries,
+                elapsed=round(sum(r[3] for r in calls), 4))
+
+
+def profile_result(result, *clients):
+    """ Add the `centreon_profile` of a profiled run to `result` """
+    from ansible.module_utils.centreon.profiling import report
+    profile = report(*clients)
+    if profile is not None:
+        result['centreon_profile'] = profile
+    return result
+
+
+def exit_json(module, client, **result):
+    """
+    module.exit_json, adding the API timings of `client`, its plan in
+    check mode and the phases of a profiled run
+    """
+    if module.check_mode:
+        result['plan'] = client.plan()
+    result['centreon_api'] = api_stats(client)
+    module.exit_json(**profile_result(result, client))
+
+
+def fail_json(module, client, **result):
+    result['centreon_api'] = api_stats(client)
+    module.fail_json(**profile_result(result, client))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Bulk removal of hosts (centreon_decommission).
+#
+# centreon_host with `state: absent` deletes one host and reloads its poller:
+# retiring hundreds of hosts reloads the pollers hundreds of times. Here the
+# hosts are selected (names, members of hostgroups, regex on the names),
+# grouped by poller with one INSTANCE;GETHOSTS per poller, deleted
+# `concurrency` at a time, and every poller which lost a host is reloaded
+# once by the caller. Hostgroups emptied by the removal can be deleted too,
+# with a single request on v2: only the hostgroups of the removed hosts
+# (one HOST;GETHOSTGROUP each) have their members read.
+
+import re
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.state import fanout
+
+
+def select_hosts(client, names=None, hostgroups=None, match=None):
+    """
+    Sorted names of the existing hosts of `names`, of the members of
+    `hostgroups` and of the hosts matching regex `match`
+    """
+    selected = set(client.exists('HOST', names)) if names else set()
+    for hg in hostgroups or []:
+        selected.update(h['name'] for h in client.call('getmember', 'HG', hg))
+    if match:
+        pattern = re.compile(match)
+        selected.update(r.name for r in client.show('HOST', ['name']) if pattern.search(r.name))
+    return sorted(selected)
+
+
+def host_pollers(client, names, concurrency=4):
+    """ {host: poller} of the hosts of `names`, one INSTANCE;GETHOSTS per poller """
+    names = set(names)
+    pollers = [r.name for r in client.show('INSTANCE', ['name'])]
+    found = dict()
+    for poller, hosts in fanout(lambda p: client.call('gethosts', 'INSTANCE', p),
+                                pollers, concurrency).items():
+        found.update((h['name'], poller) for h in hosts if h['name'] in names)
+    return found
+
+
+def hostgroup_members(client, names, concurrency=4):
+    """
+    {hostgroup: [members]} of the hostgroups having a member among `names`,
+    read from the hostgroups of each host
+    """
+    groups = fanout(lambda h: client.call('gethostgroup', 'HOST', h), names, concurrency)
+    hostgroups = sorted(set(hg['name'] for hgs in groups.values() for hg in hgs))
+    members = fanout(lambda hg: client.call('getmember', 'HG', hg), hostgroups, concurrency)
+    return dict((hg, [h['name'] for h in hosts]) for hg, hosts in members.items())
+
+
+def emptied(members, deleted):
+    """ Sorted hostgroups of `members` ({hostgroup: [members]}) left empty by `deleted` """
+    deleted = set(deleted)
+    return sorted(hg for hg, hosts in members.items() if all(h in deleted for h in hosts))
+
+
+def delete_hosts(client, names, pollers, concurrency=4):
+    """
+    Delete the hosts of `names`, `concurrency` at a time. Returns a result
+    per host (name, poller, changed, failed and error)
+    """
+    def delete(name):
+        result = dict(name=name, poller=pollers.get(name), changed=False)
+        try:
+            client.call('del', 'HOST', name)
+            result['changed'] = True
+        except CentreonAPIError as e:
+            result.update(failed=True, error=str(e))
+        return result
+
+    deleted = fanout(delete, names, concurrency)
+    return [deleted[n] for n in names]
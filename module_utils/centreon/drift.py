@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# Drift of many hosts from their desired state (centreon_drift), read-only.
+#
+# Comparing host by host costs a SHOW, gethostgroup, gettemplate and
+# getmacro per host. Here the current state of the whole fleet is read in
+# bulk and compared in memory:
+#
+#   - address, alias and status: one HOST listing (show(), compact records)
+#   - hostgroups: HG;GETMEMBER per hostgroup
+#   - poller: INSTANCE;GETHOSTS per poller
+#   - templates and macros: per host, unless answered by known_state or a
+#     configuration export (export_command), which then costs one pass
+#
+# The v2 listing of hosts also gives their poller, templates and hostgroups,
+# only macros are read per host. Templates of `macros_inherit` hosts are
+# read once each (TemplateMacros).
+
+from ansible.module_utils.centreon.host import (
+    TemplateMacros, get_macros, host_spec, merge_templates
+)
+from ansible.module_utils.centreon.state import fanout
+
+FIELDS = ['address', 'alias', 'status', 'poller', 'templates', 'hostgroups', 'macros']
+
+# fields of the host listing, the link ones only given by the v2 listing
+_LISTING = ['name', 'alias', 'address', 'activate', 'instance', 'templates', 'hostgroups']
+
+
+def _links(hosts, field, members):
+    """ Fill `field` of `hosts` from {group: [member names]} """
+    for h in hosts.values():
+        h[field] = []
+    for group, names in sorted(members.items()):
+        for m in names:
+            if m['name'] in hosts:
+                hosts[m['name']][field].append(group)
+
+
+def read_hosts(client, specs, fields, concurrency=4):
+    """
+    {name: {field: current value}} of the hosts of `specs` (complete specs)
+    existing, reading only the `fields` some spec compares
+    """
+    wanted = set(s['name'] for s in specs)
+    hosts = dict()
+    for r in client.show('HOST', _LISTING):
+        if r.name in wanted:
+            hosts[r.name] = dict(
+                address=r.address or '', alias=r.alias or '',
+                status='disabled' if str(r.activate) == '0' else 'enabled',
+                poller=r.instance, templates=r.templates, hostgroups=r.hostgroups, macros={})
+    specs = [s for s in specs if s['name'] in hosts and s['state'] == 'present']
+    if not specs:
+        return hosts
+
+    if 'hostgroups' in fields and any(s['hostgroups'] for s in specs) and \
+            any(h['hostgroups'] is None for h in hosts.values()):
+        hostgroups = [r.name for r in client.show('HG', ['name'])]
+        _links(hosts, 'hostgroups', fanout(lambda n: client.call('getmember', 'HG', n),
+                                           hostgroups, concurrency))
+
+    if 'poller' in fields and any(s['instance'] != 'auto' for s in specs) and \
+            any(h['poller'] is None for h in hosts.values()):
+        pollers = [r.name for r in client.show('INSTANCE', ['name'])]
+        _links(hosts, 'poller', fanout(lambda n: client.call('gethosts', 'INSTANCE', n),
+                                       pollers, concurrency))
+        for h in hosts.values():
+            h['poller'] = h['poller'][0] if h['poller'] else None
+
+    # per host reads, for the hosts comparing them
+    macros = sorted(s['name'] for s in specs if 'macros' in fields and s['macros'])
+    templates = sorted(s['name'] for s in specs if hosts[s['name']]['templates'] is None and (
+        ('templates' in fields and s['hosttemplates']) or (s['name'] in macros and s['macros_inherit'])))
+    for n, found in fanout(lambda n: client.call('gettemplate', 'HOST', n),
+                           templates, concurrency).items():
+        hosts[n]['templates'] = [t['name'] for t in found]
+    for n, found in fanout(lambda n: get_macros(client, 'HOST', n), macros, concurrency).items():
+        hosts[n]['macros'] = found
+    return hosts
+
+
+def _list_drift(wanted, current, exact):
+    """ Diff of a name list, None when in sync. `exact` compares the whole set """
+    missing = [n for n in wanted if n not in current]
+    extra = [n for n in current if n not in wanted] if exact else []
+    if not missing and not extra:
+        return None
+    return dict(wanted=list(wanted), current=list(current), missing=missing, extra=extra)
+
+
+def host_drift(spec, current, fields, inherited=None):
+    """
+    {field: diff} of host `spec` (a complete spec) from `current`, its
+    state read by read_hosts (None for a missing host)
+    """
+    if current is None or spec['state'] == 'absent':
+        if (current is None) == (spec['state'] == 'absent'):
+            return {}
+        return dict(state=dict(wanted=spec['state'],
+                               current='absent' if current is None else 'present'))
+
+    drift = dict()
+    for field, wanted in (('address', spec['ipaddr']), ('alias', spec['alias']),
+                          ('status', spec['status'])):
+        if field in fields and wanted and current[field] != wanted:
+            drift[field] = dict(wanted=wanted, current=current[field])
+
+    if 'poller' in fields and spec['instance'] != 'auto' and current['poller'] != spec['instance']:
+        drift['poller'] = dict(wanted=spec['instance'], current=current['poller'])
+
+    if 'templates' in fields and spec['hosttemplates']:
+        merged = merge_templates(current['templates'], spec['hosttemplates'],
+                                 spec['hosttemplates_action'])
+        if merged != current['templates']:
+            drift['templates'] = dict(wanted=merged, current=current['templates'],
+                                      missing=[t for t in merged if t not in current['templates']],
+                                      extra=[t for t in current['templates'] if t not in merged])
+
+    if 'hostgroups' in fields and spec['hostgroups']:
+        diff = _list_drift(spec['hostgroups'], current['hostgroups'],
+                           spec['hostgroups_action'] == 'set')
+        if diff:
+            drift['hostgroups'] = diff
+
+    if 'macros' in fields and spec['macros']:
+        macros = dict()
+        for m in spec['macros']:
+            name = m.get('name').upper()
+            value = '' if m.get('value') is None else '%s' % m.get('value')
+            effective = current['macros'].get(name)
+            if effective is None and inherited is not None:
+                effective = inherited.get(name)
+            if effective != value:
+                macros[name] = dict(wanted=value, current=effective)
+        if macros:
+            drift['macros'] = macros
+    return drift
+
+
+def fleet_drift(client, specs, fields=None, concurrency=4):
+    """
+    Drift of host `specs` (centreon_host options): {'hosts': {name: {field:
+    diff}} of the drifting hosts, 'summary'}. Nothing is written
+    """
+    fields = set(fields or FIELDS)
+    # ensure_host does not move existing hosts: the poller is only compared
+    # when given
+    specs = [host_spec(dict(s, instance=s.get('instance') or 'auto')) for s in specs]
+    current = read_hosts(client, specs, fields, concurrency)
+    templates = TemplateMacros(client)
+
+    hosts = dict()
+    counts = dict()
+    for spec in specs:
+        host = current.get(spec['name'])
+        inherited = None
+        if host is not None and spec['state'] == 'present' and 'macros' in fields and \
+                spec['macros_inherit'] and spec['macros']:
+            inherited = templates.inherited(host['templates'])
+        drift = host_drift(spec, host, fields, inherited)
+        if drift:
+            hosts[spec['name']] = drift
+            for field in drift:
+                counts[field] = counts.get(field, 0) + 1
+    return dict(hosts=hosts, summary=dict(
+        hosts=len(specs), in_sync=len(specs) - len(hosts), drifted=len(hosts), fields=counts,
+        missing=sorted(n for n, d in hosts.items() if d.get('state', {}).get('current') == 'absent')))
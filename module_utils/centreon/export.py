@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# Configuration export (`centreon -e`) as a read cache.
+#
+# A no-op run mostly reads: SHOW, gethostgroup, gettemplate, getmacro and
+# getparam for every object. A CLAPI export holds all of it in one pass, so
+# `export_command` output is parsed line by line into a snapshot shaped like
+# the centreon_facts one, with the fields the per-object reads return:
+#
+#   hosts:             {name: {name, alias, address, activate, instance,
+#                              templates, hostgroups, macros, params}}
+#   hostgroups:        {name: {name, alias, members}}
+#   host_templates:    {name: {name, alias, address, activate,
+#                              parents, macros, params}}
+#   service_templates: {name: {description, alias, template,
+#                              hosttemplates, macros, params}}
+#
+# A filtered export (`export_filter`) only holds some objects, its indexes
+# are marked `partial` and objects missing from them are read from the API.
+
+import subprocess
+import tempfile
+import time
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+EXPORT_INDEXES = dict(HOST='hosts', HG='hostgroups', HTPL='host_templates', STPL='service_templates')
+
+# SETPARAM names of fields kept on the record itself
+_FIELDS = ('alias', 'address', 'activate', 'template')
+
+
+def _new(obj, name):
+    if obj == 'HG':
+        return dict(name=name, alias='', members=[])
+    if obj == 'STPL':
+        return dict(description=name, alias='', template='', hosttemplates=[],
+                    macros={}, params={})
+    record = dict(name=name, alias='', address='', activate='1', macros={}, params={})
+    if obj == 'HOST':
+        record.update(templates=[], hostgroups=[], instance=None)
+    else:
+        record['parents'] = []
+    return record
+
+
+def _names(value):
+    return [n for n in value.split('|') if n]
+
+
+def _append(items, names):
+    items.extend(n for n in names if n not in items)
+
+
+def parse_export(lines, partial=False):
+    """
+    Snapshot of the HOST, HG, HTPL and STPL objects of export `lines`,
+    read in a single pass. Other objects are ignored
+    """
+    facts = dict((index, dict()) for index in EXPORT_INDEXES.values())
+    memberships = list()
+
+    for line in lines:
+        line = line.rstrip('\r\n')
+        parts = line.split(';')
+        if len(parts) < 3 or parts[0] not in EXPORT_INDEXES:
+            continue
+        obj, action, name = parts[0], parts[1].upper(), parts[2]
+        index = facts[EXPORT_INDEXES[obj]]
+        args = parts[3:]
+
+        if action == 'ADD':
+            record = index.setdefault(name, _new(obj, name))
+            if obj == 'STPL':
+                record['alias'], record['template'] = (args + ['', ''])[:2]
+            elif obj == 'HG':
+                record['alias'] = args[0] if args else ''
+            else:
+                alias, address, templates = (args + [''] * 3)[:3]
+                record.update(alias=alias, address=address)
+                _append(record['templates' if obj == 'HOST' else 'parents'], _names(templates))
+                if obj == 'HOST' and len(args) > 3:
+                    record['instance'] = args[3] or None
+                    memberships.extend((hg, name) for hg in _names(';'.join(args[4:])))
+            continue
+
+        record = index.setdefault(name, _new(obj, name))
+        if action == 'SETPARAM' and len(args) >= 2:
+            param, value = args[0], ';'.join(args[1:])
+            if param in _FIELDS and param in record:
+                record[param] = value
+            elif 'params' in record:
+                record['params'][param] = value
+        elif action == 'SETMACRO' and len(args) >= 2 and 'macros' in record:
+            # name;macro;value[;is_password;description]
+            if len(args) >= 4:
+                value, is_password, description = ';'.join(args[1:-2]), args[-2], args[-1]
+            else:
+                value, is_password, description = ';'.join(args[1:]), '0', ''
+            record['macros'][args[0].upper()] = dict(
+                value=value, is_password=is_password or '0', description=description)
+        elif action in ('ENABLE', 'DISABLE') and 'activate' in record:
+            record['activate'] = '1' if action == 'ENABLE' else '0'
+        elif action in ('ADDTEMPLATE', 'SETTEMPLATE') and args:
+            field = 'templates' if obj == 'HOST' else 'parents'
+            if action == 'SETTEMPLATE':
+                record[field] = []
+            _append(record[field], _names(args[0]))
+        elif action in ('ADDHOSTGROUP', 'SETHOSTGROUP') and obj == 'HOST' and args:
+            memberships.extend((hg, name) for hg in _names(args[0]))
+        elif action in ('ADDMEMBER', 'SETMEMBER') and obj == 'HG' and args:
+            memberships.extend((name, h) for h in _names(args[0]))
+        elif action == 'SETINSTANCE' and obj == 'HOST' and args:
+            record['instance'] = args[0]
+        elif action in ('ADDHOSTTEMPLATE', 'SETHOSTTEMPLATE') and obj == 'STPL' and args:
+            _append(record['hosttemplates'], _names(args[0]))
+
+    # memberships can be listed before the hostgroup itself
+    for hg, host in memberships:
+        group = facts['hostgroups'].setdefault(hg, _new('HG', hg))
+        _append(group['members'], [host])
+        if host in facts['hosts']:
+            _append(facts['hosts'][host]['hostgroups'], [hg])
+
+    if partial:
+        facts['partial'] = sorted(EXPORT_INDEXES.values())
+    return facts
+
+
+def export_command(command, export_filter=None):
+    """ `command` with `{select}` replaced by one --select per filter """
+    select = ' '.join("--select='%s'" % f.replace("'", "'\\''") for f in export_filter or [])
+    return command.replace('{select}', select)
+
+
+def read_export(client, command, export_filter=None):
+    """
+    Run `command` and parse its output while it runs. The run is timed as
+    an `export` call of `client`
+    """
+    start = time.time()
+    ok = False
+    stderr = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(export_command(command, export_filter), shell=True,
+                                stdout=subprocess.PIPE, stderr=stderr,
+                                universal_newlines=True)
+        facts = parse_export(proc.stdout, partial=bool(export_filter))
+        proc.stdout.close()
+        if proc.wait() != 0:
+            stderr.seek(0)
+            raise CentreonAPIError("Export command failed (rc=%d): %s" % (
+                proc.returncode, stderr.read().decode('utf-8', 'replace').strip()))
+        ok = True
+        return facts
+    except OSError as e:
+        raise CentreonAPIError("Unable to run export command: %s" % e)
+    finally:
+        stderr.close()
+        client._record('export', None, None, start, ok)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Poller reloads skipped when the generated configuration did not change.
+#
+# APPLYCFG generates the engine configuration of a poller, tests it, moves
+# it to the poller and reloads the engine, even when the changes applied had
+# no effect on that poller. apply_if_changed splits it: POLLERGENERATE, then
+# `fingerprint_command` prints the generated files (for instance
+# `ssh central 'cat /var/cache/centreon/config/engine/{id}/*.cfg'`) and their
+# digest is compared with the one stored after the last successful apply of
+# the poller. POLLERTEST, CFGMOVE and POLLERRELOAD only follow when it
+# differs, and the new digest is stored once the reload succeeded.
+#
+# Comment lines are left out of the digest: the generation writes its date
+# in the header of the files. Digests live in a JSON file per central URL
+# under `state_dir`, read and written under an exclusive flock as the
+# circuit breaker state is (statefile.py).
+#
+# An APPLYCFG sent any other way deploys a configuration whose digest is not
+# known: the client forgets the digest of the poller before sending it, and
+# the next apply_if_changed reloads.
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+
+from ansible.module_utils.centreon import statefile
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+
+def fingerprint_command(command, poller, poller_id):
+    """ `command` with `{poller}` and `{id}` replaced """
+    return command.replace('{poller}', poller).replace('{id}', str(poller_id))
+
+
+def fingerprint(client, command, poller, poller_id):
+    """
+    sha256 of the lines printed by `command`, comments and blank lines left
+    out. The run is timed as a `fingerprint` call of `client`
+    """
+    start = time.time()
+    ok = False
+    digest = hashlib.sha256()
+    stderr = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(fingerprint_command(command, poller, poller_id), shell=True,
+                                stdout=subprocess.PIPE, stderr=stderr)
+        for line in proc.stdout:
+            line = line.strip()
+            if line and not line.startswith(b'#'):
+                digest.update(line + b'\n')
+        proc.stdout.close()
+        if proc.wait() != 0:
+            stderr.seek(0)
+            raise CentreonAPIError("Fingerprint command failed (rc=%d): %s" % (
+                proc.returncode, stderr.read().decode('utf-8', 'replace').strip()))
+        ok = True
+        return digest.hexdigest()
+    except OSError as e:
+        raise CentreonAPIError("Unable to run fingerprint command: %s" % e)
+    finally:
+        stderr.close()
+        client._record('fingerprint', 'INSTANCE', poller, start, ok)
+
+
+class Fingerprints(object):
+    """ Digest of the configuration last applied on each poller of a central """
+
+    def __init__(self, url, state_dir=None):
+        self.path = statefile.state_path(url, state_dir, 'centreon-fingerprints')
+
+    def get(self, poller):
+        return statefile.update(self.path, lambda digests: digests.get(poller))
+
+    def set(self, poller, digest):
+        statefile.update(self.path, lambda digests: digests.update({poller: digest}))
+
+    def forget(self, poller):
+        """ Drop the digest of `poller`, its next apply reloads it """
+        if os.path.exists(self.path):
+            statefile.update(self.path, lambda digests: digests.pop(poller, None))
+
+
+def apply_if_changed(client, poller, poller_id, command, fingerprints):
+    """
+    Generate the configuration of `poller` and, when its fingerprint differs
+    from the stored one, test, move and reload it. Returns (reloaded,
+    fingerprint)
+    """
+    client.call('POLLERGENERATE', values=poller)
+    digest = fingerprint(client, command, poller, poller_id)
+    if digest == fingerprints.get(poller):
+        return False, digest
+    for action in ('POLLERTEST', 'CFGMOVE', 'POLLERRELOAD'):
+        client.call(action, values=poller)
+    fingerprints.set(poller, digest)
+    return True, digest
@@ -0,0 +1,571 @@
+# -*- coding: utf-8 -*-
+#
+# Host and host template reconciliation shared by centreon_host,
+# centreon_host_bulk and centreon_host_template.
+#
+# `ensure_host` brings one host to the state described by a spec (same keys
+# as the centreon_host options) and reports what it did in `result`
+# (`changed`, `msg`, `instance`). Failures are raised as CentreonAPIError;
+# `result` then tells the caller whether something was already changed.
+#
+# Every section reads the current value first and only writes the difference,
+# so the same code computes the plan in check mode.
+#
+# Once the host exists, its sections (hostgroups; status, address, alias;
+# templates then applytpl; macros; each param) do not depend on each other
+# and, with `parallel`, run in threads sharing the client's connection pool:
+# an update costs about the latency of its longest section instead of the
+# sum of all. Macros compared with inherited values wait for the template
+# section. Check mode runs them in order, so the plan keeps its order.
+#
+# With `macros_inherit`, macros are compared with the value the object
+# inherits through its template chain (TemplateMacros): a declared macro
+# equal to the inherited value is not written, and removed when set on the
+# object, so thousands of hosts sharing templates do not each carry a copy.
+# The macros left out are counted in `result['overrides_avoided']`.
+#
+# With `preflight`, the objects about to be linked are checked before any
+# write (see preflight.py): all references of a new object before its
+# creation; for an existing one, the current hostgroups, templates and
+# command params are read first and the ones the sections would add are
+# checked at once, the sections then reusing what was read.
+
+import threading
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.preflight import (
+    COMMAND_PARAMS, check_references, host_references, param_references
+)
+
+HOST_DEFAULTS = dict(
+    hosttemplates=[],
+    hosttemplates_action='add',
+    alias=None,
+    ipaddr=None,
+    instance='Central',
+    hostgroups=[],
+    hostgroups_action='add',
+    params=[],
+    macros=[],
+    macros_inherit=False,
+    state='present',
+    status='enabled',
+)
+
+
+def host_spec(spec):
+    """ Complete a host spec with the centreon_host defaults """
+    full = dict(HOST_DEFAULTS)
+    full.update((k, v) for k, v in spec.items() if v is not None)
+    return full
+
+
+def _call(client, errmsg, action, obj, values=None):
+    try:
+        return client.call(action, obj, values)
+    except CentreonAPIError as e:
+        raise CentreonAPIError('%s: %s' % (errmsg, e))
+
+
+def get_object(client, obj, name):
+    """ SHOW entry of `name` (SHOW filters with LIKE), None if missing """
+    for h in _call(client, 'Unable to get %s %s' % (obj, name), 'show', obj, name):
+        if h['name'] == name:
+            return h
+    return None
+
+
+def get_host(client, name):
+    return get_object(client, 'HOST', name)
+
+
+def merge_templates(current, wanted, action):
+    """
+    New parent template list for a host whose current list is `current`.
+    With `add`, `wanted` templates are merged in keeping the current order.
+    """
+    if action == 'set':
+        return list(wanted)
+    # NB: they are returned in reverse order
+    current_templates = current[::-1]
+    # NB: we assume those also are configured in reverse order, to mimick
+    #     Centreon GUI
+    new_templates = wanted[::-1]
+    new_template_list = []
+    for curr_t in current_templates:
+        if curr_t in new_templates:
+            i = new_templates.index(curr_t)
+            new_template_list.extend(new_templates[0:i+1])
+            new_templates = new_templates[i+1:]
+        else:
+            new_template_list.append(curr_t)
+    new_template_list.extend(new_templates)
+    return new_template_list[::-1]
+
+
+def macro_name(name):
+    """ MACRO for `macro`, `$_HOSTMACRO$` or `$_SERVICEMACRO$` """
+    name = name.upper().strip('$')
+    for prefix in ('_HOST', '_SERVICE'):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def get_macros(client, obj, name):
+    """ {MACRO: value} of the macros set on the object itself """
+    macros = {}
+    for m in _call(client, 'Unable to retrieve list of macros', 'getmacro', obj, name):
+        # inherited macros are listed with the template they come from
+        if m.get('source', 'direct') != 'direct':
+            continue
+        macros[macro_name(m['macro name'])] = m['macro value']
+    return macros
+
+
+def get_param(client, obj, name, param):
+    """ Current value of `param`, None if the central cannot tell """
+    try:
+        r = client.call('getparam', obj, [name, param])
+    except CentreonAPIError:
+        # getparam is not available on older centrals
+        return None
+    if isinstance(r, list):
+        r = r[0] if r else None
+    if isinstance(r, dict):
+        return r.get(param, list(r.values())[0] if len(r) == 1 else None)
+    return r
+
+
+def _macro_value(value):
+    return '' if value is None else '%s' % value
+
+
+def drop_inherited(macros, inherited):
+    """ Macros of `macros` whose value differs from the one in `inherited` """
+    return [m for m in macros if inherited.get(m.get('name').upper()) != _macro_value(m.get('value'))]
+
+
+class TemplateMacros(object):
+    """
+    Macros inherited from host templates through their parents. Each
+    template is read once (gettemplate, getmacro) and kept for every object
+    using it; threads of a bulk run share one instance per central
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+        # {template: (parents, {MACRO: value})}
+        self.templates = {}
+
+    def _template(self, name):
+        with self.lock:
+            known = self.templates.get(name)
+        if known is None:
+            parents = [t['name'] for t in _call(
+                self.client, 'Unable to retrieve parent templates of %s' % name,
+                'gettemplate', 'HTPL', name)]
+            known = (parents, get_macros(self.client, 'HTPL', name))
+            with self.lock:
+                self.templates[name] = known
+        return known
+
+    def inherited(self, templates, seen=()):
+        """ {MACRO: value} inherited from `templates`, the first one taking precedence """
+        macros = {}
+        for t in reversed(templates):
+            if t in seen:
+                # template loop
+                continue
+            parents, own = self._template(t)
+            macros.update(self.inherited(parents, seen + (t,)))
+            macros.update(own)
+        return macros
+
+
+def reconcile_macros(client, obj, name, macros, result, current=None, inherited=None):
+    """
+    Set the macros of `macros` whose value differs from the current one.
+    With `inherited` ({MACRO: value} from the templates), macros equal to
+    their inherited value are left out, and removed from the object
+    """
+    if not macros:
+        return
+    if current is None:
+        current = get_macros(client, obj, name)
+    for k in macros:
+        macro = k.get('name').upper()
+        value = _macro_value(k.get('value'))
+        if inherited is not None and inherited.get(macro) == value:
+            result['overrides_avoided'] = result.get('overrides_avoided', 0) + 1
+            if macro in current:
+                _call(client, 'Unable to remove macro %s' % k.get('name'), 'delmacro', obj,
+                      [name, macro])
+                result['changed'] = True
+                result['msg'].append("Remove macros %s, inherited" % macro)
+            continue
+        if macro in current and current[macro] == value:
+            continue
+        values = [name, macro, value]
+        if obj == 'STPL':
+            values.extend([k.get('is_password', 0), k.get('description')])
+        # NB: cannot seem to set `description` and `is_password` w/ current clapi version
+        #     on hosts
+        _call(client, 'Unable to set macro %s' % k.get('name'), 'setmacro', obj, values)
+        result['changed'] = True
+        result['msg'].append("Add macros %s" % macro)
+
+
+def _param_value(value):
+    return '' if value is None else '%s' % value
+
+
+def reconcile_param(client, obj, name, param, result, current=None):
+    """ Set `param` when it differs from its `current` value (read when None) """
+    value = param.get('value')
+    if current is None:
+        current = get_param(client, obj, name, param.get('name'))
+    if current == _param_value(value):
+        return
+    _call(client, 'Unable to set param %s' % param.get('name'), 'setparam', obj,
+          [name, param.get('name'), value])
+    result['changed'] = True
+    result['msg'].append("Set param %s" % param.get('name'))
+
+
+def reconcile_params(client, obj, name, params, result, current=None):
+    """ Set the `params` differing, `current` holding the values already read """
+    for k in params:
+        reconcile_param(client, obj, name, k, result, (current or {}).get(k.get('name')))
+
+
+def added_commands(client, obj, name, params, current):
+    """
+    Commands the command params of `params` are about to set on `name`.
+    Their current values are read into `current` ({param: value}) for
+    reconcile_param(s)
+    """
+    commands = list()
+    for p in params:
+        if p.get('name') in COMMAND_PARAMS and p.get('value'):
+            current[p['name']] = get_param(client, obj, name, p['name'])
+            if current[p['name']] != _param_value(p['value']):
+                commands.extend(param_references([p])['CMD'])
+    return commands
+
+
+def run_sections(sections, result, parallel=False):
+    """
+    Run `sections` (functions of a result dict), each with its own result
+    merged into `result` in order. With `parallel` they run in threads and
+    the first error is raised once all are done, otherwise they stop at the
+    first error
+    """
+    results = [dict(changed=False, msg=list()) for _ in sections]
+    errors = [None] * len(sections)
+
+    def run(i):
+        try:
+            sections[i](results[i])
+        except Exception as e:
+            errors[i] = e
+
+    if parallel and len(sections) > 1:
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(sections))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    else:
+        for i in range(len(sections)):
+            run(i)
+            if errors[i] is not None:
+                break
+
+    for r in results:
+        result['changed'] = result['changed'] or r['changed']
+        result['msg'].extend(r['msg'])
+        if 'overrides_avoided' in r:
+            result['overrides_avoided'] = result.get('overrides_avoided', 0) + r['overrides_avoided']
+    for e in errors:
+        if e is not None:
+            raise e
+
+
+def _inherited(client, obj, spec, template_list, templates):
+    """
+    {MACRO: value} the object inherits from `template_list` (its parent
+    templates, read when None), None unless `macros_inherit` is set
+    """
+    if not (spec['macros_inherit'] and spec['macros']):
+        return None
+    if template_list is None:
+        template_list = [ht['name'] for ht in _call(
+            client, 'Unable to retrieve list of parent templates', 'gettemplate', obj, spec['name'])]
+    return (templates or TemplateMacros(client)).inherited(template_list)
+
+
+def _reconcile_common(client, obj, spec, current, result, is_creation, templates=None,
+                      sections=(), parallel=False, preflight=False, references=None):
+    """
+    Status, address, alias, parent templates, macros and params, after the
+    object's own `sections`. With `preflight`, the templates and commands
+    about to be added, and the object's own `references` ({object: names}),
+    are checked before any section runs
+    """
+    name = spec['name']
+    label = 'host' if obj == 'HOST' else 'host template'
+    sections = list(sections)
+    update_templates = spec['hosttemplates'] and not is_creation
+
+    # read by the pre-flight check, for the sections
+    parents = None
+    params = dict()
+    # a new object was checked whole before its creation
+    if preflight and not is_creation:
+        refs = dict(references or {})
+        if update_templates:
+            parents = [ht['name'] for ht in _call(
+                client, 'Unable to retrieve list of parent templates', 'gettemplate', obj, name)]
+            refs['HTPL'] = [t for t in merge_templates(parents, spec['hosttemplates'],
+                                                       spec['hosttemplates_action'])
+                            if t not in parents]
+        refs['CMD'] = added_commands(client, obj, name, spec['params'], params)
+        check_references(client, [refs])
+
+    def status(result):
+        if spec['status'] == "disabled" and int(current['activate']) == 1:
+            _call(client, 'Unable to disable %s' % label, 'disable', obj, name)
+            result['changed'] = True
+            result['msg'].append("Host disabled")
+
+        if spec['status'] == "enabled" and int(current['activate']) == 0:
+            _call(client, 'Unable to enable %s' % label, 'enable', obj, name)
+            result['changed'] = True
+            result['msg'].append("Host enabled")
+
+    def address(result):
+        _call(client, 'Unable to change ip addr', 'setparam', obj, [name, 'address', ipaddr])
+        result['changed'] = True
+        result['msg'].append("Change ip addr: %s -> %s" % (current['address'], ipaddr))
+
+    def alias(result):
+        _call(client, 'Unable to change alias', 'setparam', obj, [name, 'alias', spec['alias']])
+        result['changed'] = True
+        result['msg'].append("Change alias: %s -> %s" % (current['alias'], spec['alias']))
+
+    if spec['status'] != ('enabled' if int(current['activate']) == 1 else 'disabled'):
+        sections.append(status)
+    ipaddr = spec['ipaddr']
+    if not current['address'] == ipaddr and ipaddr:
+        sections.append(address)
+    if not current['alias'] == spec['alias'] and spec['alias']:
+        sections.append(alias)
+
+    #### HostTemplates
+    def hosttemplates(result):
+        parent_template_list = parents
+        if parent_template_list is None:
+            parent_template_list = [ht['name'] for ht in _call(
+                client, 'Unable to retrieve list of parent templates', 'gettemplate', obj, name)]
+        new_template_list = merge_templates(
+            parent_template_list, spec['hosttemplates'], spec['hosttemplates_action'])
+
+        if parent_template_list != new_template_list:
+            _call(client, 'Unable to %s parent templates' % spec['hosttemplates_action'],
+                  'settemplate', obj, [name, '|'.join(new_template_list)])
+            result['changed'] = True
+            result['msg'].append("%s parent HostTemplate: %s" % (
+                spec['hosttemplates_action'], new_template_list))
+            if obj == 'HOST':
+                _call(client, 'Failed while applying templates on host %s' % name,
+                      'applytpl', obj, name)
+        return new_template_list
+
+    def macros(result, template_list=None):
+        reconcile_macros(client, obj, name, spec['macros'], result,
+                         inherited=_inherited(client, obj, spec, template_list, templates))
+
+    template_list = spec['hosttemplates'] if is_creation else None
+    inherit = spec['macros'] and spec['macros_inherit']
+    if update_templates and inherit:
+        # inherited values come from the new template list
+        sections.append(lambda result: macros(result, hosttemplates(result)))
+    else:
+        if update_templates:
+            sections.append(hosttemplates)
+        if spec['macros']:
+            sections.append(lambda result: macros(result, template_list))
+
+    for k in spec['params']:
+        sections.append(lambda result, k=k: reconcile_param(client, obj, name, k, result,
+                                                            params.get(k.get('name'))))
+
+    # the plan keeps the order of the sections
+    run_sections(sections, result, parallel and not client.check_mode)
+
+
+def ensure_host(client, spec, result, balancer=None, templates=None, parallel=False,
+                preflight=False):
+    """
+    Bring host `spec` to its state. `templates` (TemplateMacros) is shared
+    by the hosts of a bulk run with `macros_inherit`; `parallel` runs the
+    independent sections of an existing host in threads; `preflight` checks
+    the objects about to be linked before writing them
+    """
+    spec = host_spec(spec)
+    name = spec['name']
+    alias = spec['alias']
+    ipaddr = spec['ipaddr']
+    hosttemplates = spec['hosttemplates']
+    hostgroups = spec['hostgroups']
+    instance = spec['instance']
+
+    result.setdefault('changed', False)
+    data = result.setdefault('msg', [])
+
+    host = get_host(client, name)
+
+    if instance == 'auto':
+        if balancer is None:
+            raise CentreonAPIError("instance auto needs a poller balancer")
+        # the poller counts are only read when a new host is placed
+        if host is not None:
+            instance = balancer.current(name)
+        elif spec['state'] == 'present':
+            instance = balancer.place(name)
+            data.append("Auto poller: %s" % instance)
+        else:
+            instance = None
+    result['instance'] = instance
+
+    if host is None:
+        data.append("Host %s not found" % name)
+
+    is_creation = False
+
+    if host is None and spec['state'] == 'present':
+        is_creation = True
+        if preflight:
+            check_references(client, [host_references(spec)])
+        data.append("Add %s %s %s %s %s %s" %
+                    (name, alias, ipaddr, hosttemplates, instance, hostgroups))
+        _call(client, 'Create', 'add', 'HOST', [
+            name, alias, ipaddr, '|'.join(hosttemplates), instance, '|'.join(hostgroups)
+        ])
+        result['changed'] = True
+        data.append("Add host: %s" % name)
+
+        if client.check_mode:
+            # nothing to read back, plan the remaining writes as is
+            _call(client, 'Applying templates', 'applytpl', 'HOST', name)
+            reconcile_macros(client, 'HOST', name, spec['macros'], result, current={},
+                             inherited=_inherited(client, 'HOST', spec, hosttemplates, templates))
+            for k in spec['params']:
+                _call(client, 'Set param', 'setparam', 'HOST', [name, k.get('name'), k.get('value')])
+            return result
+
+        host = get_host(client, name)
+        if host is None:
+            raise CentreonAPIError('Failed to retrieve host %s after creation' % name)
+
+        # Apply the host templates for create associate services
+        _call(client, 'Failed while applying templates on host %s' % name,
+              'applytpl', 'HOST', name)
+
+    if host is None:
+        raise CentreonAPIError("Unable to find host %s " % name)
+
+    if spec['state'] == 'absent':
+        _call(client, 'Failed to delete host', 'del', 'HOST', name)
+        result['changed'] = True
+        data.append("Host %s deleted" % name)
+        return result
+
+    #### HostGroup
+    def current_hostgroups():
+        return [hg['name'] for hg in _call(
+            client, 'Unable to retrieve list of host groups', 'gethostgroup', 'HOST', name)]
+
+    references = None
+    current_hg_list = None
+    if preflight and hostgroups and not is_creation:
+        current_hg_list = current_hostgroups()
+        references = dict(HG=[hg for hg in hostgroups if hg not in current_hg_list])
+
+    def hostgroup(result):
+        current = current_hg_list if current_hg_list is not None else current_hostgroups()
+        if spec['hostgroups_action'] == "add":
+            for hg in hostgroups:
+                if hg not in current:
+                    _call(client, 'Unable to add hostgroups %s' % hg,
+                          'addhostgroup', 'HOST', [name, hg])
+                    result['changed'] = True
+                    result['msg'].append("Add hostgroup: %s" % hg)
+        elif set(current) != set(hostgroups):
+            _call(client, 'Unable to set hostgroups', 'sethostgroup', 'HOST',
+                  [name, '|'.join(hostgroups)])
+            result['changed'] = True
+            result['msg'].append("Set hostgroups: %s" % hostgroups)
+
+    _reconcile_common(client, 'HOST', spec, host, result, is_creation, templates,
+                      [hostgroup] if hostgroups and not is_creation else [], parallel,
+                      preflight, references)
+    return result
+
+
+def ensure_host_template(client, spec, result, parallel=False, preflight=False):
+    """
+    Bring host template `spec` to its state, as ensure_host does for a
+    host. `preflight` checks the objects about to be linked before writing
+    """
+    spec = host_spec(spec)
+    name = spec['name']
+    alias = spec['alias']
+    ipaddr = spec['ipaddr']
+    hosttemplates = spec['hosttemplates']
+
+    result.setdefault('changed', False)
+    data = result.setdefault('msg', [])
+
+    ht = get_object(client, 'HTPL', name)
+    if ht is None:
+        data.append("Host template %s not found" % name)
+
+    is_creation = False
+
+    if ht is None and spec['state'] == 'present':
+        is_creation = True
+        if preflight:
+            check_references(client, [host_references(spec, 'HTPL')])
+        data.append("Add %s %s %s %s" % (name, alias, ipaddr, hosttemplates))
+        _call(client, 'Create', 'add', 'HTPL', [
+            name, alias, ipaddr, '|'.join(hosttemplates), '', ''
+        ])
+        result['changed'] = True
+        data.append("Add host template: %s" % name)
+
+        if client.check_mode:
+            reconcile_macros(client, 'HTPL', name, spec['macros'], result, current={},
+                             inherited=_inherited(client, 'HTPL', spec, hosttemplates, None))
+            for k in spec['params']:
+                _call(client, 'Set param', 'setparam', 'HTPL', [name, k.get('name'), k.get('value')])
+            return result
+
+        ht = get_object(client, 'HTPL', name)
+        if ht is None:
+            raise CentreonAPIError('Failed to retrieve host template %s after creation' % name)
+
+    if ht is None:
+        raise CentreonAPIError("Unable to find host template %s " % name)
+
+    if spec['state'] == 'absent':
+        _call(client, 'Failed to delete host template', 'del', 'HTPL', name)
+        result['changed'] = True
+        data.append("Host template %s deleted" % name)
+        return result
+
+    _reconcile_common(client, 'HTPL', spec, ht, result, is_creation, parallel=parallel,
+                      preflight=preflight)
+    return result
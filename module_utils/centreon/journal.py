@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Write-ahead journal for bulk runs.
+#
+# Every write sent to a central is recorded as `planned` before the call and
+# `done` after it; a host whose reconciliation completed gets a `host` record
+# with the digest of its spec, and every poller reload an `applycfg` record.
+# Records are JSON lines, flushed and fsync'ed one by one so a run killed at
+# any point leaves a usable journal.
+#
+# On resume, hosts already completed with the same spec are skipped once
+# their existence is checked (one exists() per central), pollers whose hosts
+# changed but never got reloaded are reloaded, and writes planned but never
+# confirmed are reported: their hosts have no `host` record and are
+# reconciled again.
+#
+# The journal is only readable by its owner, and macro values (passwords
+# among them) are never written to it.
+
+import hashlib
+import json
+import os
+import threading
+
+from ansible.module_utils.centreon.client import is_write_action
+
+
+def _redacted(action, values):
+    """ `values` of a write, without the value of a macro """
+    if action.lower() != 'setmacro' or not values:
+        return values
+    v = list(values) if isinstance(values, (list, tuple)) else values.split(';')
+    if len(v) > 2:
+        v = v[:2] + ['********']
+    return v if isinstance(values, (list, tuple)) else ';'.join(v)
+
+
+def spec_digest(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class Journal(object):
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.seq = 0
+        # (central, host) -> (digest, record)
+        self.done = {}
+        # (central, poller) waiting for an applycfg
+        self.pending_pollers = set()
+        # seq -> write planned but never confirmed by the previous runs
+        self.incomplete = {}
+
+        if resume and os.path.exists(path):
+            self._load()
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | (os.O_APPEND if resume else os.O_TRUNC), 0o600)
+        # a journal created by an older version may be readable by others
+        os.fchmod(fd, 0o600)
+        self.fd = os.fdopen(fd, 'a' if resume else 'w')
+
+    def _load(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    # torn last line of a killed run
+                    continue
+                self.seq = max(self.seq, r.get('seq', 0))
+                key = (r.get('central'), r.get('host'))
+                if r['event'] == 'planned':
+                    self.incomplete[r['seq']] = r
+                elif r['event'] == 'done':
+                    self.incomplete.pop(r['seq'], None)
+                elif r['event'] == 'host':
+                    self.done[key] = (r['digest'], r)
+                    if r.get('changed') and r.get('instance'):
+                        self.pending_pollers.add((r['central'], r['instance']))
+                elif r['event'] == 'applycfg':
+                    self.pending_pollers.discard((r['central'], r['poller']))
+
+    def _write(self, record):
+        with self.lock:
+            self.seq += 1
+            record['seq'] = record.get('seq') or self.seq
+            self.fd.write(json.dumps(record, sort_keys=True) + '\n')
+            self.fd.flush()
+            os.fsync(self.fd.fileno())
+            return record['seq']
+
+    def incomplete_writes(self):
+        """ Writes planned by the previous runs and never confirmed, in order, without their values """
+        return [dict(central=r.get('central'), host=r.get('host'), object=r.get('object'),
+                     action=r.get('action'))
+                for _, r in sorted(self.incomplete.items())]
+
+    def completed(self, central, spec):
+        """ Journal record of `spec` if it was fully applied on `central` """
+        entry = self.done.get((central, spec['name']))
+        if entry and entry[0] == spec_digest(spec):
+            return entry[1]
+        return None
+
+    def planned(self, central, host, obj, action, values):
+        return self._write(dict(event='planned', central=central, host=host,
+                                object=obj, action=action, values=_redacted(action, values)))
+
+    def confirmed(self, seq, central, host, result):
+        self._write(dict(event='done', seq=seq, central=central, host=host,
+                         result=result))
+
+    def host_done(self, central, spec, result):
+        self._write(dict(event='host', central=central, host=spec['name'],
+                         digest=spec_digest(spec), changed=result['changed'],
+                         instance=result.get('instance')))
+
+    def applied(self, central, poller):
+        self._write(dict(event='applycfg', central=central, poller=poller))
+        with self.lock:
+            self.pending_pollers.discard((central, poller))
+
+    def close(self):
+        self.fd.close()
+
+
+class JournaledClient(object):
+    """
+    Client wrapper recording the writes issued for one host of one central
+    """
+
+    def __init__(self, client, journal, central, host):
+        self.client = client
+        self.journal = journal
+        self.central = central
+        self.host = host
+        self.check_mode = client.check_mode
+
+    def call(self, action, obj=None, values=None):
+        if not is_write_action(action):
+            return self.client.call(action, obj, values)
+        seq = self.journal.planned(self.central, self.host, obj, action, values)
+        result = self.client.call(action, obj, values)
+        self.journal.confirmed(seq, self.central, self.host, result)
+        return result
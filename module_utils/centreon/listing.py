@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Compact records for large listings (CentreonClient.show).
+#
+# A SHOW of every host or service of a big estate is a JSON document of tens
+# of MB: loading it whole keeps the body, then a dict per object with every
+# field, and callers usually only want one or two fields. Here the `result`
+# array is decoded one element at a time while the body is read, and each
+# element is kept as a namedtuple (a plain tuple, no per-object dict) of the
+# fields asked for.
+
+import codecs
+import json
+import re
+from collections import namedtuple
+
+_decoder = json.JSONDecoder()
+_records = {}
+
+_START = re.compile(r'"result"\s*:\s*\[')
+_SKIP = re.compile(r'[\s,]*')
+_DELIMITERS = ' \t\r\n,]'
+
+# decoded text kept before the current element is dropped past this size
+_KEEP = 1 << 16
+
+
+def record_type(fields):
+    """
+    Record class holding `fields`. Attributes are the field names with
+    anything but letters and digits replaced by `_` ('host name' -> host_name)
+    """
+    fields = tuple(fields)
+    if fields not in _records:
+        names = [re.sub(r'\W', '_', f) for f in fields]
+        cls = namedtuple('Record', names)
+        cls.sources = fields
+        _records[fields] = cls
+    return _records[fields]
+
+
+def compact(records, fields):
+    """ Records of dicts `records`, keeping `fields` """
+    cls = record_type(fields)
+    return [cls(*[r.get(f) for f in cls.sources]) for r in records]
+
+
+def iter_result(chunks):
+    """
+    Elements of the top level `result` array of a JSON document read as
+    byte `chunks`, decoded as soon as each one is complete
+    """
+    text = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = None
+    chunks = iter(chunks)
+    ended = False
+
+    def more(buf):
+        for chunk in chunks:
+            if chunk:
+                return buf + text.decode(chunk), False
+        return buf + text.decode(b'', True), True
+
+    # up to the opening bracket of the array
+    while pos is None:
+        match = _START.search(buf)
+        if match:
+            pos = match.end()
+        elif ended:
+            raise ValueError("No result array in the response")
+        else:
+            buf, ended = more(buf)
+
+    while True:
+        pos = _SKIP.match(buf, pos).end()
+        if pos < len(buf) and buf[pos] == ']':
+            return
+        try:
+            if pos >= len(buf):
+                raise ValueError("Incomplete")
+            element, end = _decoder.raw_decode(buf, pos)
+        except ValueError:
+            # the element goes on in the next chunk
+            if ended:
+                raise ValueError("Truncated result array")
+            buf, ended = more(buf)
+            continue
+        # a number cut by the end of the chunk decodes as a shorter one
+        if not ended and not isinstance(element, (dict, list)) and \
+                (end == len(buf) or buf[end] not in _DELIMITERS):
+            buf, ended = more(buf)
+            continue
+        yield element
+        pos = end
+        if pos > _KEEP:
+            buf, pos = buf[pos:], 0
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# Poller assignment helpers: load-aware placement of new hosts (`instance: auto`)
+# and bounded rebalancing of existing ones.
+#
+# Placement uses weighted rendezvous hashing: every (host, poller) pair gets a
+# stable pseudo-random score, scaled by a weight that favours lightly loaded
+# pollers. A host keeps hashing to the same poller as long as the loads do not
+# change much, and new hosts drift towards the pollers with spare capacity.
+
+import hashlib
+import math
+import threading
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+
+def list_pollers(client):
+    """ Names of the enabled pollers """
+    return [p.name for p in client.show('INSTANCE', ['name', 'activate'])
+            if str(p.activate if p.activate is not None else '1') == '1']
+
+
+def poller_hosts(client, pollers):
+    """ {poller: [hostname, ...]} for the given pollers """
+    return dict(
+        (p, [h['name'] for h in client.call('gethosts', 'INSTANCE', p)])
+        for p in pollers
+    )
+
+
+def host_poller(client, name):
+    """ Poller existing host `name` is on, None when it has none """
+    pollers = client.call('showinstance', 'HOST', name)
+    return pollers[0]['name'] if pollers else None
+
+
+def host_service_counts(client):
+    """ {hostname: number of services} from a single SERVICE;SHOW """
+    counts = {}
+    for svc in client.show('SERVICE', ['host name']):
+        counts[svc.host_name] = counts.get(svc.host_name, 0) + 1
+    return counts
+
+
+def host_costs(assignments, service_counts=None):
+    """
+    Cost of each host: 1 when balancing on host count, its number of
+    services (at least 1) when balancing on service count
+    """
+    costs = {}
+    for hosts in assignments.values():
+        for h in hosts:
+            if service_counts is None:
+                costs[h] = 1
+            else:
+                costs[h] = max(1, service_counts.get(h, 0))
+    return costs
+
+
+def poller_loads(assignments, costs):
+    return dict(
+        (p, sum(costs.get(h, 1) for h in hosts))
+        for p, hosts in assignments.items()
+    )
+
+
+def _score(key, poller):
+    digest = hashlib.sha1(('%s|%s' % (key, poller)).encode('utf-8')).hexdigest()
+    # map to ]0, 1[
+    return (int(digest[:15], 16) + 1) / float(16 ** 15 + 1)
+
+
+def rendezvous_pick(key, weights):
+    """
+    Weighted rendezvous hashing: return the candidate of `weights`
+    ({candidate: weight}) with the highest score for `key`
+    """
+    best, best_score = None, None
+    for c in sorted(weights):
+        score = -weights[c] / math.log(_score(key, c))
+        if best_score is None or score > best_score:
+            best, best_score = c, score
+    return best
+
+
+def pick_poller(name, loads):
+    """
+    Return the poller `name` should be placed on, `loads` being
+    {poller: current load}
+    """
+    if not loads:
+        return None
+    total = sum(loads.values())
+    mean = float(total) / len(loads) if total else 1.0
+    return rendezvous_pick(
+        name, dict((p, 1.0 / (1.0 + l / mean)) for p, l in loads.items())
+    )
+
+
+def plan_rebalance(assignments, costs, max_moves, tolerance=0.1):
+    """
+    Compute at most `max_moves` (host, from, to) moves bringing every poller
+    load within `tolerance` of the mean. Hosts preferring the destination by
+    rendezvous hashing are moved first, so successive runs converge on the same
+    placement instead of shuffling hosts back and forth.
+    """
+    hosts = dict((p, list(h)) for p, h in assignments.items())
+    loads = poller_loads(hosts, costs)
+    if len(loads) < 2:
+        return []
+    mean = float(sum(loads.values())) / len(loads)
+    upper = mean * (1 + tolerance)
+
+    moves = []
+    while len(moves) < max_moves:
+        src = max(sorted(loads), key=lambda p: loads[p])
+        dst = min(sorted(loads), key=lambda p: loads[p])
+        if loads[src] <= upper or not hosts[src]:
+            break
+        gap = loads[src] - loads[dst]
+        candidates = [h for h in hosts[src] if costs.get(h, 1) < gap]
+        if not candidates:
+            break
+        candidates.sort(key=lambda h: (-_score(h, dst), h))
+        host = candidates[0]
+        hosts[src].remove(host)
+        hosts[dst].append(host)
+        loads[src] -= costs.get(host, 1)
+        loads[dst] += costs.get(host, 1)
+        moves.append((host, src, dst))
+    return moves
+
+
+class PollerBalancer(object):
+    """
+    Resolves `instance: auto` for one central. An existing host keeps its
+    poller, read on its own. Poller assignments (and service counts) are only
+    read with the first host to place, then kept up to date as hosts get
+    placed, so a bulk run only pays the INSTANCE;GETHOSTS calls once.
+    """
+
+    def __init__(self, client, pollers=None, balance_by='hosts'):
+        self.client = client
+        self.pollers = pollers or []
+        self.balance_by = balance_by
+        self.assignments = None
+        self.costs = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        self.assignments = poller_hosts(self.client, list_pollers(self.client))
+        service_counts = None
+        if self.balance_by == 'services':
+            service_counts = host_service_counts(self.client)
+        self.costs = host_costs(self.assignments, service_counts)
+
+    def current(self, name):
+        """ Poller existing host `name` is on, from the assignments once read """
+        with self.lock:
+            for p, hosts in (self.assignments or {}).items():
+                if name in hosts:
+                    return p
+        return host_poller(self.client, name)
+
+    def place(self, name):
+        """ Pick the poller for new host `name` and account for it """
+        with self.lock:
+            if self.assignments is None:
+                self._load()
+            eligible = dict((p, h) for p, h in self.assignments.items()
+                            if not self.pollers or p in self.pollers)
+            if not eligible:
+                raise CentreonAPIError("No eligible poller in %s" % self.pollers)
+            poller = pick_poller(name, poller_loads(eligible, self.costs))
+            self.assignments[poller].append(name)
+            self.costs.setdefault(name, 1)
+            return poller
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Pre-flight check of the objects referenced by a run.
+#
+# A host naming a missing template, hostgroup or poller fails halfway: `add`
+# or `addhostgroup` errors out once the host is partly created, possibly
+# after `applytpl` ran. Before any write, the modules gather every host
+# template, hostgroup, poller, service template and command named by their
+# specs, look each object type up once with client.exists (filtered lookups,
+# a single listing above lookup_threshold names, or the known_state
+# snapshot) and report every missing object at once.
+#
+# centreon_host, centreon_host_template and centreon_service_template check
+# only what they are about to write (`preflight` of ensure_host,
+# ensure_host_template and ensure_service_template): every reference of a
+# new object; for an existing one, the templates, hostgroups and commands
+# added, read and checked before its first write. A rerun with nothing to
+# change makes no extra call.
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+
+LABELS = dict(HTPL='host template', HG='hostgroup', INSTANCE='poller',
+              STPL='service template', CMD='command')
+
+# params naming a command, their value may carry arguments (cmd!arg1!arg2)
+COMMAND_PARAMS = ('check_command', 'event_handler')
+
+
+def _commands(params):
+    return [('%s' % p['value']).split('!', 1)[0] for p in params or []
+            if p.get('name') in COMMAND_PARAMS and p.get('value')]
+
+
+def host_references(spec, obj='HOST'):
+    """ {object: names} referenced by a complete host (or host template, `obj` HTPL) spec """
+    references = dict(HTPL=list(spec['hosttemplates']), CMD=_commands(spec['params']))
+    if obj == 'HOST':
+        references['HG'] = list(spec['hostgroups'])
+        if spec['instance'] != 'auto':
+            references['INSTANCE'] = [spec['instance']]
+    return references
+
+
+def param_references(params):
+    """ {object: names} referenced by `params` """
+    return dict(CMD=_commands(params))
+
+
+def service_template_references(spec):
+    """ {object: names} referenced by a complete service template spec """
+    references = dict(HTPL=list(spec['hosttemplates']), CMD=_commands(spec['params']))
+    if spec['parenttemplate']:
+        references['STPL'] = [spec['parenttemplate']]
+    return references
+
+
+def missing_references(client, references):
+    """ {object: sorted names} of the objects of `references` (a list of {object: names}) missing """
+    wanted = dict()
+    for refs in references:
+        for obj, names in refs.items():
+            wanted.setdefault(obj, set()).update(n for n in names if n)
+    missing = dict()
+    for obj in sorted(wanted):
+        if wanted[obj]:
+            absent = wanted[obj] - set(client.exists(obj, wanted[obj]))
+            if absent:
+                missing[obj] = sorted(absent)
+    return missing
+
+
+def describe(missing, refs=None):
+    """ 'Missing hostgroups a, b; poller c' for `missing`, limited to `refs` when given """
+    parts = list()
+    for obj in sorted(missing):
+        names = [n for n in missing[obj] if refs is None or n in refs.get(obj, ())]
+        if names:
+            parts.append('%s%s %s' % (LABELS[obj], 's' if len(names) > 1 else '', ', '.join(names)))
+    return 'Missing %s' % '; '.join(parts) if parts else None
+
+
+def check_references(client, references):
+    """ Raise a CentreonAPIError naming every missing object of `references` """
+    try:
+        missing = missing_references(client, references)
+    except CentreonAPIError as e:
+        raise CentreonAPIError('Pre-flight check failed: %s' % e)
+    if missing:
+        raise CentreonAPIError('Pre-flight check failed: %s' % describe(missing))
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Opt-in profiling of module runs.
+#
+# With the `profile_dir` option, or the CENTREON_PROFILE_DIR environment
+# variable, the module's main() runs under cProfile (or pyinstrument, a
+# sampling profiler, with `profiler: sampling` when it is installed) and a
+# directory per run is written under `profile_dir`:
+#
+#   profile.prof   the cProfile stats (pstats, snakeviz, ...), or
+#   profile.html   the pyinstrument report
+#   profile.txt    the 40 functions with the highest cumulative time
+#   phases.json    wall clock phases of the run
+#
+# Phases are `import` (process start, module unpacking and imports, up to
+# main()), then, from the API timings of the client: `connect`
+# (authentication), `read`, `write` and `applycfg` (with its generate,
+# fingerprint, test, move and reload steps), and `other` for the rest of
+# main(). Calls sent by concurrent threads overlap, their sum can
+# exceed the wall clock time. The phases are also returned as
+# `centreon_profile`, so they reach the controller when the module runs
+# elsewhere.
+#
+# Modules call `run_module(main)` in place of `main()`. The profilers are
+# only imported by profiled runs.
+
+import json
+import os
+import time
+
+from ansible.module_utils.centreon.client import APPLY_ACTIONS, is_write_action
+
+PHASES = ('import', 'connect', 'read', 'write', 'applycfg', 'other')
+
+# Session of the current run, None when not profiling
+_session = None
+
+
+def _process_start():
+    """ Start time of the process (Linux), None when unknown """
+    try:
+        with open('/proc/self/stat') as f:
+            # the command name may hold spaces, fields follow its parenthesis
+            start_ticks = float(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as f:
+            btime = [float(l.split()[1]) for l in f if l.startswith('btime')][0]
+        return btime + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+
+def _options():
+    """ (profile_dir, profiler) from the module arguments or the environment """
+    directory = os.environ.get('CENTREON_PROFILE_DIR')
+    profiler = os.environ.get('CENTREON_PROFILER', 'cprofile')
+    try:
+        from ansible.module_utils.basic import _load_params
+        params = _load_params()
+    except Exception:
+        # arguments are read again, and reported, by AnsibleModule
+        params = {}
+    return (params.get('profile_dir') or directory,
+            params.get('profiler') or profiler)
+
+
+def _profiler(sampling):
+    """ A new pyinstrument (`sampling`) or cProfile profiler, None when unavailable """
+    if sampling:
+        try:
+            import pyinstrument
+            return pyinstrument.Profiler()
+        except ImportError:
+            return None
+    try:
+        import cProfile
+        return cProfile.Profile()
+    except ImportError:
+        return None
+
+
+def phases(records, wall, imported=None):
+    """ Seconds per phase of a run lasting `wall` seconds, from client `records` """
+    result = dict((p, 0.0) for p in PHASES)
+    result['import'] = imported
+    for action, obj, name, seconds, ok in records:
+        if action == 'authenticate':
+            phase = 'connect'
+        elif action.lower() in APPLY_ACTIONS:
+            phase = 'applycfg'
+        elif action == 'import' or (action != 'export' and is_write_action(action)):
+            phase = 'write'
+        else:
+            phase = 'read'
+        result[phase] += seconds
+    result['other'] = max(0.0, wall - sum(result[p] for p in ('connect', 'read', 'write', 'applycfg')))
+    result['main'] = wall
+    return dict((k, round(v, 4) if v is not None else None) for k, v in result.items())
+
+
+class Session(object):
+
+    def __init__(self, directory, profiler, module):
+        self.started = time.time()
+        self.module = module
+        process_start = _process_start()
+        self.imported = self.started - process_start if process_start else None
+        self.directory = os.path.join(directory, '%s-%s-%d' % (
+            module, time.strftime('%Y%m%dT%H%M%S'), os.getpid()))
+        self.profiler = _profiler(profiler == 'sampling')
+        self.sampling = profiler == 'sampling' and self.profiler is not None
+        self.warning = None
+        if profiler == 'sampling' and not self.sampling:
+            self.warning = 'pyinstrument is not installed, cProfile used instead'
+            self.profiler = _profiler(False)
+        self.records = []
+        self.summary = None
+
+    def start(self):
+        if self.sampling:
+            self.profiler.start()
+        elif self.profiler is not None:
+            self.profiler.enable()
+
+    def stop(self):
+        if self.sampling:
+            self.profiler.stop()
+        elif self.profiler is not None:
+            self.profiler.disable()
+
+    def report(self, *clients):
+        """ `centreon_profile` result of the run so far, with the API timings of `clients` """
+        self.records = [r for c in clients for r in c.stats()['calls']]
+        self.summary = dict(directory=self.directory,
+                            phases=phases(self.records, time.time() - self.started, self.imported))
+        if self.warning:
+            self.summary['warning'] = self.warning
+        return self.summary
+
+    def save(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        summary = self.summary or dict(
+            directory=self.directory,
+            phases=phases(self.records, time.time() - self.started, self.imported))
+        with open(os.path.join(self.directory, 'phases.json'), 'w') as f:
+            json.dump(dict(summary, module=self.module, calls=self.records),
+                      f, indent=2, sort_keys=True)
+        if self.sampling:
+            with open(os.path.join(self.directory, 'profile.html'), 'w') as f:
+                f.write(self.profiler.output_html())
+        elif self.profiler is not None:
+            self.profiler.dump_stats(os.path.join(self.directory, 'profile.prof'))
+            import pstats
+            with open(os.path.join(self.directory, 'profile.txt'), 'w') as f:
+                stats = pstats.Stats(self.profiler, stream=f)
+                stats.sort_stats('cumulative').print_stats(40)
+
+
+def run_module(main, module=None):
+    """ Run `main`, profiled when asked to """
+    global _session
+    directory, profiler = _options()
+    if not directory:
+        return main()
+    module = module or os.path.splitext(os.path.basename(main.__globals__.get('__file__', 'module')))[0]
+    _session = Session(directory, profiler, module)
+    _session.start()
+    try:
+        return main()
+    finally:
+        # also reached by the SystemExit of exit_json and fail_json
+        _session.stop()
+        try:
+            _session.save()
+        except (IOError, OSError):
+            # the module result is already out, profiling must not fail it
+            pass
+
+
+def report(*clients):
+    """ `centreon_profile` of the run, None when not profiling """
+    if _session is None:
+        return None
+    return _session.report(*clients)
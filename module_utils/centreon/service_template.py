@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Service template reconciliation used by centreon_service_template.
+#
+# Same contract as ensure_host: `result` collects `changed` and `msg`,
+# failures are raised as CentreonAPIError.
+#
+# centreon_service_template_bulk deploys many templates whose parents must
+# exist first: template_levels orders them by their `parenttemplate` links
+# within the batch (level 0 has no parent in the batch, level 1 has its
+# parent in level 0, ...), cycles and missing parents being reported before
+# any write. Each level is then reconciled `concurrency` templates at a time,
+# from a single STPL listing.
+
+from ansible.module_utils.centreon.client import CentreonAPIError
+from ansible.module_utils.centreon.host import _call, added_commands, reconcile_macros, reconcile_params
+from ansible.module_utils.centreon.preflight import (
+    check_references, missing_references, service_template_references
+)
+
+SERVICE_TEMPLATE_DEFAULTS = dict(
+    alias=None,
+    parenttemplate=None,
+    hosttemplates=[],
+    hosttemplates_action='add',
+    params=[],
+    macros=[],
+    state='present',
+)
+
+
+def service_template_spec(spec):
+    full = dict(SERVICE_TEMPLATE_DEFAULTS)
+    full.update((k, v) for k, v in spec.items() if v is not None)
+    return full
+
+
+def get_service_template(client, name):
+    """ STPL;SHOW entry of `name`, service templates are named by `description` """
+    for st in _call(client, 'Unable to get service template %s' % name, 'show', 'STPL', name):
+        if st.get('description', st.get('name')) == name:
+            return st
+    return None
+
+
+def ensure_service_template(client, spec, result, listing=None, preflight=False):
+    """
+    Bring service template `spec` to its state. `listing` ({description:
+    SHOW record} of every service template) spares its STPL;SHOW.
+    `preflight` checks the objects about to be linked before any write: all
+    of them for a new template, the added host templates and commands of an
+    existing one
+    """
+    spec = service_template_spec(spec)
+    name = spec['name']
+    alias = spec['alias']
+    parenttemplate = spec['parenttemplate']
+    hosttemplates = spec['hosttemplates']
+
+    result.setdefault('changed', False)
+    data = result.setdefault('msg', [])
+
+    st = get_service_template(client, name) if listing is None else listing.get(name)
+    if st is None:
+        data.append("Service template %s not found" % name)
+
+    is_creation = False
+
+    if st is None and spec['state'] == 'present':
+        is_creation = True
+        if preflight:
+            check_references(client, [service_template_references(spec)])
+        data.append("Add %s %s %s" % (name, alias, parenttemplate))
+        _call(client, 'Create', 'add', 'STPL', [name, alias, parenttemplate])
+        result['changed'] = True
+        data.append("Add service template: %s" % name)
+
+        if client.check_mode:
+            st = dict(description=name, alias=alias)
+        else:
+            st = get_service_template(client, name)
+            if st is None:
+                raise CentreonAPIError('Failed to retrieve service template %s after creation' % name)
+
+    if st is None:
+        raise CentreonAPIError("Unable to find service template %s " % name)
+
+    if spec['state'] == 'absent':
+        _call(client, 'Failed to delete service template', 'del', 'STPL', name)
+        result['changed'] = True
+        data.append("Service template %s deleted" % name)
+        return result
+
+    current = []
+    if hosttemplates and not is_creation:
+        current = [ht['name'] for ht in _call(
+            client, 'Unable to retrieve list of host templates',
+            'gethosttemplate', 'STPL', name)]
+    params = dict()
+    if preflight and not is_creation:
+        check_references(client, [dict(
+            HTPL=[ht for ht in hosttemplates if ht not in current],
+            CMD=added_commands(client, 'STPL', name, spec['params'], params))])
+
+    if not st['alias'] == alias and alias:
+        _call(client, 'Unable to change alias', 'setparam', 'STPL', [name, 'alias', alias])
+        result['changed'] = True
+        data.append("Change alias: %s -> %s" % (st['alias'], alias))
+
+    #### HostTemplates
+    if hosttemplates:
+        missing = [ht for ht in hosttemplates if ht not in current]
+        extra = []
+        if spec['hosttemplates_action'] == 'set':
+            extra = [ht for ht in current if ht not in hosttemplates]
+        if missing:
+            _call(client, 'Unable to add templates', 'addhosttemplate', 'STPL',
+                  [name, '|'.join(missing)])
+            result['changed'] = True
+            data.append("Add HostTemplate: %s" % missing)
+        if extra:
+            _call(client, 'Unable to remove templates', 'delhosttemplate', 'STPL',
+                  [name, '|'.join(extra)])
+            result['changed'] = True
+            data.append("Remove HostTemplate: %s" % extra)
+
+    reconcile_macros(client, 'STPL', name, spec['macros'], result,
+                     current={} if is_creation else None)
+    reconcile_params(client, 'STPL', name, spec['params'], result, params)
+
+    return result
+
+
+def template_levels(specs):
+    """
+    Lists of `specs` (complete specs), each template coming after its
+    parent when the parent is in `specs`. Raises CentreonAPIError naming a
+    cycle of parents
+    """
+    by_name = dict((s['name'], s) for s in specs)
+    depth = dict()
+
+    def level(name, path):
+        if name in depth:
+            return depth[name]
+        if name in path:
+            cycle = path[path.index(name):] + [name]
+            raise CentreonAPIError("Service template cycle: %s" % ' -> '.join(cycle))
+        parent = by_name[name]['parenttemplate']
+        depth[name] = level(parent, path + [name]) + 1 if parent in by_name else 0
+        return depth[name]
+
+    levels = list()
+    for s in specs:
+        d = level(s['name'], [])
+        while len(levels) <= d:
+            levels.append(list())
+        levels[d].append(s)
+    return levels
+
+
+def missing_template_references(client, specs, preflight=True):
+    """
+    {object: names} referenced by `specs` and missing, parents created by
+    the batch itself counting as present. Without `preflight` only the
+    parents are checked
+    """
+    batch = set(s['name'] for s in specs if s['state'] == 'present')
+    references = list()
+    for s in specs:
+        if s['state'] != 'present':
+            continue
+        refs = service_template_references(s)
+        refs['STPL'] = [p for p in refs.get('STPL', []) if p not in batch]
+        if not preflight:
+            refs = dict(STPL=refs['STPL'])
+        references.append(refs)
+    return missing_references(client, references)
+
+
+def deploy_levels(client, levels, concurrency=4):
+    """
+    Reconcile `levels` in order, each one `concurrency` templates at a time.
+    Children of a failed template are not attempted. Returns a result per
+    template (name, level, changed, msg, failed and error)
+    """
+    # multiprocessing is slow to import and single templates never fan out
+    from multiprocessing.pool import ThreadPool
+    listing = dict((st.get('description', st.get('name')), st) for st in _call(
+        client, 'Unable to list service templates', 'show', 'STPL'))
+    failed = set()
+    results = list()
+    pool = ThreadPool(max(1, concurrency))
+    try:
+        for depth, specs in enumerate(levels):
+            def run(spec):
+                result = dict(name=spec['name'], level=depth, changed=False, msg=list())
+                if spec['parenttemplate'] in failed:
+                    result.update(failed=True, error="Parent %s failed" % spec['parenttemplate'])
+                    return result
+                try:
+                    ensure_service_template(client, spec, result, listing)
+                except CentreonAPIError as e:
+                    result.update(failed=True, error=str(e))
+                return result
+            level = pool.map(run, specs)
+            failed.update(r['name'] for r in level if r.get('failed'))
+            results.extend(level)
+    finally:
+        pool.close()
+    return results
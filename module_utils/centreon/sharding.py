@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+#
+# Routing of hosts across several independent centrals.
+
+import re
+
+from ansible.module_utils.centreon.pollers import rendezvous_pick
+
+
+def route_host(host, centrals, route_by):
+    """
+    Name of the central `host` (a host spec) belongs to, None if no central
+    matches.
+
+    - hash: rendezvous hash of the hostname over the central names, stable as
+      long as the list of centrals does not change
+    - hostgroup: first central listing one of the host's hostgroups in its
+      `hostgroups`
+    - regex: first central whose `match` regex matches the hostname
+    """
+    if route_by == 'hash':
+        return rendezvous_pick(host['name'], dict((c['name'], 1.0) for c in centrals))
+
+    for c in centrals:
+        if route_by == 'hostgroup':
+            if set(c.get('hostgroups') or []) & set(host.get('hostgroups') or []):
+                return c['name']
+        elif route_by == 'regex':
+            if c.get('match') and re.search(c['match'], host['name']):
+                return c['name']
+    return None
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# Bulk snapshot of the Centreon configuration (centreon_facts) and its use as
+# a read cache by the other modules (`known_state` option).
+#
+# The snapshot is a dict of indexes, one per gathered subset:
+#
+#   hosts:             {name: {id, name, alias, address, activate,
+#                              hostgroups (with hostgroups), instance (with pollers)}}
+#   hostgroups:        {name: {id, name, alias, members}}
+#   host_templates:    {name: {id, name, alias, address, activate, parents}}
+#   service_templates: {name: {id, description, alias, ...}}
+#   pollers:           {name: {id, name, ..., hosts}}
+#   commands:          {name: {id, name, type, line}}
+#
+# A configuration export (export.py) gives the same indexes, whose records
+# also carry templates, macros and params.
+#
+# KnownState answers the CLAPI reads the modules issue from such a snapshot;
+# anything it cannot answer, or any object written since, goes to the API.
+# Indexes listed in `partial` only hold some objects: a name missing from
+# them is not taken as a missing object.
+
+import threading
+
+SUBSETS = ['hosts', 'hostgroups', 'host_templates', 'service_templates', 'pollers', 'commands']
+
+
+def _index(records, key='name'):
+    return dict((r[key], r) for r in records)
+
+
+def fanout(fetch, names, concurrency):
+    """ {name: fetch(name)}, `concurrency` calls at a time """
+    # multiprocessing is slow to import and most runs never fan out
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(max(1, min(concurrency, len(names) or 1)))
+    try:
+        results = pool.map(fetch, names)
+    finally:
+        pool.close()
+    return dict(zip(names, results))
+
+
+def gather_facts(client, subsets, concurrency=4):
+    facts = dict()
+
+    if 'hosts' in subsets:
+        facts['hosts'] = _index(client.call('show', 'HOST'))
+
+    if 'hostgroups' in subsets:
+        hostgroups = _index(client.call('show', 'HG'))
+        members = fanout(lambda n: client.call('getmember', 'HG', n), sorted(hostgroups), concurrency)
+        for hg, hosts in members.items():
+            hostgroups[hg]['members'] = [h['name'] for h in hosts]
+            for h in hostgroups[hg]['members']:
+                if h in facts.get('hosts', {}):
+                    facts['hosts'][h].setdefault('hostgroups', []).append(hg)
+        for h in facts.get('hosts', {}).values():
+            h.setdefault('hostgroups', [])
+        facts['hostgroups'] = hostgroups
+
+    if 'host_templates' in subsets:
+        templates = _index(client.call('show', 'HTPL'))
+        parents = fanout(lambda n: client.call('gettemplate', 'HTPL', n), sorted(templates),
+                         concurrency)
+        for t, p in parents.items():
+            templates[t]['parents'] = [x['name'] for x in p]
+        facts['host_templates'] = templates
+
+    if 'service_templates' in subsets:
+        facts['service_templates'] = _index(client.call('show', 'STPL'), 'description')
+
+    if 'pollers' in subsets:
+        pollers = _index(client.call('show', 'INSTANCE'))
+        hosts = fanout(lambda n: client.call('gethosts', 'INSTANCE', n), sorted(pollers), concurrency)
+        for p, h in hosts.items():
+            pollers[p]['hosts'] = [x['name'] for x in h]
+            for x in pollers[p]['hosts']:
+                if x in facts.get('hosts', {}):
+                    facts['hosts'][x]['instance'] = p
+        facts['pollers'] = pollers
+
+    if 'commands' in subsets:
+        facts['commands'] = _index(client.call('show', 'CMD'))
+
+    return facts
+
+
+# CLAPI object -> snapshot index
+_INDEXES = dict(
+    HOST='hosts', HG='hostgroups', HTPL='host_templates',
+    STPL='service_templates', INSTANCE='pollers', CMD='commands',
+)
+
+# (action, object) -> (index, field), answered from one record
+_FIELDS = {
+    ('gethostgroup', 'HOST'): ('hosts', 'hostgroups'),
+    ('gettemplate', 'HTPL'): ('host_templates', 'parents'),
+    ('gettemplate', 'HOST'): ('hosts', 'templates'),
+    ('gethosttemplate', 'STPL'): ('service_templates', 'hosttemplates'),
+    ('getmember', 'HG'): ('hostgroups', 'members'),
+    ('gethosts', 'INSTANCE'): ('pollers', 'hosts'),
+}
+
+_RECORD_FIELDS = ('members', 'parents', 'hosts', 'hostgroups', 'instance',
+                  'templates', 'hosttemplates', 'macros', 'params')
+
+_MACRO_PREFIX = dict(HOST='_HOST', HTPL='_HOST', STPL='_SERVICE')
+
+
+class KnownState(object):
+
+    def __init__(self, facts):
+        self.facts = facts or {}
+        self.partial = set(self.facts.get('partial', []))
+        # (object, name) written during this run, added by the threads of
+        # parallel sections and bulk runs while others read
+        self.stale = set()
+        self.lock = threading.Lock()
+
+    def forget(self, action, obj, values):
+        """ Stop answering reads about the object a write touched """
+        name = values.split(';', 1)[0] if values else None
+        stale = [(obj, name)]
+        action = action.lower()
+        if obj == 'HOST' and 'hostgroup' in action:
+            stale.append(('HG', None))
+        if obj == 'HOST' and action in ('add', 'del', 'setinstance'):
+            stale.extend([('HG', None), ('INSTANCE', None)])
+        with self.lock:
+            self.stale.update(stale)
+
+    def _fresh(self, obj, name):
+        with self.lock:
+            if name is None:
+                # a listing is stale as soon as any object of the kind was written
+                return not any(o == obj for o, _ in self.stale)
+            return (obj, name) not in self.stale and (obj, None) not in self.stale
+
+    def lookup(self, action, obj, values):
+        """ Result of a read from the snapshot, KeyError if it cannot tell """
+        action = action.lower()
+        name = values.split(';', 1)[0] if values else None
+        if not self._fresh(obj, name):
+            raise KeyError(name)
+
+        if action == 'show' and obj in _INDEXES:
+            index = self.facts[_INDEXES[obj]]
+            if _INDEXES[obj] in self.partial and name not in index:
+                raise KeyError(name)
+            if name is None:
+                return [self._record(r) for r in index.values()]
+            # SHOW filters with LIKE, callers only look for the exact name
+            return [self._record(index[name])] if name in index else []
+
+        if (action, obj) in _FIELDS:
+            subset, field = _FIELDS[(action, obj)]
+            return [dict(name=n) for n in self._field(subset, name, field)]
+
+        if action == 'showinstance' and obj == 'HOST':
+            instance = self._field('hosts', name, 'instance')
+            return [dict(name=instance)] if instance else []
+
+        if action == 'getmacro' and obj in _MACRO_PREFIX:
+            macros = self._field(_INDEXES[obj], name, 'macros')
+            return [{'macro name': '$%s%s$' % (_MACRO_PREFIX[obj], m),
+                     'macro value': v['value'], 'is_password': v['is_password'],
+                     'description': v['description'], 'source': 'direct'}
+                    for m, v in sorted(macros.items())]
+
+        if action == 'getparam' and obj in _INDEXES and ';' in values:
+            params = self._field(_INDEXES[obj], name, 'params')
+            record = self.facts[_INDEXES[obj]][name]
+            # an export only lists the params which are set
+            return [dict((p, params.get(p, record.get(p, '')))
+                         for p in values.split(';', 1)[1].split('|'))]
+
+        raise KeyError(action)
+
+    def _field(self, subset, name, field):
+        record = self.facts[subset].get(name)
+        if record is None or field not in record:
+            raise KeyError(name)
+        return record[field]
+
+    @staticmethod
+    def _record(record):
+        return dict((k, v) for k, v in record.items() if k not in _RECORD_FIELDS)
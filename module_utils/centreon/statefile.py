@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# Small JSON states shared by every process talking to one central.
+#
+# The circuit breaker and the poller fingerprints each keep a JSON object in
+# a file per central URL under a state directory. The file is read and
+# written under an exclusive flock, so the forks of a play (and the threads
+# of centreon_host_bulk) see each other's changes.
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+
+
+def state_path(url, state_dir, default):
+    """
+    State file of the central `url` under `state_dir`, or the `default`
+    directory of the temporary directory when None
+    """
+    state_dir = state_dir or os.path.join(tempfile.gettempdir(), default)
+    return os.path.join(state_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+
+def update(path, change):
+    """
+    Run `change(state)` on the state of `path` under the file lock, and
+    return its result. The state is written back when it changed, its
+    directory created with the first state
+    """
+    state_dir = os.path.dirname(path)
+    if not os.path.isdir(state_dir):
+        try:
+            os.makedirs(state_dir)
+        except OSError:
+            # created by another fork meanwhile
+            if not os.path.isdir(state_dir):
+                raise
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        with os.fdopen(os.dup(fd), 'r+') as f:
+            content = f.read()
+            try:
+                state = json.loads(content) if content else {}
+            except ValueError:
+                state = {}
+            before = dict(state)
+            result = change(state)
+            if state != before:
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+        return result
+    finally:
+        os.close(fd)